@@ -0,0 +1 @@
+"""Komponen agent Raspberry Pi (dipakai oleh Yuk bisa.py dan pi_agent.simulate)"""
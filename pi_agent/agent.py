@@ -0,0 +1,433 @@
+"""Inti agent Raspberry Pi berbasis asyncio.
+
+Semua loop jaringan (sampling, upload batch, backfill spool, long-poll status
+daya) dan API kontrol HTTP berjalan di satu event loop dengan satu
+aiohttp.ClientSession (koneksi keep-alive dipakai ulang). Setiap loop punya
+timer sendiri, jadi request yang lambat tidak menggeser jadwal sampling 1 Hz.
+Motor stepper tetap di thread terpisah (lihat stepper.py). Nilai sensor
+diambil dari SensorSource (lihat sources.py).
+"""
+import asyncio
+import gzip
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import aiohttp
+from aiohttp import web
+
+from .counters import CounterState, SequenceCounter
+from .edge import EdgeProcessor
+from .sources import RandomSource
+from .wire import MEDIA_TYPE as BINARY_MEDIA_TYPE, encode_readings
+
+# Ditolak karena device belum/tidak lagi terdaftar (bukan data rusak): batch
+# disimpan di spool dan device didaftarkan ulang oleh power_loop
+REGISTRY_STATUSES = (401, 403, 404)
+# Hanya data yang tidak bisa di-parse/divalidasi server yang dibuang; status
+# lain di luar 2xx dianggap gangguan sementara dan batch dikirim ulang
+REJECTED_STATUS = 400
+
+
+@dataclass
+class AgentConfig:
+    device_id: str                  # Harus unik untuk setiap Raspberry Pi
+    server: str                     # host:port server Django
+    host: str = "0.0.0.0"           # Alamat API kontrol
+    port: int = 5000
+    power_system_id: int = 1
+    sample_interval: float = 1.0    # Detik antar pembacaan jika source tidak menentukan sendiri
+    batch_size: int = 5             # Kirim batch setiap N pembacaan...
+    batch_interval: float = 5.0     # ...atau setiap T detik, mana yang lebih dulu
+    buffer_capacity: int = 600      # Pembacaan tertua dibuang jika buffer penuh
+    wire_format: str = "binary"     # "binary" atau "json"; kembali ke JSON jika server menolak
+    upload_timeout: float = 3.0
+    power_poll_timeout: int = 25    # Lama server menahan long-poll sebelum balas 204
+    backfill_chunk: int = 500
+    backfill_interval: float = 2.0
+    edge: bool = True               # False: kirim setiap pembacaan apa adanya
+    deadband: dict = field(default_factory=dict)  # field -> toleransi perubahan (default 0)
+    summary_window: float = 10.0    # Detik maksimum pembacaan digabung saat motor jalan
+    heartbeat_interval: float = 60.0  # Detik maksimum pembacaan digabung saat motor berhenti
+    verbose: bool = True            # False: jangan cetak log per batch (mis. simulasi banyak agent)
+
+    @property
+    def ingest_url(self):
+        return f"http://{self.server}/api/sensordata/ingest/"
+
+    @property
+    def power_changes_url(self):
+        return f"http://{self.server}/api/powersystem/changes/"
+
+    @property
+    def register_url(self):
+        return f"http://{self.server}/api/devices/register/"
+
+
+async def ticker(interval):
+    """Async generator yang berdetak setiap `interval` detik pada deadline tetap.
+
+    Jika satu detak terlambat lebih dari satu interval, detak yang terlewat
+    dilewati (tidak dikejar beruntun).
+    """
+    loop = asyncio.get_running_loop()
+    next_at = loop.time()
+    while True:
+        yield
+        next_at += interval
+        delay = next_at - loop.time()
+        if delay < -interval:
+            next_at = loop.time()
+            delay = 0
+        await asyncio.sleep(max(delay, 0))
+
+
+class ReadingBuffer:
+    """Ring buffer terbatas untuk pembacaan sensor yang belum terkirim"""
+
+    def __init__(self, capacity, batch_size, batch_interval):
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._items = deque(maxlen=capacity)
+        self._changed = asyncio.Event()
+        self._oldest_at = None  # waktu monotonic pembacaan tertua di buffer
+
+    def __len__(self):
+        return len(self._items)
+
+    def append(self, reading):
+        if not self._items:
+            self._oldest_at = time.monotonic()
+        self._items.append(reading)
+        if len(self._items) == 1 or len(self._items) >= self.batch_size:
+            self._changed.set()
+
+    async def take_batch(self):
+        """Tunggu sampai batch_size pembacaan atau batch_interval terlewati"""
+        while True:
+            if len(self._items) >= self.batch_size:
+                break
+            remaining = None
+            if self._items:
+                remaining = self.batch_interval - (time.monotonic() - self._oldest_at)
+                if remaining <= 0:
+                    break
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+        batch = list(self._items)
+        self._items.clear()
+        self._oldest_at = None
+        return batch
+
+
+class Agent:
+    """Agent satu lini conveyor: sampling sensor, uplink ke server dan API kontrol"""
+
+    def __init__(self, config, stop_event, spool, source=None, stepper=None):
+        self.config = config
+        self.source = source or RandomSource()
+        self.stop_event = stop_event  # RunSwitch: set = motor berhenti
+        self.spool = spool
+        self.stepper = stepper
+        self.wire_format = config.wire_format
+        # Counter mulai dari 0 setiap start, jadi start juga memulai generation baru
+        self.counters = CounterState(spool.next_generation())
+        self.sequence = SequenceCounter(spool.reserve_sequence)
+        self.buffer = ReadingBuffer(config.buffer_capacity, config.batch_size, config.batch_interval)
+        self.edge = None
+        if config.edge:
+            interval = self.source.interval or config.sample_interval
+            self.edge = EdgeProcessor(
+                config.deadband,
+                summary_samples=round(config.summary_window / interval),
+                heartbeat_samples=round(config.heartbeat_interval / interval),
+                interval=interval,
+            )
+        self.server_online = asyncio.Event()  # set = upload terakhir berhasil, backfill boleh jalan
+        self.registered = asyncio.Event()     # set = device sudah terdaftar di server
+        self.session = None
+        self.sent_readings = 0
+        self.failed_batches = 0
+
+    def log(self, message):
+        if self.config.verbose:
+            print(message)
+
+    def generate_sensor_data(self):
+        """Ambil pembacaan dari source dan lengkapi dengan counter dan identitas device"""
+        sample = self.source.read(not self.stop_event.is_set())
+        counts = self.counters.add(sample.new_good, sample.new_bad)
+        return {
+            "timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+            **sample.values,
+            "good_product": counts.good,
+            "bad_product": counts.bad,
+            "counter_generation": counts.generation,
+            "power_system": self.config.power_system_id,
+            "device": self.config.device_id
+        }
+
+    async def sample_loop(self):
+        """Sampling data sensor ke ring buffer pada interval tetap"""
+        self.log("Starting sensor sampling loop")
+        async for _ in ticker(self.source.interval or self.config.sample_interval):
+            captured = time.time()
+            reading = self.generate_sensor_data()
+            if self.edge is None:
+                rows = [reading]
+            else:
+                rows = self.edge.process(reading, idle=self.stop_event.is_set(), captured=captured)
+            for row in rows:
+                # Nomor urut ikut tersimpan di spool, jadi kirim ulang tidak membuat duplikat
+                row["sequence"] = await self.sequence.next()
+                self.buffer.append(row)
+
+    async def post_batch(self, batch):
+        """Kirim satu batch (gzip, biner atau JSON) ke endpoint ingest, kembalikan (status, body)"""
+        if self.wire_format == "binary":
+            body, content_type = encode_readings(batch), BINARY_MEDIA_TYPE
+        else:
+            body, content_type = json.dumps(batch).encode("utf-8"), "application/json"
+        async with self.session.post(
+            self.config.ingest_url,
+            data=gzip.compress(body),
+            headers={"Content-Type": content_type, "Content-Encoding": "gzip"},
+            timeout=aiohttp.ClientTimeout(total=self.config.upload_timeout)
+        ) as response:
+            status = response.status
+            text = await response.text() if status >= 400 else ""
+        if status == 415 and self.wire_format == "binary":
+            # Server versi lama belum mengenal format biner, kirim ulang sebagai JSON
+            self.log("Server does not accept binary readings, falling back to JSON")
+            self.wire_format = "json"
+            return await self.post_batch(batch)
+        return status, text
+
+    async def spool_batch(self, batch, reason):
+        """Simpan batch ke spool, dikirim ulang oleh backfill_loop (idempotent)"""
+        evicted = await asyncio.to_thread(self.spool.append_many, batch)
+        self.log(f"{reason}, spooled {len(batch)} readings ({len(self.spool)} pending)")
+        if evicted:
+            self.log(f"Spool full, dropped {evicted} oldest readings")
+
+    async def upload_loop(self):
+        """Kirim batch data sensor terbaru ke server"""
+        self.log("Starting sensor upload loop")
+        while True:
+            batch = await self.buffer.take_batch()
+            if not self.registered.is_set():
+                # Server menolak data dari device yang belum terdaftar; tetap simpan
+                # ke spool agar tidak hilang dari ring buffer jika server lama tidak bisa dihubungi
+                await self.spool_batch(batch, "Device not registered yet")
+                continue
+            try:
+                status, text = await self.post_batch(batch)
+                if status in REGISTRY_STATUSES:
+                    self.unregistered(status, text)
+                    await self.spool_batch(batch, "Device not registered")
+                    continue
+                if status not in (201, 204, REJECTED_STATUS):
+                    # Server bermasalah: simpan ke spool, dikirim ulang saat backfill (idempotent)
+                    raise RuntimeError(f"Server error {status} - {text[:200]}")
+                self.server_online.set()
+                if status in (201, 204):
+                    self.sent_readings += len(batch)
+                    last = batch[-1]
+                    self.log(f"Batch sent: {len(batch)} readings, G:{last['good_product']}, B:{last['bad_product']}")
+                else:
+                    # Data tidak valid, percuma dikirim ulang
+                    self.log(f"Batch rejected: {status} - {text[:200]}")
+            except Exception as e:
+                self.server_online.clear()
+                self.failed_batches += 1
+                await self.spool_batch(batch, f"Failed to send batch ({str(e)})")
+
+    async def backfill_loop(self):
+        """Kirim ulang isi spool secara bertahap saat server online"""
+        self.log("Starting spool backfill loop")
+        while True:
+            await self.server_online.wait()
+            # SQLite di kartu SD bisa lambat, jangan blok event loop
+            chunk = await asyncio.to_thread(self.spool.peek, self.config.backfill_chunk)
+            if chunk:
+                last_id = chunk[-1][0]
+                try:
+                    status, text = await self.post_batch([reading for _, reading in chunk])
+                    if status in REGISTRY_STATUSES:
+                        # Chunk tetap di spool, backfill menunggu sampai terdaftar lagi
+                        self.unregistered(status, text)
+                    elif status in (201, 204, REJECTED_STATUS):
+                        # 400: data tidak valid, dibuang supaya spool tidak macet
+                        if status not in (201, 204):
+                            self.log(f"Backfill chunk rejected: {status} - {text[:200]}")
+                        await asyncio.to_thread(self.spool.ack, last_id)
+                        if status in (201, 204):
+                            self.sent_readings += len(chunk)
+                        self.log(f"Backfilled {len(chunk)} readings ({len(self.spool)} pending)")
+                    else:
+                        self.log(f"Backfill failed: {status}")
+                except Exception as e:
+                    self.server_online.clear()
+                    self.log(f"Backfill failed: {str(e)}")
+            await asyncio.sleep(self.config.backfill_interval)
+
+    def unregistered(self, status, text):
+        """Server tidak mengenal device ini (mis. registry di-reset): daftar ulang"""
+        self.log(f"Device rejected by server: {status} - {text[:200]}")
+        self.registered.clear()
+        self.server_online.clear()
+
+    async def register(self):
+        """Daftarkan Raspberry Pi ini ke server (alamat diambil dari IP pengirim)"""
+        async with self.session.post(
+            self.config.register_url,
+            json={"id": self.config.device_id, "port": self.config.port},
+            timeout=aiohttp.ClientTimeout(total=self.config.upload_timeout)
+        ) as response:
+            response.raise_for_status()
+            device = await response.json()
+        self.registered.set()
+        self.server_online.set()  # Data yang di-spool sebelum terdaftar langsung di-backfill
+        self.log(f"Device registered: {device}")
+
+    def apply_power_status(self, status, source):
+        if status:  # True = ON
+            if self.stop_event.is_set():  # Jika motor sebelumnya berhenti
+                self.stop_event.clear()  # Jalankan motor
+                self.log(f"Motor started from {source}")
+        else:  # False = OFF
+            if not self.stop_event.is_set():  # Jika motor sebelumnya jalan
+                self.stop_event.set()  # Hentikan motor
+                self.log(f"Motor stopped from {source}")
+
+    async def power_loop(self):
+        """Terima perubahan status daya dari server (long-poll)"""
+        self.log("Starting power status polling loop")
+        last_id = 0
+        timeout = aiohttp.ClientTimeout(total=self.config.power_poll_timeout + 5)
+
+        while True:
+            try:
+                if not self.registered.is_set():
+                    await self.register()
+
+                # Server menahan request sampai ada status dengan id > last_id
+                async with self.session.get(
+                    self.config.power_changes_url,
+                    params={"since_id": last_id, "timeout": self.config.power_poll_timeout,
+                            "device": self.config.device_id},
+                    timeout=timeout
+                ) as response:
+                    if response.status == 204:
+                        # Tidak ada perubahan. Server tanpa long-poll (WSGI) atau yang
+                        # sedang penuh mengirim Retry-After: tunggu dulu sebelum poll lagi
+                        retry_after = response.headers.get("Retry-After")
+                        if retry_after:
+                            await asyncio.sleep(float(retry_after))
+                        continue
+                    if response.status == 200:
+                        latest_power = await response.json()
+                        last_id = latest_power["id"]
+                        self.apply_power_status(latest_power["status"], f"server poll (ID: {last_id})")
+                        continue
+                    self.log(f"Unexpected power poll response: {response.status}")
+            except Exception as e:
+                self.log(f"Error polling power status: {str(e)}")
+
+            await asyncio.sleep(1)  # Tunggu sebentar sebelum mencoba lagi jika gagal
+
+    async def control_power(self, request):
+        """API endpoint untuk ON/OFF motor"""
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+
+        if not data or "status" not in data:
+            return web.json_response({"error": "Missing 'status' parameter"}, status=400)
+
+        status = data["status"]
+        if status not in [0, 1]:
+            return web.json_response({"error": "Status must be 0 or 1"}, status=400)
+
+        self.apply_power_status(status == 1, "API")
+        return web.json_response({
+            "message": "Motor " + ("started" if status == 1 else "stopped"),
+            "motor_running": status
+        })
+
+    async def reset_counter(self, request):
+        """API endpoint untuk reset counter"""
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+
+        if not data or "reset" not in data:
+            return web.json_response({"error": "Missing 'reset' parameter"}, status=400)
+
+        if data["reset"]:
+            generation = await asyncio.to_thread(self.spool.next_generation)
+            counts = self.counters.reset(generation)
+            self.log(f"Counters reset via API (generation {counts.generation})")
+            return web.json_response({
+                "message": "Counters reset successfully",
+                "success": True,
+                "counter_generation": counts.generation
+            })
+
+        return web.json_response({"error": "Invalid reset value"}, status=400)
+
+    async def get_status(self, request):
+        """API endpoint untuk cek status Raspberry Pi"""
+        counts = self.counters.snapshot()
+        status = {
+            "status": "running",
+            "device": self.config.device_id,
+            "motor_running": not self.stop_event.is_set(),
+            "good_product": counts.good,
+            "bad_product": counts.bad,
+            "counter_generation": counts.generation,
+            "buffered": len(self.buffer),
+            "spooled": len(self.spool),
+            "server_online": self.server_online.is_set(),
+            "sent_readings": self.sent_readings,
+            "failed_batches": self.failed_batches,
+        }
+        if self.edge is not None:
+            status["edge"] = {"received": self.edge.received, "emitted": self.edge.emitted}
+        if self.stepper is not None:
+            status["stepper"] = self.stepper.stats()
+        return web.json_response(status)
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_post("/control-power", self.control_power)
+        app.router.add_post("/reset-counter", self.reset_counter)
+        app.router.add_get("/status", self.get_status)
+        return app
+
+    async def run(self):
+        """Jalankan API kontrol dan semua loop sampai dibatalkan"""
+        connector = aiohttp.TCPConnector(limit=4)  # upload, backfill, long-poll (+1 cadangan)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            self.session = session
+            runner = web.AppRunner(self.make_app(), access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, self.config.host, self.config.port).start()
+            self.log(f"Control API listening on port {self.config.port}")
+            try:
+                await asyncio.gather(
+                    self.sample_loop(),
+                    self.upload_loop(),
+                    self.backfill_loop(),
+                    self.power_loop(),
+                )
+            finally:
+                await runner.cleanup()
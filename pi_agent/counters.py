@@ -0,0 +1,69 @@
+import asyncio
+from collections import namedtuple
+from threading import Lock
+
+# Satu snapshot counter produk; generation naik setiap kali counter di-reset
+Counts = namedtuple("Counts", ["good", "bad", "generation"])
+
+
+class CounterState:
+    """Counter good/bad product dengan snapshot atomik.
+
+    State disimpan sebagai satu tuple immutable yang diganti utuh setiap kali
+    berubah. Pembaca (/status, sampling) cukup mengambil referensinya, yang
+    atomik di CPython, jadi tidak pernah menunggu lock dan tidak pernah melihat
+    counter yang setengah di-reset. Penulis diserialisasi dengan lock kecil.
+
+    Generation dikirim bersama setiap pembacaan sehingga server bisa membedakan
+    reset (generation berubah) dari counter yang mundur (generation sama).
+    """
+
+    def __init__(self, generation):
+        self._lock = Lock()
+        self._counts = Counts(0, 0, generation)
+
+    def snapshot(self):
+        return self._counts
+
+    def add(self, good=0, bad=0):
+        """Tambah produk baru, kembalikan snapshot sesudahnya"""
+        with self._lock:
+            counts = self._counts
+            if good or bad:
+                counts = self._counts = counts._replace(good=counts.good + good, bad=counts.bad + bad)
+            return counts
+
+    def reset(self, generation=None):
+        """Nolkan counter dan mulai generation baru (default: generation + 1)"""
+        with self._lock:
+            if generation is None or generation <= self._counts.generation:
+                generation = self._counts.generation + 1
+            self._counts = Counts(0, 0, generation)
+            return self._counts
+
+
+class SequenceCounter:
+    """Nomor urut pembacaan yang dikirim, unik per device dan tetap naik setelah restart.
+
+    Server menyimpan (device, sequence) dengan index unik, jadi batch yang
+    dikirim ulang (timeout setelah server commit, backfill spool) tidak
+    menjadi baris ganda. Nomor diambil per blok dari `reserve(count)` (mis.
+    Spool.reserve_sequence) agar spool tidak ditulis untuk setiap pembacaan.
+    Dipakai dari event loop agent; reserve menulis SQLite di kartu SD, jadi
+    dijalankan di thread lain.
+    """
+
+    def __init__(self, reserve, block=1000):
+        self._reserve = reserve
+        self.block = block
+        self._lock = asyncio.Lock()
+        self._next = self._end = 0
+
+    async def next(self):
+        async with self._lock:
+            if self._next >= self._end:
+                self._next = await asyncio.to_thread(self._reserve, self.block)
+                self._end = self._next + self.block
+            value = self._next
+            self._next += 1
+            return value
@@ -0,0 +1,115 @@
+"""Pemrosesan di sisi Pi sebelum pembacaan masuk buffer upload.
+
+Setiap baris yang dikirim mewakili `sample_count` pembacaan berurutan yang
+berakhir pada timestamp baris itu, dengan nilai pembacaan terakhir dan
+ringkasan min/max/mean per field analog. Pembacaan baru langsung dikirim
+jika ada field yang bergeser melebihi deadband dari nilai terakhir yang
+dikirim, atau counter/generation berubah; sisanya digabung sampai jendela
+penuh (summary_window saat motor jalan, heartbeat saat motor berhenti).
+Baris gabungan membawa waktu pembacaan pertama (window_start) dan jarak antar
+pembacaan (sample_interval); jendela ditutup lebih awal jika ticker melewatkan
+detak, jadi server bisa merekonstruksi waktu setiap pembacaan. Dengan deadband 0
+nilainya juga persis.
+"""
+from datetime import datetime, timezone
+
+from .sources import ANALOG_FIELDS
+
+# Field yang selalu memicu pengiriman jika berubah (tidak ada deadband)
+EXACT_FIELDS = ("good_product", "bad_product", "counter_generation", "power_system")
+
+
+class Window:
+    """Pembacaan yang ditahan: jumlah dan min/max/sum per field analog"""
+
+    def __init__(self, reading, captured):
+        self.last = reading
+        self.count = 1
+        self.start = self.captured = captured  # Epoch detik pembacaan pertama dan terakhir
+        self.stats = {field: [reading[field], reading[field], reading[field]] for field in ANALOG_FIELDS}
+
+    def add(self, reading, captured):
+        self.last = reading
+        self.count += 1
+        self.captured = captured
+        for field in ANALOG_FIELDS:
+            value = reading[field]
+            stats = self.stats[field]
+            if value < stats[0]:
+                stats[0] = value
+            if value > stats[1]:
+                stats[1] = value
+            stats[2] += value
+
+    def row(self, interval):
+        row = dict(self.last, sample_count=self.count)
+        if self.count > 1:
+            row["summary"] = {
+                field: [low, high, round(total / self.count, 4)]
+                for field, (low, high, total) in self.stats.items()
+            }
+            start = datetime.fromtimestamp(self.start, timezone.utc)
+            row["window_start"] = start.isoformat(timespec="milliseconds")
+            row["sample_interval"] = interval
+        return row
+
+
+class EdgeProcessor:
+    """Deadband per field, ringkasan per jendela dan heartbeat saat idle"""
+
+    def __init__(self, deadband=None, summary_samples=10, heartbeat_samples=60, interval=1.0):
+        self.interval = interval  # Detik antar pembacaan (interval ticker)
+        self.deadband = {field: 0 for field in ANALOG_FIELDS}
+        self.deadband.update(deadband or {})
+        self.summary_samples = max(summary_samples, 1)
+        self.heartbeat_samples = max(heartbeat_samples, 1)
+        self.reference = None  # Pembacaan terakhir yang dikirim karena berubah
+        self.window = None
+        self.received = 0
+        self.emitted = 0
+
+    def _changed(self, reading):
+        reference = self.reference
+        if reference is None:
+            return True
+        if any(reading.get(field) != reference.get(field) for field in EXACT_FIELDS):
+            return True
+        return any(abs(reading[field] - reference[field]) > self.deadband[field] for field in ANALOG_FIELDS)
+
+    def _contiguous(self, captured):
+        # Jeda yang menyimpang lebih dari setengah interval = ticker melewatkan detak
+        return abs(captured - self.window.captured - self.interval) <= self.interval / 2
+
+    def process(self, reading, idle, captured):
+        """Proses satu pembacaan (captured: epoch detik), kembalikan list baris yang siap dikirim"""
+        self.received += 1
+        rows = []
+        if self._changed(reading):
+            if self.window is not None:
+                rows.append(self.window.row(self.interval))
+                self.window = None
+            rows.append(dict(reading, sample_count=1))
+            self.reference = reading
+        else:
+            if self.window is not None and not self._contiguous(captured):
+                rows.append(self.window.row(self.interval))
+                self.window = None
+            if self.window is None:
+                self.window = Window(reading, captured)
+            else:
+                self.window.add(reading, captured)
+            limit = self.heartbeat_samples if idle else self.summary_samples
+            if self.window.count >= limit:
+                rows.append(self.window.row(self.interval))
+                self.window = None
+        self.emitted += len(rows)
+        return rows
+
+    def flush(self):
+        """Kirim pembacaan yang masih ditahan (mis. saat agent berhenti)"""
+        if self.window is None:
+            return []
+        rows = [self.window.row(self.interval)]
+        self.window = None
+        self.emitted += 1
+        return rows
@@ -0,0 +1,90 @@
+"""Jalankan banyak agent simulasi (tanpa GPIO) di satu event loop untuk uji beban server.
+
+Contoh:
+    python -m pi_agent.simulate --server 127.0.0.1:8000 --agents 200
+    python -m pi_agent.simulate --server 127.0.0.1:8000 --agents 50 --trace export.csv --speed 10
+
+Setiap agent mendaftar sebagai device <prefix><n>, membuka API kontrol di
+base-port + n dan menyimpan spool di memori. Motor stepper tidak disimulasikan.
+"""
+import argparse
+import asyncio
+import time
+
+from .agent import Agent, AgentConfig
+from .sources import RandomSource, ReplaySource
+from .spool import Spool
+from .stepper import RunSwitch
+
+REPORT_INTERVAL = 10  # Detik antar ringkasan throughput
+
+
+def build_agents(options):
+    agents = []
+    for n in range(options.agents):
+        config = AgentConfig(
+            device_id=f"{options.prefix}{n}",
+            server=options.server,
+            port=options.base_port + n,
+            power_system_id=options.power_system,
+            batch_size=options.batch_size,
+            wire_format=options.wire_format,
+            edge=not options.no_edge,
+            verbose=options.verbose,
+        )
+        if options.trace:
+            # Offset berbeda supaya agent tidak mengirim nilai yang persis sama
+            source = ReplaySource(options.trace, speed=options.speed, offset=n * 97)
+        else:
+            source = RandomSource(seed=n)
+        stop_event = RunSwitch()
+        if options.stopped:
+            stop_event.set()
+        agents.append(Agent(config, stop_event, Spool(":memory:", options.spool_rows), source=source))
+    return agents
+
+
+async def report(agents):
+    started = time.monotonic()
+    previous = 0
+    while True:
+        await asyncio.sleep(REPORT_INTERVAL)
+        sent = sum(agent.sent_readings for agent in agents)
+        failed = sum(agent.failed_batches for agent in agents)
+        spooled = sum(len(agent.spool) for agent in agents)
+        online = sum(agent.server_online.is_set() for agent in agents)
+        rate = (sent - previous) / REPORT_INTERVAL
+        previous = sent
+        print(f"[{time.monotonic() - started:7.0f}s] sent={sent} ({rate:.0f}/s) failed_batches={failed} "
+              f"spooled={spooled} online={online}/{len(agents)}")
+
+
+async def main(options):
+    agents = build_agents(options)
+    print(f"Starting {len(agents)} simulated agents against {options.server}")
+    await asyncio.gather(report(agents), *(agent.run() for agent in agents))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulasi banyak agent Raspberry Pi")
+    parser.add_argument("--server", required=True, help="host:port server Django")
+    parser.add_argument("--agents", type=int, default=10)
+    parser.add_argument("--prefix", default="sim-", help="Prefix device id")
+    parser.add_argument("--base-port", type=int, default=15000, help="Port API kontrol agent pertama")
+    parser.add_argument("--power-system", type=int, default=1)
+    parser.add_argument("--trace", help="File CSV/NDJSON untuk diputar ulang (default: nilai acak)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Kecepatan replay trace (mis. 10 = 10x)")
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--wire-format", choices=["binary", "json"], default="binary")
+    parser.add_argument("--no-edge", action="store_true", help="Kirim setiap pembacaan tanpa deadband/ringkasan")
+    parser.add_argument("--spool-rows", type=int, default=10000)
+    parser.add_argument("--stopped", action="store_true", help="Mulai dengan motor berhenti")
+    parser.add_argument("--verbose", action="store_true", help="Cetak log setiap agent")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main(parse_args()))
+    except KeyboardInterrupt:
+        print("\nSimulation terminated by user")
@@ -0,0 +1,166 @@
+"""Sumber data sensor dan backend GPIO yang bisa diganti.
+
+Agent hanya memanggil source.read(motor_running) setiap interval sampling,
+jadi agent bisa dijalankan tanpa hardware: nilai acak (RandomSource), rekaman
+trace CSV/NDJSON (ReplaySource, mis. hasil /api/sensordata/export/) dan
+MockGPIO sebagai pengganti RPi.GPIO untuk motor stepper.
+"""
+import abc
+import csv
+import json
+import random
+import statistics
+from collections import namedtuple
+from datetime import datetime
+
+ANALOG_FIELDS = (
+    "vibration_level", "motor_voltage", "motor_current",
+    "power_consumption", "bottle_mass", "bottle_brightness",
+)
+
+# values: dict nilai analog; new_good/new_bad: produk baru sejak pembacaan sebelumnya
+Sample = namedtuple("Sample", ["values", "new_good", "new_bad"])
+
+IDLE_VALUES = {field: 0 for field in ANALOG_FIELDS}
+
+
+class SensorSource(abc.ABC):
+    """Interface sumber data sensor"""
+
+    # Detik antar pembacaan; None = pakai sample_interval dari AgentConfig
+    interval = None
+
+    @abc.abstractmethod
+    def read(self, motor_running):
+        """Ambil satu pembacaan (Sample). Motor berhenti = nilai analog 0"""
+
+
+class RandomSource(SensorSource):
+    """Nilai sensor acak dalam rentang normal conveyor"""
+
+    def __init__(self, seed=None):
+        self._random = random.Random(seed)
+
+    def read(self, motor_running):
+        # Jika motor berhenti, semua nilai sensor 0 dan tidak ada produk baru
+        if not motor_running:
+            return Sample(dict(IDLE_VALUES), 0, 0)
+
+        rng = self._random
+        new_good = new_bad = 0
+        if rng.random() > 0.8:  # 20% peluang ada produk baru
+            if rng.random() > 0.7:  # 30% peluang produk buruk
+                new_bad = 1
+            else:
+                new_good = 1
+
+        return Sample({
+            "vibration_level": rng.randint(45, 55),
+            "motor_voltage": rng.randint(15, 19),
+            "motor_current": rng.randint(50, 60),
+            "power_consumption": round(60 + rng.random()*10, 1),
+            "bottle_mass": rng.randint(50, 58),
+            "bottle_brightness": rng.randint(70, 80),
+        }, new_good, new_bad)
+
+
+def _counter_delta(previous, current):
+    # Sama dengan sensor/production.py: counter yang turun berarti sudah di-reset
+    return current - previous if current >= previous else current
+
+
+def load_trace(path):
+    """Baca trace CSV atau NDJSON (format export server) menjadi list dict"""
+    with open(path, newline="") as f:
+        if path.endswith((".ndjson", ".jsonl")):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+class ReplaySource(SensorSource):
+    """Putar ulang trace rekaman dengan kecepatan 1x atau dipercepat.
+
+    Interval sampling = median jeda timestamp trace dibagi `speed`. Counter
+    good/bad di trace bersifat kumulatif dan diubah menjadi produk baru per
+    pembacaan, jadi reset counter di agent tetap berlaku. Timestamp yang dikirim
+    tetap waktu sekarang. Saat motor berhenti trace tidak maju.
+    """
+
+    def __init__(self, path, speed=1.0, loop=True, offset=0):
+        rows = load_trace(path)
+        if not rows:
+            raise ValueError(f"Trace kosong: {path}")
+        self.speed = speed
+        self.loop = loop
+        self._rows = [
+            ({field: float(row[field]) for field in ANALOG_FIELDS},
+             int(row["good_product"]), int(row["bad_product"]))
+            for row in rows
+        ]
+        self.interval = self._trace_interval(rows) / speed
+        self._position = offset % len(self._rows)  # Offset berbeda untuk tiap agent simulasi
+        self._previous = None  # Counter kumulatif pembacaan trace sebelumnya
+
+    @staticmethod
+    def _trace_interval(rows):
+        stamps = [datetime.fromisoformat(row["timestamp"]) for row in rows if row.get("timestamp")]
+        gaps = [(b - a).total_seconds() for a, b in zip(stamps, stamps[1:])]
+        gaps = [gap for gap in gaps if gap > 0]
+        return statistics.median(gaps) if gaps else 1.0
+
+    @property
+    def finished(self):
+        return not self.loop and self._position >= len(self._rows)
+
+    def read(self, motor_running):
+        if not motor_running or self.finished:
+            return Sample(dict(IDLE_VALUES), 0, 0)
+
+        values, good, bad = self._rows[self._position]
+        new_good = new_bad = 0
+        if self._previous is not None:
+            new_good = _counter_delta(self._previous[0], good)
+            new_bad = _counter_delta(self._previous[1], bad)
+        self._previous = (good, bad)
+
+        self._position += 1
+        if self.loop and self._position >= len(self._rows):
+            self._position = 0
+            self._previous = None  # Awal trace lagi, jangan hitung lompatan counter
+        return Sample(dict(values), new_good, new_bad)
+
+
+class MockGPIO:
+    """Pengganti modul RPi.GPIO tanpa hardware: hanya menyimpan state pin"""
+
+    BCM = "BCM"
+    OUT = "OUT"
+
+    def __init__(self):
+        self.mode = None
+        self.pins = {}
+        self.writes = 0
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction):
+        self.pins[pin] = 0
+
+    def output(self, pin, value):
+        self.pins[pin] = value
+        self.writes += 1
+
+    def cleanup(self):
+        self.pins.clear()
+
+
+def load_gpio(mock=False):
+    """Modul RPi.GPIO asli, atau MockGPIO jika mock=True"""
+    if mock:
+        return MockGPIO()
+    import RPi.GPIO as GPIO  # Hanya tersedia di Raspberry Pi
+    return GPIO
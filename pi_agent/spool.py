@@ -0,0 +1,121 @@
+import json
+import sqlite3
+import time
+from threading import Lock
+
+
+class Spool:
+    """Spool append-only di SQLite (WAL) untuk pembacaan yang gagal terkirim.
+
+    Kapasitas dibatasi max_rows; jika penuh, pembacaan tertua dibuang lebih dulu.
+    """
+
+    def __init__(self, path, max_rows):
+        self.max_rows = max_rows
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # AUTOINCREMENT: id tidak pernah dipakai ulang walaupun baris lama dihapus
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS readings ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " payload TEXT NOT NULL)"
+        )
+        # Nilai kecil yang harus bertahan walaupun agent restart (mis. generasi counter)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta ("
+            " key TEXT PRIMARY KEY,"
+            " value INTEGER NOT NULL)"
+        )
+        self._count = self._conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+
+    def __len__(self):
+        return self._count
+
+    def append_many(self, readings):
+        """Simpan pembacaan ke spool, buang yang tertua jika melewati kapasitas"""
+        if not readings:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO readings (payload) VALUES (?)",
+                    [(json.dumps(reading),) for reading in readings]
+                )
+                self._count += len(readings)
+                evicted = self._evict_locked()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._count = self._conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+                raise
+            return evicted
+
+    def _evict_locked(self):
+        excess = self._count - self.max_rows
+        if excess <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM readings WHERE id <= "
+            "(SELECT id FROM readings ORDER BY id LIMIT 1 OFFSET ?)",
+            (excess - 1,)
+        )
+        self._count -= excess
+        return excess
+
+    def peek(self, limit):
+        """Ambil maksimal `limit` pembacaan tertua sebagai list (id, reading)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM readings ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row_id, json.loads(payload)) for row_id, payload in rows]
+
+    def ack(self, last_id):
+        """Hapus semua pembacaan sampai dengan id tertentu (sudah diterima server)"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM readings WHERE id <= ?", (last_id,))
+            self._count = max(self._count - cursor.rowcount, 0)
+
+    def _bump_meta(self, key, compute):
+        """Baca nilai meta, simpan compute(nilai lama atau None), kembalikan nilai baru"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+                value = compute(row[0] if row else None)
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES (?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                    (key, value)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return value
+
+    def next_generation(self, key="counter_generation"):
+        """Naikkan dan kembalikan nomor generasi yang tersimpan.
+
+        Minimal sama dengan waktu epoch sekarang (detik), sehingga tetap naik
+        walaupun file spool hilang atau spool disimpan di memori.
+        """
+        return self._bump_meta(key, lambda stored: max((stored or 0) + 1, int(time.time())))
+
+    def reserve_sequence(self, count, key="sequence"):
+        """Cadangkan `count` nomor urut pembacaan, kembalikan nomor pertama.
+
+        Yang disimpan hanya batas akhir blok, jadi nomor tidak pernah dipakai
+        ulang walaupun agent restart (sisa blok dilewati). Minimal epoch sekarang
+        dalam milidetik: tetap naik walaupun spool hilang, selama agent tidak
+        memakai lebih dari 1000 nomor per detik.
+        """
+        end = self._bump_meta(key, lambda stored: max(stored or 0, int(time.time() * 1000)) + count)
+        return end - count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,167 @@
+import math
+import os
+import time
+from collections import deque
+from threading import Condition
+
+# time.sleep() di Linux bangun terlambat beberapa puluh sampai ratusan mikrodetik.
+# Keterlambatan itu diukur (rata-rata bergerak) dan sleep diakhiri sedini itu
+# sebelum deadline; sisanya, biasanya hanya beberapa mikrodetik, ditunggu dengan
+# busy-wait yang memegang GIL. Perkiraan awal dan batas atasnya (detik):
+SLEEP_OVERSHOOT = 0.0001
+MAX_OVERSHOOT = 0.0005
+OVERSHOOT_SMOOTHING = 0.05
+# Jumlah step terakhir yang dipakai untuk statistik laju dan jitter
+STATS_WINDOW = 2000
+
+
+class RunSwitch:
+    """Pengganti threading.Event untuk status motor (set = berhenti, clear = jalan).
+
+    Interface sama dengan Event (set/clear/is_set/wait), ditambah wait_clear()
+    sehingga thread bisa menunggu motor dijalankan lagi tanpa polling.
+    """
+
+    def __init__(self):
+        self._cond = Condition()
+        self._flag = False
+
+    def is_set(self):
+        return self._flag
+
+    def set(self):
+        with self._cond:
+            self._flag = True
+            self._cond.notify_all()
+
+    def clear(self):
+        with self._cond:
+            self._flag = False
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """Tunggu sampai di-set (motor berhenti)"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._flag, timeout)
+
+    def wait_clear(self, timeout=None):
+        """Tunggu sampai di-clear (motor jalan)"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._flag, timeout)
+
+
+class StepperEngine:
+    """Penggerak motor stepper dengan deadline monotonic dan ramp akselerasi.
+
+    Setiap step dijadwalkan pada deadline absolut (perf_counter, monotonic)
+    sehingga keterlambatan satu step tidak menumpuk ke step berikutnya.
+    Kecepatan naik/turun linear dengan percepatan `accel` (step/s^2) antara
+    `min_rate` dan `step_rate`; saat stop_event di-set motor melambat dulu
+    sebelum berhenti. Saat berhenti thread menunggu stop_event.wait_clear().
+    """
+
+    def __init__(self, output, pins, sequence, stop_event, step_rate=200.0, accel=400.0,
+                 min_rate=20.0, realtime=False):
+        self.output = output  # Fungsi output(pin, value), mis. GPIO.output
+        self.pins = pins
+        self.sequence = sequence
+        self.stop_event = stop_event
+        self.step_rate = step_rate
+        self.accel = accel
+        self.min_rate = min(min_rate, step_rate)
+        self.realtime = realtime
+
+        self.steps = 0
+        self.overruns = 0  # Step yang telat lebih dari satu periode (jadwal di-reset)
+        self.rate = 0.0    # Laju yang sedang dijadwalkan (step/s)
+        self._index = 0
+        self._overshoot = SLEEP_OVERSHOOT
+        self._history = deque(maxlen=STATS_WINDOW)  # (waktu step, keterlambatan)
+
+    def _tune_thread(self):
+        # Hanya thread ini; pengaturan interpreter (mis. sys.setswitchinterval) tidak diubah
+        if self.realtime:
+            try:
+                # pid 0 = thread pemanggil (Linux); butuh root
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(10))
+            except (AttributeError, PermissionError, OSError) as e:
+                print(f"Stepper realtime priority not available: {e}")
+
+    def _step(self):
+        pattern = self.sequence[self._index % len(self.sequence)]
+        for pin, value in zip(self.pins, pattern):
+            self.output(pin, value)
+        self._index += 1
+        self.steps += 1
+
+    def _ramp(self, rate, target):
+        # v^2 = v0^2 + 2a per step: percepatan konstan terhadap waktu
+        if rate < target:
+            return min(math.sqrt(rate * rate + 2 * self.accel), target)
+        if rate > target:
+            return max(math.sqrt(max(rate * rate - 2 * self.accel, 0.0)), target)
+        return rate
+
+    def _sleep_until(self, deadline):
+        remaining = deadline - time.perf_counter() - self._overshoot
+        if remaining > 0:
+            time.sleep(remaining)
+            late = time.perf_counter() - (deadline - self._overshoot)
+            self._overshoot += OVERSHOOT_SMOOTHING * (min(max(late, 0.0), MAX_OVERSHOOT) - self._overshoot)
+        while time.perf_counter() < deadline:
+            pass
+
+    def _run_until_stopped(self):
+        rate = self.min_rate
+        deadline = time.perf_counter()
+        while True:
+            stopping = self.stop_event.is_set()
+            if stopping and rate <= self.min_rate:
+                break
+            rate = self._ramp(rate, self.min_rate if stopping else self.step_rate)
+            self.rate = rate
+
+            self._sleep_until(deadline)
+            now = time.perf_counter()
+            self._step()
+            self._history.append((now, now - deadline))
+
+            period = 1.0 / rate
+            deadline += period
+            if now - deadline > period:
+                # Tertinggal jauh (mis. GC): jangan kejar dengan burst step
+                self.overruns += 1
+                deadline = now + period
+        self.rate = 0.0
+
+    def run(self):
+        """Target thread: jalan selama stop_event clear, tidur tanpa polling saat berhenti"""
+        print("Starting stepper motor thread")
+        self._tune_thread()
+        while True:
+            self.stop_event.wait_clear()
+            self._run_until_stopped()
+
+    def stats(self):
+        """Statistik step terakhir: laju terukur dan jitter (keterlambatan dari deadline)"""
+        history = list(self._history)
+        stats = {
+            "target_rate": self.step_rate,
+            "scheduled_rate": round(self.rate, 1),
+            "steps": self.steps,
+            "overruns": self.overruns,
+            "measured_rate": None,
+            "jitter_us": None,
+        }
+        if len(history) >= 2:
+            # Laju terukur = jumlah step dalam satu detik terakhir
+            now = time.perf_counter()
+            stats["measured_rate"] = sum(1 for at, _ in history if now - at <= 1.0)
+            lateness = sorted(late * 1e6 for _, late in history)
+            stats["jitter_us"] = {
+                "mean": round(sum(lateness) / len(lateness), 1),
+                "p50": round(lateness[len(lateness) // 2], 1),
+                "p99": round(lateness[min(int(len(lateness) * 0.99), len(lateness) - 1)], 1),
+                "max": round(lateness[-1], 1),
+            }
+        return stats
@@ -0,0 +1,225 @@
+"""Test agent Raspberry Pi, dijalankan dari root repo: python -m unittest pi_agent.tests"""
+import asyncio
+import math
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from .agent import Agent, AgentConfig
+from .counters import CounterState, Counts
+from .sources import ReplaySource
+from .spool import Spool
+from .stepper import RunSwitch, StepperEngine
+
+
+def reading(n):
+    return {"timestamp": f"2026-01-01T00:00:{n:02d}Z", "good_product": n, "bad_product": 0, "sequence": n}
+
+
+class SpoolTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "spool.db")
+
+    def open_spool(self, max_rows):
+        spool = Spool(self.path, max_rows)
+        self.addCleanup(spool.close)
+        return spool
+
+
+class SpoolTests(SpoolTestCase):
+    def test_evicts_oldest_past_max_rows(self):
+        spool = self.open_spool(max_rows=3)
+        self.assertEqual(spool.append_many([reading(n) for n in range(2)]), 0)
+        self.assertEqual(spool.append_many([reading(n) for n in range(2, 5)]), 2)
+        self.assertEqual(len(spool), 3)
+        self.assertEqual([item["sequence"] for _, item in spool.peek(10)], [2, 3, 4])
+
+        # Jumlah baris dibaca ulang dari file setelah restart
+        self.assertEqual(len(self.open_spool(max_rows=3)), 3)
+
+    def test_ack_removes_through_id(self):
+        spool = self.open_spool(max_rows=10)
+        spool.append_many([reading(n) for n in range(4)])
+        chunk = spool.peek(2)
+        spool.ack(chunk[-1][0])
+        self.assertEqual([item["sequence"] for _, item in spool.peek(10)], [2, 3])
+        self.assertEqual(len(spool), 2)
+
+
+class AgentLoopTests(SpoolTestCase, unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        super().setUp()
+        config = AgentConfig(device_id="line-1", server="server:8000", backfill_interval=0, verbose=False)
+        self.agent = Agent(config, RunSwitch(), self.open_spool(max_rows=100))
+        self.agent.post_batch = mock.AsyncMock()
+
+    async def run_upload(self, *batches):
+        """Jalankan upload_loop untuk `batches` lalu hentikan"""
+        self.agent.buffer.take_batch = mock.AsyncMock(side_effect=[*batches, asyncio.CancelledError()])
+        with self.assertRaises(asyncio.CancelledError):
+            await self.agent.upload_loop()
+
+    async def run_backfill(self, calls):
+        """Jalankan backfill_loop sampai post_batch dipanggil `calls` kali"""
+        task = asyncio.create_task(self.agent.backfill_loop())
+        try:
+            while self.agent.post_batch.await_count < calls:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.01)  # ack chunk terakhir
+        finally:
+            task.cancel()
+
+    async def test_failed_batch_is_spooled_and_retried(self):
+        batch = [reading(n) for n in range(3)]
+        self.agent.registered.set()
+        self.agent.post_batch.side_effect = [
+            OSError("server unreachable"),  # upload_loop
+            (503, "maintenance"),           # backfill pertama gagal, chunk tetap di spool
+            (204, ""),
+        ]
+        await self.run_upload(batch)
+        self.assertEqual(len(self.agent.spool), 3)
+        self.assertFalse(self.agent.server_online.is_set())
+
+        self.agent.server_online.set()
+        await self.run_backfill(calls=3)
+        self.assertEqual([call.args[0] for call in self.agent.post_batch.await_args_list[1:]], [batch, batch])
+        self.assertEqual(len(self.agent.spool), 0)
+        self.assertEqual(self.agent.sent_readings, 3)
+
+    async def test_unregistered_device_keeps_batch(self):
+        rejected, invalid = [reading(1), reading(2)], [reading(3)]
+        self.agent.registered.set()
+        self.agent.post_batch.side_effect = [(403, "device 'line-1' tidak terdaftar"), (400, "field wajib diisi")]
+        await self.run_upload(rejected)
+        self.assertFalse(self.agent.registered.is_set())  # power_loop akan mendaftar ulang
+        self.agent.registered.set()
+        await self.run_upload(invalid)
+        self.assertEqual([item for _, item in self.agent.spool.peek(10)], rejected)
+
+    async def test_backfill_waits_for_registration(self):
+        self.agent.spool.append_many([reading(1)])
+        self.agent.registered.set()
+        self.agent.server_online.set()
+        self.agent.post_batch.side_effect = [(404, "not registered")]
+        await self.run_backfill(calls=1)
+        self.assertEqual(len(self.agent.spool), 1)
+        self.assertFalse(self.agent.registered.is_set())
+        self.assertFalse(self.agent.server_online.is_set())
+
+
+
+class CounterStateTests(unittest.TestCase):
+    def test_reset_starts_new_generation(self):
+        counters = CounterState(generation=7)
+        self.assertEqual(counters.add(good=2, bad=1), Counts(2, 1, 7))
+        self.assertEqual(counters.reset(), Counts(0, 0, 8))
+        # Generation dari spool lebih kecil (mis. jam mundur) tetap dinaikkan
+        self.assertEqual(counters.reset(generation=3), Counts(0, 0, 9))
+        self.assertEqual(counters.reset(generation=100), Counts(0, 0, 100))
+        self.assertEqual(counters.snapshot(), Counts(0, 0, 100))
+
+    def test_concurrent_adds_are_not_lost(self):
+        counters = CounterState(generation=1)
+        snapshot = counters.snapshot()
+
+        def worker():
+            for _ in range(1000):
+                counters.add(good=1)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counters.snapshot(), Counts(4000, 0, 1))
+        self.assertEqual(snapshot, Counts(0, 0, 1))  # Snapshot lama tidak ikut berubah
+
+class StepperEngineTests(unittest.TestCase):
+    def setUp(self):
+        self.writes = []
+        self.stop = RunSwitch()
+        self.engine = StepperEngine(
+            lambda pin, value: self.writes.append((pin, value)), (17, 18), [(1, 0), (0, 1)], self.stop,
+            step_rate=2000.0, accel=1e6, min_rate=500.0,
+        )
+
+    def test_ramp_between_min_and_target_rate(self):
+        rates = [self.engine.min_rate]
+        while rates[-1] < self.engine.step_rate:
+            rates.append(self.engine._ramp(rates[-1], self.engine.step_rate))
+        self.assertEqual(rates, sorted(rates))
+        self.assertEqual(rates[-1], self.engine.step_rate)
+        self.assertEqual(self.engine._ramp(rates[-1], self.engine.min_rate), math.sqrt(2000.0 ** 2 - 2e6))
+
+    def test_steps_in_sequence_until_stopped(self):
+        thread = threading.Thread(target=self.engine._run_until_stopped)
+        started = time.perf_counter()
+        thread.start()
+        time.sleep(0.05)
+        self.stop.set()
+        thread.join(2)
+        elapsed = time.perf_counter() - started
+        self.assertFalse(thread.is_alive())
+
+        steps = self.engine.steps
+        self.assertGreater(steps, 10)
+        self.assertEqual(self.engine.rate, 0.0)
+        pattern = [[(17, 1), (18, 0)], [(17, 0), (18, 1)]]
+        self.assertEqual(self.writes, [write for index in range(steps) for write in pattern[index % 2]])
+        # Deadline absolut: tidak pernah lebih cepat dari step_rate
+        self.assertLessEqual(steps, self.engine.step_rate * elapsed + 1)
+
+
+
+class ReplaySourceTests(unittest.TestCase):
+    # Trace export server: timestamp 2 detik, counter kumulatif (reset di baris ketiga)
+    TRACE = [
+        ("2026-01-01T00:00:00+00:00", 1.0, 10, 1),
+        ("2026-01-01T00:00:02+00:00", 2.0, 12, 1),
+        ("2026-01-01T00:00:04+00:00", 3.0, 1, 0),
+        ("2026-01-01T00:00:06+00:00", 4.0, 4, 2),
+    ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "trace.csv")
+        fields = ("vibration_level", "motor_voltage", "motor_current",
+                  "power_consumption", "bottle_mass", "bottle_brightness")
+        with open(self.path, "w") as f:
+            f.write(",".join(("timestamp", *fields, "good_product", "bad_product")) + "\n")
+            for timestamp, value, good, bad in self.TRACE:
+                f.write(",".join((timestamp, *[str(value)] * len(fields), str(good), str(bad))) + "\n")
+
+    def replay(self, source, count):
+        samples = [source.read(True) for _ in range(count)]
+        return [(sample.values["motor_current"], sample.new_good, sample.new_bad) for sample in samples]
+
+    def test_plays_rows_in_order_and_loops(self):
+        source = ReplaySource(self.path, speed=2.0)
+        self.assertEqual(source.interval, 1.0)
+        self.assertEqual(self.replay(source, 6), [
+            (1.0, 0, 0), (2.0, 2, 0), (3.0, 1, 0), (4.0, 3, 2),
+            (1.0, 0, 0), (2.0, 2, 0),  # Awal trace lagi: lompatan counter tidak dihitung
+        ])
+
+    def test_stopped_motor_does_not_advance(self):
+        source = ReplaySource(self.path, offset=1)
+        self.assertEqual(source.read(False).values["motor_current"], 0)
+        self.assertEqual(self.replay(source, 1), [(2.0, 0, 0)])
+
+    def test_without_loop_finishes(self):
+        source = ReplaySource(self.path, loop=False)
+        self.replay(source, len(self.TRACE))
+        self.assertTrue(source.finished)
+        self.assertEqual(self.replay(source, 1), [(0, 0, 0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
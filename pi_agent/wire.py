@@ -0,0 +1,69 @@
+import struct
+from datetime import datetime, timezone
+
+# Format biner pembacaan sensor, HARUS sama dengan sensor_api/sensor/wire.py.
+#
+# Header : magic "SD", versi (uint8), reserved (uint8), jumlah record (uint16),
+#          panjang device id (uint8) lalu device id (UTF-8)
+# Record : timestamp epoch detik (float64), 6 nilai analog (float64),
+#          good_product, bad_product, power_system, counter_generation (uint32),
+#          sequence (uint64) dan flags (uint8); counter_generation/sequence
+#          0 = tidak diketahui. Hanya jika flags & FLAG_AGGREGATED (baris gabungan
+#          edge) diikuti sample_count (uint32) dan min/max/mean 6 nilai analog
+#          (18 float64), jadi baris tunggal tetap kecil. Jika flags & FLAG_WINDOW
+#          diikuti waktu pembacaan pertama jendela (epoch detik) dan jarak antar
+#          pembacaan (detik), keduanya float64.
+MEDIA_TYPE = "application/x-sensor-reading"
+MAGIC = b"SD"
+VERSION = 5
+HEADER = struct.Struct("<2sBBHB")
+RECORD = struct.Struct("<7d4IQB")
+AGGREGATE = struct.Struct("<I18d")
+WINDOW = struct.Struct("<2d")
+FLAG_AGGREGATED = 0x01
+FLAG_WINDOW = 0x02
+MAX_RECORDS = 0xFFFF
+
+ANALOG_FIELDS = (
+    "vibration_level", "motor_voltage", "motor_current",
+    "power_consumption", "bottle_mass", "bottle_brightness",
+)
+
+
+def _epoch(timestamp):
+    parsed = datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%SZ")
+    return parsed.replace(tzinfo=timezone.utc).timestamp()
+
+
+def encode_readings(readings):
+    """Encode list pembacaan (dict) dari satu device menjadi bytes"""
+    if len(readings) > MAX_RECORDS:
+        raise ValueError(f"Maksimal {MAX_RECORDS} pembacaan per batch")
+    device = (readings[0].get("device") or "").encode("utf-8") if readings else b""
+    parts = [HEADER.pack(MAGIC, VERSION, 0, len(readings), len(device)), device]
+    for reading in readings:
+        values = [float(reading[field]) for field in ANALOG_FIELDS]
+        sample_count = reading.get("sample_count") or 1
+        window = reading.get("window_start") is not None and reading.get("sample_interval") is not None
+        parts.append(RECORD.pack(
+            _epoch(reading["timestamp"]),
+            *values,
+            reading["good_product"],
+            reading["bad_product"],
+            reading["power_system"],
+            reading.get("counter_generation") or 0,  # Pembacaan lama di spool belum punya generation
+            reading.get("sequence") or 0,  # Pembacaan spool dari agent lama belum punya sequence
+            (FLAG_AGGREGATED if sample_count > 1 else 0) | (FLAG_WINDOW if window else 0),
+        ))
+        if sample_count > 1:
+            summary = reading.get("summary") or {}
+            parts.append(AGGREGATE.pack(
+                sample_count,
+                *(stat for field, value in zip(ANALOG_FIELDS, values)
+                  for stat in summary.get(field, (value, value, value))),
+            ))
+        if window:
+            parts.append(WINDOW.pack(
+                datetime.fromisoformat(reading["window_start"]).timestamp(), reading["sample_interval"]
+            ))
+    return b"".join(parts)
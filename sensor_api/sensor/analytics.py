@@ -0,0 +1,342 @@
+"""Deteksi anomali getaran dan arus motor (indikasi keausan motor).
+
+Data beberapa device dimuat sekaligus ke array NumPy berbentuk
+(device, waktu, metrik) yang rata kanan (sampel terbaru di kolom terakhir,
+bagian kiri yang kosong ditandai mask). Semua detektor dihitung vektor untuk
+seluruh device dan metrik sekaligus:
+
+- zscore: jarak sampel dari mean/std rolling window sebelumnya
+- ewma: control chart EWMA terhadap baseline rolling (mendeteksi drift pelan)
+- spectral: energi band frekuensi tinggi getaran per frame dibanding median frame sebelumnya
+
+Sampel saat motor berhenti (motor_current 0) tidak dinilai dan tidak ikut
+baseline. Baseline z-score/EWMA dimulai ulang setiap motor menyala, jadi
+lonjakan saat start dibandingkan dengan sampel sejak start itu saja.
+
+Pemrosesan incremental: baris dengan id > high-water mark, ditambah baris di
+ID_MARGIN id terakhir di bawahnya yang belum pernah terlihat (transaksi ingest
+bersamaan bisa commit tidak urut id), yang bisa menghasilkan alert. Riwayat
+secukupnya per device dimuat sebagai konteks.
+"""
+import bisect
+from dataclasses import dataclass
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+
+from .models import AnomalyAlert, SensorData
+
+METRICS = ('vibration_level', 'motor_current', 'motor_voltage')
+
+ZSCORE_WINDOW = 60            # Sampel (~1 menit pada 1 Hz)
+ZSCORE_THRESHOLD = 5.0
+EWMA_ALPHA = 0.05
+EWMA_BASELINE = 600           # Window baseline mean/std untuk control chart EWMA
+EWMA_THRESHOLD = 5.0
+EWMA_BLOCK = 256              # Panjang blok bentuk tertutup EWMA (hindari overflow)
+SPECTRAL_METRIC = 'vibration_level'
+SPECTRAL_FRAME = 64
+SPECTRAL_HISTORY = 16         # Jumlah frame pembanding
+SPECTRAL_BAND = (0.25, 0.5)   # Cycles per sampel (= Hz pada sampling 1 Hz)
+SPECTRAL_FACTOR = 4.0
+
+# Alert dengan device/metrik/detektor sama dalam rentang ini digabung
+ALERT_COOLDOWN = timedelta(minutes=5)
+
+# Jumlah id di bawah high-water mark yang dipindai ulang untuk baris yang
+# commit terlambat (beberapa batch ingest bersamaan, masing-masing <= INSERT_CHUNK baris)
+ID_MARGIN = 5000
+
+# Riwayat per device yang dimuat sebagai konteks untuk window terpanjang
+CONTEXT = max(ZSCORE_WINDOW, EWMA_BASELINE, SPECTRAL_FRAME * SPECTRAL_HISTORY)
+
+_COLUMNS = ('id', 'device_id', 'timestamp', *METRICS)
+
+
+@dataclass
+class Window:
+    devices: list        # device_id per baris array
+    values: np.ndarray   # (device, waktu, metrik), posisi tidak valid diisi sampel valid berikutnya
+    valid: np.ndarray    # (device, waktu) True jika berisi sampel dengan motor berjalan
+    since: np.ndarray    # (device, waktu) kolom awal motor menyala (awal baseline)
+    new: np.ndarray      # (device, waktu) True jika sampel belum pernah diproses
+    timestamps: np.ndarray  # (device, waktu) object datetime
+    tails: dict          # device_id -> CONTEXT baris terakhir, konteks untuk batch berikutnya
+
+
+def build_window(context_rows, new_rows):
+    """Susun baris values_list(*_COLUMNS) menjadi Window, tanpa loop per baris di Python"""
+    rows = context_rows + new_rows
+    is_new = np.zeros(len(rows), dtype=bool)
+    is_new[len(context_rows):] = True
+
+    device_ids = [row[1] for row in rows]
+    devices = sorted(set(device_ids), key=lambda device: (device is None, device or ''))
+    device_index = {device: index for index, device in enumerate(devices)}
+
+    dev = np.fromiter((device_index[device] for device in device_ids), dtype=np.int64, count=len(rows))
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    ts = np.fromiter((row[2].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+    data = np.array([row[3:] for row in rows], dtype=np.float64).reshape(len(rows), len(METRICS))
+    stamps = np.empty(len(rows), dtype=object)
+    stamps[:] = [row[2] for row in rows]
+
+    # Urutkan per device lalu per waktu; data backfill bisa datang terlambat
+    order = np.lexsort((ids, ts, dev))
+    dev, data, stamps, is_new = dev[order], data[order], stamps[order], is_new[order]
+
+    counts = np.bincount(dev, minlength=len(devices))
+    length = int(counts.max())
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    ends = starts + counts
+    tails = {
+        device: [rows[i] for i in order[max(start, end - CONTEXT):end]]
+        for device, start, end in zip(devices, starts, ends)
+    }
+    position = np.arange(len(rows)) - starts[dev]
+    column = length - counts[dev] + position   # Rata kanan
+
+    values = np.full((len(devices), length, len(METRICS)), np.nan)
+    valid = np.zeros((len(devices), length), dtype=bool)
+    new = np.zeros((len(devices), length), dtype=bool)
+    timestamps = np.empty((len(devices), length), dtype=object)
+    values[dev, column] = data
+    new[dev, column] = is_new
+    timestamps[dev, column] = stamps
+    # Motor berhenti: semua pembacaan 0, bukan sampel untuk baseline maupun alert
+    valid[dev, column] = data[:, METRICS.index('motor_current')] > 0
+
+    # Isi posisi tidak valid (bagian kosong di kiri, motor berhenti) dengan sampel
+    # valid berikutnya, agar EWMA mulai dari nilai itu setiap motor menyala
+    columns = np.arange(length)
+    after = np.minimum.accumulate(np.where(valid, columns, length)[:, ::-1], axis=1)[:, ::-1]
+    before = np.maximum.accumulate(np.where(valid, columns, -1), axis=1)
+    source = np.where(after < length, after, np.where(before >= 0, before, columns))
+    values = np.take_along_axis(values, source[:, :, None], axis=1)
+
+    switched_on = valid & ~np.concatenate([np.zeros_like(valid[:, :1]), valid[:, :-1]], axis=1)
+    since = np.maximum.accumulate(np.where(switched_on, columns, 0), axis=1)
+    return Window(devices, values, valid, since, new, timestamps, tails)
+
+
+def _prefix(array):
+    zeros = np.zeros_like(array[:, :1])
+    return np.concatenate([zeros, np.cumsum(array, axis=1)], axis=1)
+
+
+def rolling_mean_std(values, valid, window, since):
+    """Mean/std rolling atas `window` sampel SEBELUM tiap titik (titik itu sendiri tidak ikut).
+
+    `since` (device, waktu): kolom pertama yang boleh masuk window (awal baseline).
+    Return (mean, std, n); n = jumlah sampel valid di window.
+    """
+    mask = valid[:, :, None]
+    filled = np.where(mask, values, 0.0)
+    sum1 = _prefix(filled)
+    sum2 = _prefix(filled * filled)
+    count = _prefix(mask.astype(np.float64))
+
+    end = np.arange(values.shape[1])
+    start = np.maximum(end - window, since)[:, :, None]
+
+    def window_sum(prefix):
+        return prefix[:, end] - np.take_along_axis(prefix, start, axis=1)
+
+    n = window_sum(count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = window_sum(sum1) / n
+        var = window_sum(sum2) / n - mean * mean
+    return mean, np.sqrt(np.clip(var, 0.0, None)), n
+
+
+def ewma(values, alpha=EWMA_ALPHA, block=EWMA_BLOCK):
+    """EWMA sepanjang sumbu waktu (adjust=False), dihitung per blok dalam bentuk tertutup.
+
+    Dalam satu blok: s_t = d^(t+1) * s_awal + alpha * d^t * cumsum(x_i * d^-i), d = 1 - alpha.
+    Loop hanya per blok, seluruh device dan metrik dihitung sekaligus.
+    """
+    decay = 1.0 - alpha
+    result = np.empty_like(values)
+    state = values[:, 0]
+    for start in range(0, values.shape[1], block):
+        chunk = values[:, start:start + block]
+        steps = np.arange(chunk.shape[1], dtype=np.float64)[None, :, None]
+        weighted = np.cumsum(chunk * decay ** -steps, axis=1)
+        result[:, start:start + block] = decay ** (steps + 1) * state[:, None] + alpha * decay ** steps * weighted
+        state = result[:, start + chunk.shape[1] - 1]
+    return result
+
+
+def zscore_scores(window):
+    mean, std, n = rolling_mean_std(window.values, window.valid, ZSCORE_WINDOW, window.since)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = (window.values - mean) / std
+    score[(n < ZSCORE_WINDOW // 2) | (std == 0)] = np.nan
+    return score
+
+
+def ewma_scores(window):
+    smoothed = ewma(window.values)
+    mean, std, n = rolling_mean_std(window.values, window.valid, EWMA_BASELINE, window.since)
+    sigma = std * np.sqrt(EWMA_ALPHA / (2.0 - EWMA_ALPHA))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = (smoothed - mean) / sigma
+    score[(n < EWMA_BASELINE // 2) | (std == 0)] = np.nan
+    return score, smoothed
+
+
+def spectral_scores(window):
+    """Rasio energi band per frame terhadap median frame sebelumnya.
+
+    Return (score, energy) berbentuk (device, frame) dan index kolom akhir tiap frame.
+    """
+    metric = METRICS.index(SPECTRAL_METRIC)
+    length = window.values.shape[1]
+    frames = length // SPECTRAL_FRAME
+    if frames < 2:
+        return None
+    offset = length - frames * SPECTRAL_FRAME
+    series = window.values[:, offset:, metric].reshape(-1, frames, SPECTRAL_FRAME)
+    complete = window.valid[:, offset:].reshape(-1, frames, SPECTRAL_FRAME).all(axis=2)
+
+    series = (series - series.mean(axis=2, keepdims=True)) * np.hanning(SPECTRAL_FRAME)
+    power = np.abs(np.fft.rfft(series, axis=2)) ** 2
+    freqs = np.fft.rfftfreq(SPECTRAL_FRAME)
+    band = (freqs >= SPECTRAL_BAND[0]) & (freqs <= SPECTRAL_BAND[1])
+    energy = np.where(complete, power[:, :, band].sum(axis=2) / SPECTRAL_FRAME, np.nan)
+
+    # Baseline = median energi frame-frame sebelumnya (maks. SPECTRAL_HISTORY)
+    padded = np.concatenate([np.full((energy.shape[0], SPECTRAL_HISTORY), np.nan), energy], axis=1)
+    history = np.lib.stride_tricks.sliding_window_view(padded, SPECTRAL_HISTORY, axis=1)[:, :frames]
+    enough = (~np.isnan(history)).sum(axis=2) >= 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        baseline = np.nanmedian(np.where(enough[:, :, None], history, 0.0), axis=2)
+        score = energy / baseline
+    score[~enough | (baseline == 0)] = np.nan
+    ends = offset + np.arange(1, frames + 1) * SPECTRAL_FRAME - 1
+    return score, energy, ends
+
+
+def detect(window):
+    """Jalankan semua detektor, return list dict kandidat alert (hanya untuk sampel baru)"""
+    found = []
+    metrics = np.array(METRICS)
+
+    def collect(flags, detector, value, score):
+        device, column, metric = np.nonzero(flags)
+        for d, c, m in zip(device, column, metric):
+            found.append({
+                "device_id": window.devices[d],
+                "timestamp": window.timestamps[d, c],
+                "metric": str(metrics[m]),
+                "detector": detector,
+                "value": float(value[d, c, m]),
+                "score": float(score[d, c, m]),
+            })
+
+    new = (window.new & window.valid)[:, :, None]
+    with np.errstate(invalid='ignore'):
+        z = zscore_scores(window)
+        collect(new & (np.abs(z) > ZSCORE_THRESHOLD), AnomalyAlert.DETECTOR_ZSCORE, window.values, z)
+        e, smoothed = ewma_scores(window)
+        collect(new & (np.abs(e) > EWMA_THRESHOLD), AnomalyAlert.DETECTOR_EWMA, smoothed, e)
+
+        spectral = spectral_scores(window)
+        if spectral is not None:
+            score, energy, ends = spectral
+            frame_new = window.new[:, ends]
+            flags = frame_new & (score > SPECTRAL_FACTOR)
+            for d, f in zip(*np.nonzero(flags)):
+                found.append({
+                    "device_id": window.devices[d],
+                    "timestamp": window.timestamps[d, ends[f]],
+                    "metric": SPECTRAL_METRIC,
+                    "detector": AnomalyAlert.DETECTOR_SPECTRAL,
+                    "value": float(energy[d, f]),
+                    "score": float(score[d, f]),
+                })
+    return found
+
+
+# Konteks per device dari batch sebelumnya di proses ini (mode --loop), agar
+# riwayat tidak dimuat ulang dari DB setiap putaran. Hanya valid untuk after_id yang sama.
+_tails = {"last_id": None, "rows": {}, "seen": set()}
+
+
+def load_window(after_id, limit):
+    """Muat baris baru (id > after_id, maks. limit) plus konteks riwayat per device.
+
+    Baris di ID_MARGIN id terakhir sampai after_id yang belum terlihat di proses
+    ini (commit terlambat, atau semua setelah restart) ikut dimuat sebagai baris
+    baru; alert ganda dari baris yang sudah pernah diproses dicegah save_alerts.
+    Return (Window atau None, id terbesar yang dimuat).
+    """
+    same_run = _tails["last_id"] == after_id
+    seen = _tails["seen"] if same_run else set()
+    margin = SensorData.objects.filter(id__gt=max(after_id - ID_MARGIN, 0), id__lte=after_id)
+    late_ids = set(margin.values_list('id', flat=True)) - seen
+    late_rows = list(margin.filter(id__in=late_ids).order_by('id').values_list(*_COLUMNS)) if late_ids else []
+    new_rows = late_rows + list(
+        SensorData.objects.filter(id__gt=after_id).order_by('id').values_list(*_COLUMNS)[:limit]
+    )
+    if not new_rows:
+        return None, after_id
+
+    new_ids = {row[0] for row in new_rows}
+    cached = _tails["rows"] if same_run else {}
+    context_rows = []
+    for device in {row[1] for row in new_rows}:
+        if device in cached:
+            context_rows.extend(row for row in cached[device] if row[0] not in new_ids)
+            continue
+        # Memakai index (device_id, timestamp, id)
+        queryset = SensorData.objects.filter(id__lte=after_id, device_id=device)
+        if device is None:
+            queryset = SensorData.objects.filter(id__lte=after_id, device__isnull=True)
+        late = sum(1 for row in late_rows if row[1] == device)
+        rows = queryset.order_by('-timestamp', '-id').values_list(*_COLUMNS)[:CONTEXT + late]
+        context_rows.extend(row for row in rows if row[0] not in new_ids)
+
+    window = build_window(context_rows, new_rows)
+    last_id = max(after_id, new_rows[-1][0])
+    _tails["last_id"] = last_id
+    _tails["rows"] = {**cached, **window.tails}
+    _tails["seen"] = {row_id for row_id in seen | new_ids if row_id > last_id - ID_MARGIN}
+    return window, last_id
+
+
+def save_alerts(candidates):
+    """Simpan kandidat alert, lewati yang masih dalam cooldown alert lain (tersimpan atau baru)"""
+    if not candidates:
+        return []
+    candidates = sorted(candidates, key=lambda item: item["timestamp"])
+    existing = {}
+    for *key, timestamp in AnomalyAlert.objects.filter(
+        timestamp__gt=candidates[0]["timestamp"] - ALERT_COOLDOWN,
+        timestamp__lt=candidates[-1]["timestamp"] + ALERT_COOLDOWN,
+    ).order_by('timestamp').values_list('device_id', 'metric', 'detector', 'timestamp'):
+        existing.setdefault(tuple(key), []).append(timestamp)
+
+    alerts = []
+    for item in candidates:
+        times = existing.setdefault((item["device_id"], item["metric"], item["detector"]), [])
+        # Alert terdekat sebelum/sesudah (baris terlambat bisa berada di antara alert lama)
+        index = bisect.bisect_left(times, item["timestamp"])
+        if any(abs(item["timestamp"] - times[i]) < ALERT_COOLDOWN for i in (index - 1, index) if 0 <= i < len(times)):
+            continue
+        times.insert(index, item["timestamp"])
+        alerts.append(AnomalyAlert(**item))
+    return AnomalyAlert.objects.bulk_create(alerts)
+
+
+def process_new_data(checkpoint, limit):
+    """Proses satu batch data baru setelah checkpoint. Return (jumlah baris, alert baru)"""
+    window, last_id = load_window(checkpoint.last_id, limit)
+    if window is None:
+        return 0, []
+    with transaction.atomic():
+        alerts = save_alerts(detect(window))
+        checkpoint.last_id = last_id
+        checkpoint.save(update_fields=['last_id', 'updated_at'])
+    return int(window.new.sum()), alerts
@@ -0,0 +1,166 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from . import metrics
+from .models import PowerCommand, PowerSystem
+
+COMMAND_TIMEOUT = 5          # Timeout per percobaan (detik)
+COMMAND_MAX_ATTEMPTS = 3     # Jumlah percobaan sebelum perintah dianggap gagal
+COMMAND_BACKOFF = 0.5        # Jeda awal retry, dikali 2 setiap percobaan
+BREAKER_THRESHOLD = 3        # Kegagalan berturut-turut sebelum circuit breaker terbuka
+BREAKER_RESET = 30           # Lama circuit terbuka sebelum dicoba lagi (detik)
+
+
+class CircuitBreaker:
+    """Circuit breaker sederhana: closed -> open setelah N gagal -> half-open setelah jeda"""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            # Half-open: izinkan satu percobaan setelah reset_timeout
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class DeviceChannel:
+    """Koneksi keep-alive, antrian perintah dan circuit breaker untuk satu Raspberry Pi.
+
+    Satu worker per device: perintah ke Pi yang sama dikirim berurutan, dan Pi
+    yang mati hanya menahan antriannya sendiri.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.breaker = CircuitBreaker()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='power-command')
+
+    def send(self, status_value):
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = self.session.post(
+                f"{self.base_url}/control-power",
+                json={"status": status_value},
+                timeout=COMMAND_TIMEOUT
+            )
+            outcome = f"{response.status_code // 100}xx"
+            return response
+        except requests.Timeout:
+            outcome = 'timeout'
+            raise
+        finally:
+            metrics.outbound_duration.observe(time.perf_counter() - started, self.base_url, outcome)
+
+    def close(self):
+        """Hentikan worker setelah antrian yang tersisa terkirim, lalu tutup session"""
+        self.executor.submit(self.session.close)
+        self.executor.shutdown(wait=False)
+
+
+class CommandDispatcher:
+    """Satu DeviceChannel per device (None = RASPBERRY_PI_URL di settings).
+
+    Jika alamat device berubah, channel lama ditutup dan diganti sehingga
+    thread dan session per alamat lama tidak menumpuk.
+    """
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def _channel(self, base_url, device_id):
+        base_url = base_url.rstrip('/')
+        channel = self._channels.get(device_id)
+        if channel is None or channel.base_url != base_url:
+            if channel is not None:
+                channel.close()
+            channel = self._channels[device_id] = DeviceChannel(base_url)
+        return channel
+
+    def submit(self, command_id, base_url, device_id=None):
+        """Antrikan perintah; langsung kembali tanpa menunggu Raspberry Pi"""
+        # Submit di dalam lock: channel tidak bisa ditutup thread lain sebelum perintah masuk antrian
+        with self._lock:
+            channel = self._channel(base_url, device_id)
+            return channel.executor.submit(self._run, command_id, channel)
+
+    def _run(self, command_id, channel):
+        close_old_connections()
+        try:
+            self._deliver(PowerCommand.objects.get(pk=command_id), channel)
+        except Exception as e:
+            print(f"Power command {command_id} crashed: {str(e)}")
+        finally:
+            connection.close()
+
+    def _deliver(self, command, channel):
+        status_value = int(command.status)
+        error = ""
+
+        for attempt in range(1, COMMAND_MAX_ATTEMPTS + 1):
+            if not channel.breaker.allow():
+                error = "Circuit breaker open: Raspberry Pi dianggap offline"
+                break
+
+            command.attempts = attempt
+            try:
+                response = channel.send(status_value)
+            except requests.RequestException as e:
+                error = f"Communication error with Raspberry Pi: {str(e)}"
+            else:
+                if response.status_code == 200:
+                    channel.breaker.record_success()
+                    # Simpan status ke database setelah Raspberry Pi mengonfirmasi
+                    command.power_system = PowerSystem.objects.create(
+                        timestamp=timezone.now(),
+                        status=command.status,
+                        device_id=command.device_id,
+                        reason="Manual activation" if command.status else "Manual deactivation"
+                    )
+                    command.state = PowerCommand.STATE_ACKED
+                    command.error = ""
+                    command.save()
+                    print(f"Power command {command.id} acknowledged: power_system={command.power_system.id}")
+                    return
+                error = f"Failed to send command to Raspberry Pi: {response.status_code} - {response.text[:200]}"
+                if 400 <= response.status_code < 500:
+                    # Perintah ditolak, percuma diulang
+                    break
+
+            channel.breaker.record_failure()
+            if attempt < COMMAND_MAX_ATTEMPTS:
+                time.sleep(COMMAND_BACKOFF * 2 ** (attempt - 1))
+
+        command.state = PowerCommand.STATE_FAILED
+        command.error = error[:255]
+        command.save()
+        print(f"Power command {command.id} failed: {error}")
+
+
+dispatcher = CommandDispatcher()
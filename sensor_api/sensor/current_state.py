@@ -0,0 +1,145 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import PowerSystem, SensorData
+
+# Snapshot "current state" disimpan terpisah per tabel dan per device agar
+# penulis data sensor dan penulis status daya tidak saling menimpa.
+SENSOR_KEY = 'current_state:sensor:{}'
+POWER_KEY = 'current_state:power:{}'
+ALL = '*'           # Data terbaru dari device mana pun
+BROADCAST = '-'     # Status daya tanpa device (berlaku untuk semua device)
+
+# Penanda partisi kosong, supaya tidak query DB berulang kali
+MISSING = {"data": None, "order": None, "etag": "0"}
+
+SENSOR_FIELDS = [
+    'vibration_level', 'motor_voltage', 'motor_current', 'power_consumption',
+    'bottle_mass', 'bottle_brightness', 'good_product', 'bad_product',
+]
+
+
+def _entry(data, order_key):
+    encoded = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()
+    return {
+        "data": data,
+        "order": order_key,
+        "etag": hashlib.md5(encoded).hexdigest()[:16],
+    }
+
+
+def sensor_entry(sensor):
+    data = {"id": sensor.id, "device": sensor.device_id}
+    for field in SENSOR_FIELDS:
+        data[field] = getattr(sensor, field)
+    return _entry(data, (sensor.timestamp, sensor.id or 0))
+
+
+def power_entry(power):
+    return _entry({"status": power.status, "reason": power.reason}, power.id)
+
+
+# Snapshot disimpan tanpa batas waktu, jadi selalu dimuat dari primary:
+# data dari replica yang tertinggal tidak akan pernah terkoreksi.
+def _load_sensor(scope):
+    queryset = SensorData.objects.using(DEFAULT_DB_ALIAS)
+    if scope != ALL:
+        queryset = queryset.filter(device_id=scope)
+    return sensor_entry(queryset.latest('timestamp'))
+
+
+def _load_power(scope):
+    queryset = PowerSystem.objects.using(DEFAULT_DB_ALIAS)
+    if scope == BROADCAST:
+        queryset = queryset.filter(device__isnull=True)
+    elif scope != ALL:
+        queryset = queryset.filter(device_id=scope)
+    return power_entry(queryset.latest('id'))
+
+
+def _cached_or_load(cached, key, loader, scope):
+    entry = cached.get(key)
+    if entry is None:
+        try:
+            entry = loader(scope)
+        except (SensorData.DoesNotExist, PowerSystem.DoesNotExist):
+            entry = MISSING
+        cache.set(key, entry, None)
+    return entry
+
+
+def get_current_state(device=None):
+    """Kembalikan (sensor_entry, power_entry) dari cache, isi dari DB jika kosong.
+
+    Dengan device, status daya = yang terbaru antara milik device itu dan broadcast.
+    Raise SensorData.DoesNotExist / PowerSystem.DoesNotExist jika belum ada data.
+    """
+    sensor_scope = device or ALL
+    power_scopes = [device, BROADCAST] if device else [ALL]
+    sensor_key = SENSOR_KEY.format(sensor_scope)
+    power_keys = [POWER_KEY.format(scope) for scope in power_scopes]
+    cached = cache.get_many([sensor_key, *power_keys])
+
+    sensor = _cached_or_load(cached, sensor_key, _load_sensor, sensor_scope)
+    if sensor["data"] is None:
+        raise SensorData.DoesNotExist("SensorData matching query does not exist.")
+
+    powers = [
+        _cached_or_load(cached, key, _load_power, scope)
+        for key, scope in zip(power_keys, power_scopes)
+    ]
+    powers = [entry for entry in powers if entry["data"] is not None]
+    if not powers:
+        raise PowerSystem.DoesNotExist("PowerSystem matching query does not exist.")
+    return sensor, max(powers, key=lambda entry: entry["order"])
+
+
+def current_etag(sensor, power):
+    return f'"{sensor["etag"]}{power["etag"]}"'
+
+
+def _store_if_newer(key, entry):
+    cached = cache.get(key)
+    # Key yang belum pernah dimuat dibiarkan kosong, nanti dimuat lengkap dari DB.
+    # Data backfill yang lebih lama dari snapshot tidak boleh menimpanya.
+    if cached is None:
+        return
+    if cached["data"] is None or entry["order"] >= cached["order"]:
+        cache.set(key, entry, None)
+
+
+def newest_by_scope(instances):
+    """Pembacaan terbaru (berdasarkan timestamp) per scope: ALL dan setiap device"""
+    newest = {}
+    for item in instances:
+        order = (item.timestamp, item.id or 0)
+        for scope in (ALL, item.device_id) if item.device_id else (ALL,):
+            if scope not in newest or order > newest[scope][0]:
+                newest[scope] = (order, item)
+    return {scope: item for scope, (_, item) in newest.items()}
+
+
+def update_sensor(instances):
+    """Write-through: simpan pembacaan terbaru (berdasarkan timestamp) ke cache"""
+    for scope, item in newest_by_scope(instances).items():
+        _store_if_newer(SENSOR_KEY.format(scope), sensor_entry(item))
+
+
+def update_power(instance):
+    entry = power_entry(instance)
+    for scope in (ALL, instance.device_id or BROADCAST):
+        _store_if_newer(POWER_KEY.format(scope), entry)
+
+
+def invalidate(instance):
+    """Hapus snapshot yang mungkin memuat baris ini (setelah update/delete)"""
+    if isinstance(instance, SensorData):
+        scopes = [ALL, instance.device_id] if instance.device_id else [ALL]
+        cache.delete_many([SENSOR_KEY.format(scope) for scope in scopes])
+    else:
+        scopes = [ALL, instance.device_id or BROADCAST]
+        cache.delete_many([POWER_KEY.format(scope) for scope in scopes])
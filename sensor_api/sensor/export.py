@@ -0,0 +1,126 @@
+import csv
+import io
+import json
+import zlib
+from datetime import timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+# Kolom yang diekspor, urutannya juga menjadi header CSV
+EXPORT_FIELDS = (
+    'id', 'timestamp', 'device_id', 'power_system_id', 'vibration_level', 'motor_voltage',
+    'motor_current', 'power_consumption', 'bottle_mass', 'bottle_brightness',
+    'good_product', 'bad_product', 'counter_generation', 'sample_count', 'sequence',
+)
+_COUNT_INDEX = EXPORT_FIELDS.index('sample_count')
+# Diambil untuk rekonstruksi deret (expand), tidak ikut diekspor
+_WINDOW_FIELDS = ('window_start', 'sample_interval')
+
+# Jumlah baris yang diambil per fetch dari server-side cursor; setiap potongan
+# langsung di-encode dan dikirim, jadi memori tidak bergantung jumlah baris
+FETCH_CHUNK = 2000
+
+
+def _sample_times(timestamp, count, window_start, sample_interval):
+    """Timestamp setiap pembacaan yang diwakili satu baris gabungan"""
+    if window_start is not None and sample_interval:
+        # Dikirim Pi: jendela selalu berjarak tetap (ditutup jika ticker melewatkan detak)
+        step = timedelta(seconds=sample_interval)
+        return [window_start + index * step for index in range(count)]
+    # Baris dari agent lama: anggap berjarak SENSOR_SAMPLE_INTERVAL dan berakhir di timestamp
+    step = timedelta(seconds=settings.SENSOR_SAMPLE_INTERVAL)
+    return [timestamp - back * step for back in range(count - 1, -1, -1)]
+
+
+def _export_rows(records, expand):
+    """Baris ekspor dari potongan baris values_list(*EXPORT_FIELDS, *_WINDOW_FIELDS)"""
+    for *row, window_start, sample_interval in records:
+        count = row[_COUNT_INDEX] or 1
+        if not expand or count == 1:
+            yield (row[0], row[1].isoformat(), *row[2:])
+            continue
+        # Rekonstruksi deret per sampel: baris gabungan mewakili `count` pembacaan,
+        # nilainya tetap dalam deadband nilai baris
+        for timestamp in _sample_times(row[1], count, window_start, sample_interval):
+            yield (row[0], timestamp.isoformat(), *row[2:_COUNT_INDEX], 1, *row[_COUNT_INDEX + 1:])
+
+
+def _csv_lines(rows, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def _ndjson_lines(rows, header):
+    return ''.join(json.dumps(dict(zip(EXPORT_FIELDS, row)), separators=(',', ':')) + '\n' for row in rows)
+
+
+# format -> (content type, ekstensi file, fungsi baris -> teks)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv', _csv_lines),
+    'ndjson': ('application/x-ndjson', 'ndjson', _ndjson_lines),
+}
+
+
+class _Encoder:
+    """Ubah potongan baris DB menjadi bytes ekspor (gzip jika compress), dipakai jalur sync dan async"""
+
+    def __init__(self, export_format, compress, expand):
+        self.lines = EXPORT_FORMATS[export_format][2]
+        self.expand = expand
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16) if compress else None
+        self.started = False
+
+    def encode(self, records):
+        data = self.lines(_export_rows(records, self.expand), header=not self.started).encode()
+        self.started = True
+        return self.compressor.compress(data) if self.compressor else data
+
+    def finish(self):
+        data = b'' if self.started else self.encode([])  # Ekspor kosong tetap punya header CSV
+        return data + self.compressor.flush() if self.compressor else data
+
+
+def _records(queryset):
+    return queryset.order_by('timestamp', 'id').values_list(*EXPORT_FIELDS, *_WINDOW_FIELDS)
+
+
+def _fetch(records):
+    return list(islice(records, FETCH_CHUNK))
+
+
+def export_chunks(queryset, export_format, compress=False, expand=False):
+    """Generator potongan bytes hasil ekspor; memori konstan berapa pun jumlah barisnya.
+
+    expand=True: baris gabungan dari Pi dipecah kembali menjadi satu baris per pembacaan.
+    """
+    encoder = _Encoder(export_format, compress, expand)
+    records = _records(queryset).iterator(chunk_size=FETCH_CHUNK)
+    while chunk := _fetch(records):
+        data = encoder.encode(chunk)
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+async def aexport_chunks(queryset, export_format, compress=False, expand=False):
+    """Versi async export_chunks untuk server ASGI.
+
+    StreamingHttpResponse di ASGI mengubah iterator sync menjadi list dulu (seluruh
+    ekspor di memori); di sini setiap potongan diambil dari server-side cursor
+    dengan sync_to_async (thread yang sama dengan koneksi DB) lalu langsung dikirim.
+    """
+    encoder = _Encoder(export_format, compress, expand)
+    # Query dijalankan saat potongan pertama diambil, di thread sync
+    records = _records(queryset).iterator(chunk_size=FETCH_CHUNK)
+    fetch = sync_to_async(_fetch)
+    while chunk := await fetch(records):
+        data = encoder.encode(chunk)
+        if data:
+            yield data
+    yield encoder.finish()
@@ -0,0 +1,44 @@
+from datetime import timezone as dt_timezone
+
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+
+def parse_time_param(params, name):
+    """Parse query param waktu ISO 8601, None jika tidak diisi"""
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValidationError({name: f"Format waktu tidak valid: {value}"})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def filter_time_range(queryset, params):
+    """Filter ?from= dan ?to= (inklusif from, eksklusif to) pada kolom timestamp"""
+    start = parse_time_param(params, 'from')
+    end = parse_time_param(params, 'to')
+    if start is not None:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end is not None:
+        queryset = queryset.filter(timestamp__lt=end)
+    return queryset
+
+
+def filter_sensor_data(queryset, params):
+    """Filter data sensor berdasarkan rentang waktu, ?device= dan ?power_system="""
+    queryset = filter_time_range(queryset, params)
+    device = params.get('device')
+    if device:
+        queryset = queryset.filter(device_id=device)
+    power_system = params.get('power_system')
+    if power_system:
+        try:
+            queryset = queryset.filter(power_system_id=int(power_system))
+        except ValueError:
+            raise ValidationError({"power_system": "Harus berupa angka"})
+    return queryset
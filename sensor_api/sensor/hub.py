@@ -0,0 +1,200 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+
+class BaseSubscription(abc.ABC):
+    def __init__(self, hub, topics):
+        self.hub = hub
+        self.topics = tuple(topics)
+        self._loop = asyncio.get_running_loop()
+
+    @abc.abstractmethod
+    def _offer(self, topic, message):
+        """Terima satu pesan; selalu dijalankan di event loop milik subscriber"""
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Subscription(BaseSubscription):
+    """Antrian milik satu subscriber.
+
+    Jika antrian penuh (subscriber lambat), pesan tertua dibuang sehingga
+    subscriber selalu mendapat nilai terbaru.
+    """
+
+    def __init__(self, hub, topic, maxsize):
+        super().__init__(hub, [topic])
+        self.topic = topic
+        self.dropped = 0
+        self._queue = asyncio.Queue(maxsize)
+
+    def _offer(self, topic, message):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """Tunggu pesan berikutnya, raise asyncio.TimeoutError jika lewat timeout"""
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+
+class LatestSubscription(BaseSubscription):
+    """Subscriber beberapa topik yang hanya menyimpan pesan terbaru per topik.
+
+    Pesan yang belum diambil ditimpa pesan baru dari topik yang sama, jadi
+    subscriber lambat tidak menumpuk antrian dan tetap menerima nilai terbaru
+    setiap topik (mis. data sensor tidak menggeser status daya).
+    """
+
+    def __init__(self, hub, topics):
+        super().__init__(hub, topics)
+        self.coalesced = 0
+        self._pending = {}
+        self._ready = asyncio.Event()
+
+    def _offer(self, topic, message):
+        if topic in self._pending:
+            self.coalesced += 1
+        self._pending[topic] = message
+        self._ready.set()
+
+    async def get(self, timeout=None):
+        """Tunggu lalu ambil semua pesan tertunda (list), raise asyncio.TimeoutError jika lewat timeout"""
+        await asyncio.wait_for(self._ready.wait(), timeout)
+        messages = list(self._pending.values())
+        self._pending.clear()
+        self._ready.clear()
+        return messages
+
+
+class Hub:
+    """Broadcast hub in-process: satu publish diteruskan ke semua subscriber topik.
+
+    publish() aman dipanggil dari thread mana pun (mis. signal di view sinkron),
+    sedangkan subscribe() harus dipanggil dari dalam event loop (view async).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def _add(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers[topic].add(subscription)
+        return subscription
+
+    def subscribe(self, topic, maxsize=1):
+        return self._add(Subscription(self, topic, maxsize))
+
+    def subscribe_latest(self, topics):
+        return self._add(LatestSubscription(self, topics))
+
+    def count(self, topic):
+        """Jumlah subscriber topik saat ini di proses ini"""
+        with self._lock:
+            return len(self._subscribers.get(topic, ()))
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    def publish(self, topic, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription._loop.call_soon_threadsafe(subscription._offer, topic, message)
+            except RuntimeError:
+                # Event loop subscriber sudah ditutup
+                self.unsubscribe(subscription)
+
+
+class PostgresRelay:
+    """Teruskan publish ke hub di proses worker lain lewat LISTEN/NOTIFY PostgreSQL.
+
+    publish() mengirim ke hub lokal lalu NOTIFY; setiap proses yang punya
+    subscriber menjalankan satu thread LISTEN dengan koneksi sendiri dan
+    meneruskan notifikasi dari proses lain ke hub lokalnya. Di database selain
+    PostgreSQL (psycopg 3) hanya hub lokal yang dipakai.
+    """
+
+    CHANNEL = 'sensor_hub'
+    RETRY = 5  # Jeda reconnect koneksi LISTEN (detik)
+
+    def __init__(self, hub, alias=DEFAULT_DB_ALIAS):
+        self.hub = hub
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._pid = None  # Proses pemilik thread LISTEN (thread tidak ikut fork)
+
+    @property
+    def available(self):
+        if connections[self.alias].vendor != 'postgresql':
+            return False
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+        return is_psycopg3
+
+    def start(self):
+        """Mulai thread LISTEN sekali per proses (dipanggil sebelum subscribe)"""
+        if self._pid == os.getpid() or not self.available:
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._listen, name='hub-relay', daemon=True).start()
+
+    def publish(self, topic, message):
+        """Publish ke hub lokal dan ke proses lain; message harus bisa di-encode JSON"""
+        self.hub.publish(topic, message)
+        if not self.available:
+            return
+        payload = json.dumps({'pid': os.getpid(), 'topic': topic, 'message': message})
+        try:
+            with connections[self.alias].cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)', [self.CHANNEL, payload])
+        except Exception:
+            # Proses lain tetap menerima perubahan lewat cek ulang berkala
+            logger.exception('NOTIFY %s gagal', self.CHANNEL)
+
+    def _listen(self):
+        connection = connections[self.alias]
+        while True:
+            try:
+                params = connection.get_connection_params()
+                with connection.Database.connect(**params, autocommit=True) as listener:
+                    listener.execute(f'LISTEN {self.CHANNEL}')
+                    for notify in listener.notifies():
+                        data = json.loads(notify.payload)
+                        if data['pid'] != os.getpid():
+                            self.hub.publish(data['topic'], data['message'])
+            except Exception:
+                logger.exception('Koneksi LISTEN %s terputus', self.CHANNEL)
+            time.sleep(self.RETRY)
+
+
+hub = Hub()
+relay = PostgresRelay(hub)
@@ -0,0 +1,263 @@
+import json
+import math
+import time
+from functools import lru_cache
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Device, PowerSystem, SensorData
+
+
+class IngestError(ValueError):
+    pass
+
+
+class UnknownDeviceError(IngestError):
+    """Device belum terdaftar: bukan data rusak, agent menyimpan batch dan mendaftar ulang"""
+
+
+def _float(value):
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError("nilai harus finite")
+    return value
+
+
+def _int(value):
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError("harus bilangan bulat")
+    return int(value)
+
+
+def _timestamp(value):
+    if not isinstance(value, datetime):
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(f"format waktu tidak valid: {value}")
+        value = parsed
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def _optional_str(value):
+    return None if value is None else str(value)
+
+
+def _optional_int(value):
+    return None if value is None else _int(value)
+
+
+def _optional_timestamp(value):
+    return None if value is None else _timestamp(value)
+
+
+def sample_interval_value(value):
+    if value is None:
+        return None
+    value = _float(value)
+    if value <= 0:
+        raise ValueError("sample_interval harus lebih dari 0")
+    return value
+
+
+def _sample_count(value):
+    if value is None:
+        return None
+    value = _int(value)
+    if value < 1:
+        raise ValueError("sample_count minimal 1")
+    return value
+
+
+def _sequence(value):
+    if value is None:
+        return None
+    value = _int(value)
+    if not 1 <= value < 2 ** 63:
+        raise ValueError("sequence harus antara 1 dan 2^63-1")
+    return value
+
+
+def summary_value(value):
+    """Validasi ringkasan jendela: {field analog: [min, max, mean]}"""
+    if value is None:
+        return None
+    if not isinstance(value, dict):
+        raise ValueError("summary harus berupa object")
+    summary = {}
+    for field, stats in value.items():
+        if field not in SUMMARY_FIELDS:
+            raise ValueError(f"summary: field '{field}' tidak dikenal")
+        if not isinstance(stats, (list, tuple)) or len(stats) != 3:
+            raise ValueError(f"summary: {field} harus [min, max, mean]")
+        summary[field] = [_float(stat) for stat in stats]
+    return summary
+
+
+# Skema yang sudah "dikompilasi": (field, konversi) sesuai urutan kolom INSERT
+SCHEMA = (
+    ('timestamp', _timestamp),
+    ('vibration_level', _float),
+    ('motor_voltage', _float),
+    ('motor_current', _float),
+    ('power_consumption', _float),
+    ('bottle_mass', _float),
+    ('bottle_brightness', _float),
+    ('good_product', _int),
+    ('bad_product', _int),
+    ('counter_generation', _optional_int),
+    ('sample_count', _sample_count),
+    ('summary', summary_value),
+    ('window_start', _optional_timestamp),
+    ('sample_interval', sample_interval_value),
+    ('sequence', _sequence),
+    ('power_system', _int),
+    ('device', _optional_str),
+)
+OPTIONAL_FIELDS = {
+    'device', 'counter_generation', 'sample_count', 'summary', 'window_start', 'sample_interval', 'sequence',
+}
+SUMMARY_FIELDS = {field for field, convert in SCHEMA if convert is _float}
+SUMMARY_INDEX = [field for field, _ in SCHEMA].index('summary')
+WINDOW_START_INDEX = [field for field, _ in SCHEMA].index('window_start')
+SEQUENCE_INDEX = [field for field, _ in SCHEMA].index('sequence')
+
+# Jumlah baris per statement INSERT multi-row (batas parameter query PostgreSQL 65535)
+INSERT_CHUNK = 500
+
+
+class KnownIds:
+    """Set ID valid yang di-cache in-process, dimuat ulang saat ada ID yang belum dikenal"""
+
+    def __init__(self, model, min_reload_interval=1.0):
+        self.model = model
+        self.min_reload_interval = min_reload_interval
+        self._ids = frozenset()
+        self._loaded_at = None
+
+    def reload(self):
+        self._ids = frozenset(self.model.objects.values_list('id', flat=True))
+        self._loaded_at = time.monotonic()
+
+    def __contains__(self, value):
+        if value in self._ids:
+            return True
+        # Batasi reload agar ID palsu tidak memicu query di setiap request
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.min_reload_interval:
+            self.reload()
+        return value in self._ids
+
+
+known_power_systems = KnownIds(PowerSystem)
+known_devices = KnownIds(Device)
+
+
+def validate_rows(rows):
+    """Validasi dan konversi list dict menjadi list tuple nilai kolom"""
+    if isinstance(rows, dict):
+        rows = [rows]
+    if not isinstance(rows, list) or not rows:
+        raise IngestError("Body harus berupa list pembacaan sensor")
+
+    values = []
+    for index, row in enumerate(rows):
+        try:
+            item = tuple(
+                convert(row.get(field)) if field in OPTIONAL_FIELDS else convert(row[field])
+                for field, convert in SCHEMA
+            )
+        except KeyError as exc:
+            raise IngestError(f"Baris {index}: field {exc} wajib diisi")
+        except (TypeError, ValueError, AttributeError) as exc:
+            raise IngestError(f"Baris {index}: {exc}")
+
+        power_system_id, device_id = item[-2], item[-1]
+        if power_system_id not in known_power_systems:
+            raise IngestError(f"Baris {index}: power_system {power_system_id} tidak ditemukan")
+        if device_id is not None and device_id not in known_devices:
+            raise UnknownDeviceError(f"Baris {index}: device '{device_id}' tidak terdaftar")
+        values.append(item)
+    return values
+
+
+@lru_cache(maxsize=32)
+def _insert_sql(rows):
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(SensorData._meta.get_field(field).column) for field, _ in SCHEMA)
+    placeholders = '(' + ', '.join(['%s'] * len(SCHEMA)) + ')'
+    # Tanpa conflict target: berlaku untuk index (device_id, sequence) maupun versi
+    # tabel berpartisi yang ikut memuat timestamp
+    return (
+        f"INSERT INTO {quote(SensorData._meta.db_table)} ({columns}) "
+        f"VALUES {', '.join([placeholders] * rows)} "
+        f"ON CONFLICT DO NOTHING RETURNING {quote('id')}, {quote('device_id')}, {quote('sequence')}"
+    )
+
+
+def _key(item):
+    """(device, sequence) jika baris bisa bentrok dengan index unik, selain itu None"""
+    device, sequence = item[-1], item[SEQUENCE_INDEX]
+    return (device, sequence) if device is not None and sequence is not None else None
+
+
+def insert_rows(values):
+    """INSERT multi-row ... ON CONFLICT DO NOTHING, tanpa membuat model instance per baris.
+
+    Baris dengan (device, sequence) yang sudah tersimpan (atau muncul dua kali
+    dalam batch) dilewati, jadi batch yang dikirim ulang Pi aman. Return list
+    (id, item) untuk baris yang benar-benar tersimpan, urut sesuai input.
+    """
+    adapt = connection.ops.adapt_datetimefield_value
+    unique = {}
+    rows = []
+    for item in values:
+        key = _key(item)
+        if key is not None:
+            if key in unique:
+                continue
+            unique[key] = item
+        rows.append(item)
+
+    inserted = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), INSERT_CHUNK):
+            chunk = rows[start:start + INSERT_CHUNK]
+            params = []
+            for item in chunk:
+                row = [adapt(item[0]), *item[1:]]
+                if row[SUMMARY_INDEX] is not None:
+                    row[SUMMARY_INDEX] = json.dumps(row[SUMMARY_INDEX])
+                if row[WINDOW_START_INDEX] is not None:
+                    row[WINDOW_START_INDEX] = adapt(row[WINDOW_START_INDEX])
+                params.extend(row)
+            cursor.execute(_insert_sql(len(chunk)), params)
+            # Baris tanpa key tidak pernah bentrok: id-nya dicocokkan berdasarkan urutan
+            keyless = iter(item for item in chunk if _key(item) is None)
+            for row_id, device, sequence in cursor.fetchall():
+                key = (device, sequence) if device is not None and sequence is not None else None
+                item = unique[key] if key is not None else next(keyless)
+                inserted[id(item)] = row_id
+    return [(inserted[id(item)], item) for item in rows if id(item) in inserted]
+
+
+def values_from_validated(data):
+    """Tuple kolom (urutan SCHEMA) dari validated_data SensorDataSerializer"""
+    data = dict(data, power_system=data['power_system'].pk,
+                device=data['device'].pk if data.get('device') else None)
+    return tuple(data.get(field) for field, _ in SCHEMA)
+
+
+def as_instances(rows):
+    """Instance SensorData dari hasil insert_rows untuk receiver signal sensor_data_created"""
+    fields = [field for field, _ in SCHEMA]
+    instances = []
+    for row_id, item in rows:
+        data = dict(zip(fields, item))
+        data['power_system_id'] = data.pop('power_system')
+        data['device_id'] = data.pop('device')
+        instances.append(SensorData(id=row_id, **data))
+    return instances
@@ -0,0 +1,103 @@
+"""Live feed dashboard lewat Server-Sent Events.
+
+Setiap batch data sensor (dan setiap status daya) di-encode SEKALI menjadi
+event SSE lalu dipublish ke hub in-process; semua koneksi hanya meneruskan
+bytes yang sama. Koneksi yang lambat hanya menerima nilai terbaru per topik
+(LatestSubscription), jadi banyak viewer tidak menambah query DB.
+"""
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import current_state
+from .hub import hub
+from .models import PowerSystem, SensorData
+
+SENSOR_TOPIC = 'live:sensor:{}'
+POWER_TOPIC = 'live:power:{}'
+
+# Tanpa notifikasi selama ini (detik), cek snapshot current state di cache bersama:
+# data yang masuk lewat proses/worker lain tidak melewati hub proses ini.
+# Sekaligus menjadi keepalive agar proxy tidak menutup koneksi.
+RECHECK = 5
+RETRY_MS = 3000  # Jeda reconnect EventSource setelah koneksi putus
+
+KEEPALIVE = b': keepalive\n\n'
+
+# Urutan terakhir yang dipublish per topik, supaya data backfill yang lebih
+# lama tidak menimpa nilai terbaru di dashboard
+_published = {}
+_published_lock = threading.Lock()
+
+
+def sse_event(name, data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f'event: {name}\ndata: {payload}\n\n'.encode()
+
+
+def _publish_if_newer(topic, order, message):
+    with _published_lock:
+        last = _published.get(topic)
+        if last is not None and order < last:
+            return
+        _published[topic] = order
+    hub.publish(topic, message)
+
+
+def publish_sensor(instances):
+    """Publish pembacaan terbaru per scope (semua device dan per device)"""
+    for scope, item in current_state.newest_by_scope(instances).items():
+        entry = current_state.sensor_entry(item)
+        message = ('sensor', entry['etag'], sse_event('sensor', entry['data']))
+        _publish_if_newer(SENSOR_TOPIC.format(scope), (item.timestamp, item.id or 0), message)
+
+
+def publish_power(instance):
+    entry = current_state.power_entry(instance)
+    message = ('power', entry['etag'], sse_event('power', entry['data']))
+    for scope in (current_state.ALL, instance.device_id or current_state.BROADCAST):
+        _publish_if_newer(POWER_TOPIC.format(scope), instance.id, message)
+
+
+def _topics(device):
+    if device:
+        return [SENSOR_TOPIC.format(device), POWER_TOPIC.format(device),
+                POWER_TOPIC.format(current_state.BROADCAST)]
+    return [SENSOR_TOPIC.format(current_state.ALL), POWER_TOPIC.format(current_state.ALL)]
+
+
+async def _snapshot(device, sent):
+    """Event untuk snapshot current state yang belum pernah dikirim ke koneksi ini"""
+    try:
+        sensor, power = await sync_to_async(current_state.get_current_state)(device)
+    except (SensorData.DoesNotExist, PowerSystem.DoesNotExist):
+        return b''
+    chunks = []
+    for kind, entry in (('sensor', sensor), ('power', power)):
+        if sent.get(kind) != entry['etag']:
+            sent[kind] = entry['etag']
+            chunks.append(sse_event(kind, entry['data']))
+    return b''.join(chunks)
+
+
+async def stream(device=None):
+    """Async generator bytes SSE untuk satu koneksi (berhenti saat client putus)"""
+    sent = {}  # kind -> etag terakhir yang dikirim
+    with hub.subscribe_latest(_topics(device)) as subscription:
+        yield f'retry: {RETRY_MS}\n\n'.encode() + await _snapshot(device, sent)
+        while True:
+            try:
+                messages = await subscription.get(RECHECK)
+            except asyncio.TimeoutError:
+                yield await _snapshot(device, sent) or KEEPALIVE
+                continue
+            chunks = []
+            for kind, etag, payload in messages:
+                if sent.get(kind) != etag:
+                    sent[kind] = etag
+                    chunks.append(payload)
+            if chunks:
+                yield b''.join(chunks)
@@ -0,0 +1,127 @@
+import gzip
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from sensor import current_state, response_cache
+from sensor.models import Device, PowerSystem, SensorData
+from sensor.wire import MEDIA_TYPE as BINARY_MEDIA_TYPE, encode_readings
+
+BENCH_DEVICE = 'bench-ingest'
+
+
+def make_rows(count, power_system_id):
+    start = datetime(2000, 1, 1, tzinfo=timezone.utc)  # Jauh di masa lalu: tidak mengganggu dashboard
+    rows = []
+    for i in range(count):
+        rows.append({
+            "timestamp": start + timedelta(seconds=i),
+            "vibration_level": random.randint(45, 55),
+            "motor_voltage": random.randint(15, 19),
+            "motor_current": random.randint(50, 60),
+            "power_consumption": round(60 + random.random() * 10, 1),
+            "bottle_mass": random.randint(50, 58),
+            "bottle_brightness": random.randint(70, 80),
+            "good_product": i,
+            "bad_product": i // 10,
+            "power_system": power_system_id,
+            "device": BENCH_DEVICE,
+        })
+    return rows
+
+
+def json_row(row):
+    return dict(row, timestamp=row["timestamp"].strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+
+def to_json(rows):
+    return json.dumps([json_row(row) for row in rows]).encode()
+
+
+def chunks(rows, size):
+    return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark throughput ingest data sensor (rows/detik): single POST, bulk serializer dan fast-path. "
+        "Jalankan dengan --settings=sensor_api.bench_settings (database lokal, bukan produksi)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help="Jumlah baris untuk jalur batch")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--single-rows', type=int, default=500,
+                            help="Jumlah baris untuk jalur satu POST per baris (lambat)")
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'BENCHMARK_DATABASE', False):
+            raise CommandError("Benchmark menulis ke database: jalankan dengan --settings=sensor_api.bench_settings")
+
+        client = Client(HTTP_HOST='localhost')
+        device, _ = Device.objects.get_or_create(id=BENCH_DEVICE)
+        # PowerSystem khusus benchmark (terikat device, tahun 2000) hanya sebagai foreign key
+        # data sensor. bulk_create tidak memicu signal, jadi status daya terkini di
+        # cache, hub dan live feed tidak ikut berubah.
+        power, = PowerSystem.objects.bulk_create([PowerSystem(
+            timestamp=datetime(2000, 1, 1, tzinfo=timezone.utc),
+            status=False,
+            reason="Benchmark",
+            device=device
+        )])
+
+        try:
+            batch_rows = make_rows(options['rows'], power.id)
+            batches = chunks(batch_rows, options['batch_size'])
+            single_rows = make_rows(options['single_rows'], power.id)
+
+            cases = [
+                ("single   /api/sensordata/", len(single_rows), [
+                    ("/api/sensordata/", json.dumps(json_row(row)), 'application/json', {})
+                    for row in single_rows
+                ]),
+                ("bulk     /api/sensordata/bulk/", len(batch_rows), [
+                    ("/api/sensordata/bulk/", gzip.compress(to_json(batch)), 'application/json',
+                     {"HTTP_CONTENT_ENCODING": "gzip"})
+                    for batch in batches
+                ]),
+                ("fast     /api/sensordata/ingest/ (json)", len(batch_rows), [
+                    ("/api/sensordata/ingest/", gzip.compress(to_json(batch)), 'application/json',
+                     {"HTTP_CONTENT_ENCODING": "gzip"})
+                    for batch in batches
+                ]),
+                ("fast     /api/sensordata/ingest/ (binary)", len(batch_rows), [
+                    ("/api/sensordata/ingest/", gzip.compress(encode_readings(batch)), BINARY_MEDIA_TYPE,
+                     {"HTTP_CONTENT_ENCODING": "gzip"})
+                    for batch in batches
+                ]),
+            ]
+
+            self.stdout.write(f"{'path':<42}{'rows':>8}{'seconds':>10}{'rows/s':>12}")
+            for label, row_count, requests in cases:
+                started = time.perf_counter()
+                for url, body, content_type, extra in requests:
+                    response = client.post(url, body, content_type=content_type, **extra)
+                    if response.status_code not in (201, 204):
+                        self.stderr.write(f"{label}: {response.status_code} {response.content[:200]}")
+                        return
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{label:<42}{row_count:>8}{elapsed:>10.2f}{row_count / elapsed:>12.0f}")
+                self._delete_bench_rows()
+        finally:
+            self._delete_bench_rows()
+            power.delete()
+            device.delete()
+
+    def _delete_bench_rows(self):
+        # DELETE langsung agar tidak memicu signal per baris
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM sensor_sensordata WHERE device_id = %s", [BENCH_DEVICE])
+        current_state.invalidate(SensorData(device_id=BENCH_DEVICE))
+        response_cache.bump(SensorData._meta.db_table, response_cache.history(SensorData._meta.db_table))
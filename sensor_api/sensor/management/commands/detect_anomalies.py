@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sensor.models import AnalyticsCheckpoint, SensorData
+
+CHECKPOINT = 'anomaly'
+
+
+class Command(BaseCommand):
+    help = (
+        "Deteksi anomali (z-score, EWMA, energi spektral) pada data sensor baru sejak "
+        "checkpoint terakhir dan simpan sebagai AnomalyAlert"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=50000, help="Maksimal baris baru per batch")
+        parser.add_argument('--loop', type=float, default=0,
+                            help="Jalan terus, jeda N detik antar putaran (0 = sekali jalan)")
+        parser.add_argument('--backfill', action='store_true',
+                            help="Checkpoint baru mulai dari awal tabel, bukan dari data terbaru")
+        parser.add_argument('--reset', action='store_true', help="Ulangi dari awal tabel")
+
+    def handle(self, *args, **options):
+        # Import di sini: NumPy hanya dibutuhkan oleh job ini, bukan oleh server API
+        from sensor import analytics
+
+        checkpoint = AnalyticsCheckpoint.objects.filter(name=CHECKPOINT).first()
+        if checkpoint is None or options['reset']:
+            start = 0
+            if not (options['backfill'] or options['reset']):
+                start = SensorData.objects.order_by('-id').values_list('id', flat=True).first() or 0
+            checkpoint, _ = AnalyticsCheckpoint.objects.update_or_create(
+                name=CHECKPOINT, defaults={'last_id': start}
+            )
+            self.stdout.write(f"Checkpoint mulai dari id {start}")
+
+        while True:
+            started = time.perf_counter()
+            total = 0
+            alerts = []
+            while True:
+                processed, new_alerts = analytics.process_new_data(checkpoint, options['batch'])
+                total += processed
+                alerts.extend(new_alerts)
+                if processed < options['batch']:
+                    break
+            elapsed = time.perf_counter() - started
+
+            for alert in alerts:
+                self.stdout.write(
+                    f"[{alert.timestamp:%Y-%m-%d %H:%M:%S}] {alert.device_id or '-'} "
+                    f"{alert.detector} {alert.metric} value={alert.value:.3f} score={alert.score:.2f}"
+                )
+            if total:
+                self.stdout.write(
+                    f"{total} baris dalam {elapsed:.2f}s ({total / elapsed:,.0f} baris/s), "
+                    f"{len(alerts)} alert, checkpoint id {checkpoint.last_id}"
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
@@ -0,0 +1,229 @@
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+
+from sensor import current_state, ingest, response_cache
+from sensor.models import Device, PowerCommand, PowerSystem, SensorData
+
+DEVICE_PREFIX = 'loadtest-'
+FILL_DEVICE = 'loadtest-fill'
+FILL_CHUNK = 10000
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = Counter()
+
+    def timed(self, name, func, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = func(*args, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples[name].append(elapsed)
+            if not ok:
+                self.errors[name] += 1
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class PiStubHandler(BaseHTTPRequestHandler):
+    """Pengganti Flask server Raspberry Pi: menerima /control-power dan langsung membalas"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length) or b'{}')
+        body = json.dumps({"message": "ok", "motor_running": data.get("status")}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test API: N Raspberry Pi virtual (kirim data sensor + poll status daya), "
+        "dashboard yang polling latest-data dan perintah daya ke Pi tiruan. "
+        "Jalankan dengan --settings=sensor_api.bench_settings (database lokal, bukan produksi)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pis', type=int, default=10, help="Jumlah Raspberry Pi virtual")
+        parser.add_argument('--dashboards', type=int, default=5, help="Jumlah tab dashboard yang polling")
+        parser.add_argument('--duration', type=float, default=30, help="Lama tiap putaran (detik)")
+        parser.add_argument('--interval', type=float, default=1.0, help="Interval loop tiap Pi/dashboard (detik)")
+        parser.add_argument('--command-interval', type=float, default=2.0,
+                            help="Interval perintah daya ke Pi acak (detik), 0 = nonaktif")
+        parser.add_argument('--sensor-path', default='/api/sensordata/',
+                            help="Endpoint kirim data sensor, mis. /api/sensordata/ingest/")
+        parser.add_argument('--sweep', default='',
+                            help="Ukuran tabel untuk sweep volume data, mis. 10000,100000,1000000,10000000")
+        parser.add_argument('--keep', action='store_true', help="Jangan hapus data load test setelah selesai")
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'BENCHMARK_DATABASE', False):
+            raise CommandError("Load test menulis ke database: jalankan dengan --settings=sensor_api.bench_settings")
+        sizes = [int(size) for size in options['sweep'].split(',') if size.strip()] or [None]
+        if sizes != sorted(sizes, key=lambda size: size or 0):
+            raise CommandError("--sweep harus berurutan dari kecil ke besar")
+
+        stub = start_server(ThreadingHTTPServer(('127.0.0.1', 0), PiStubHandler))
+        app = start_server(ThreadedWSGIServer(('127.0.0.1', 0), QuietWSGIRequestHandler))
+        app.set_app(get_internal_wsgi_application())
+        base_url = f"http://127.0.0.1:{app.server_port}"
+
+        device_ids = [f"{DEVICE_PREFIX}{i}" for i in range(options['pis'])]
+        for device_id in device_ids + [FILL_DEVICE]:
+            Device.objects.update_or_create(id=device_id, defaults={"address": f"127.0.0.1:{stub.server_port}"})
+        # Terikat device load test agar Raspberry Pi sungguhan tidak ikut bereaksi
+        power = PowerSystem.objects.create(
+            timestamp=datetime.now(timezone.utc), status=False, reason="Load test", device_id=FILL_DEVICE
+        )
+
+        try:
+            for size in sizes:
+                if size is not None:
+                    self._fill_to(size, power.id)
+                recorder = self._run(base_url, device_ids, power.id, options)
+                self._report(recorder, options['duration'], self._row_count())
+        finally:
+            app.shutdown()
+            stub.shutdown()
+            if not options['keep']:
+                self._cleanup()
+
+    def _row_count(self):
+        return SensorData.objects.count()
+
+    def _fill_to(self, size, power_system_id):
+        """Isi tabel sampai `size` baris dengan data historis sintetis (INSERT multi-row per chunk)"""
+        existing = self._row_count()
+        start = datetime(2000, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=existing)
+        missing = size - existing
+        self.stdout.write(f"Filling sensor_sensordata: {existing} -> {size} rows")
+        for offset in range(0, max(missing, 0), FILL_CHUNK):
+            count = min(FILL_CHUNK, missing - offset)
+            ingest.insert_rows([
+                (start + timedelta(seconds=offset + i), 50.0, 17.0, 55.0, 65.0, 54.0, 75.0,
+                 offset + i, 0, None, None, None, None, None, None, power_system_id, FILL_DEVICE)
+                for i in range(count)
+            ])
+
+    def _run(self, base_url, device_ids, power_system_id, options):
+        recorder = LatencyRecorder()
+        stop = threading.Event()
+        interval = options['interval']
+        sensor_label = f"POST {options['sensor_path']}"
+
+        def virtual_pi(device_id):
+            # Meniru send_sensor_data() + poll_power_status() lama di Yuk bisa.py
+            session = requests.Session()
+            good = bad = 0
+            next_tick = time.monotonic()
+            while not stop.is_set():
+                good += random.random() > 0.8
+                reading = {
+                    "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "vibration_level": random.randint(45, 55),
+                    "motor_voltage": random.randint(15, 19),
+                    "motor_current": random.randint(50, 60),
+                    "power_consumption": round(60 + random.random() * 10, 1),
+                    "bottle_mass": random.randint(50, 58),
+                    "bottle_brightness": random.randint(70, 80),
+                    "good_product": good,
+                    "bad_product": bad,
+                    "power_system": power_system_id,
+                    "device": device_id,
+                }
+                payload = [reading] if 'ingest' in options['sensor_path'] or 'bulk' in options['sensor_path'] else reading
+                recorder.timed(sensor_label, session.post, base_url + options['sensor_path'],
+                               json=payload, timeout=30)
+                recorder.timed("GET /api/powersystem/", session.get, base_url + "/api/powersystem/", timeout=30)
+                next_tick += interval
+                stop.wait(max(0, next_tick - time.monotonic()))
+
+        def dashboard():
+            session = requests.Session()
+            while not stop.is_set():
+                recorder.timed("GET /api/latest-data/", session.get, base_url + "/api/latest-data/", timeout=30)
+                stop.wait(interval)
+
+        def commander():
+            session = requests.Session()
+            while not stop.wait(options['command_interval']):
+                recorder.timed("POST /api/power-command/", session.post, base_url + "/api/power-command/",
+                               json={"status": random.randint(0, 1), "device": random.choice(device_ids)},
+                               timeout=30)
+
+        threads = [threading.Thread(target=virtual_pi, args=(device_id,)) for device_id in device_ids]
+        threads += [threading.Thread(target=dashboard) for _ in range(options['dashboards'])]
+        if options['command_interval'] > 0:
+            threads.append(threading.Thread(target=commander))
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return recorder
+
+    def _report(self, recorder, duration, rows):
+        self.stdout.write(f"\nTable size: {rows} rows")
+        self.stdout.write(f"{'endpoint':<30}{'requests':>10}{'errors':>8}{'req/s':>9}"
+                          f"{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for name in sorted(recorder.samples):
+            samples = sorted(recorder.samples[name])
+            self.stdout.write(
+                f"{name:<30}{len(samples):>10}{recorder.errors[name]:>8}{len(samples) / duration:>9.1f}"
+                f"{percentile(samples, 0.5) * 1000:>9.1f}{percentile(samples, 0.99) * 1000:>9.1f}"
+                f"{samples[-1] * 1000:>9.1f}"
+            )
+
+    def _cleanup(self):
+        device_ids = list(Device.objects.filter(id__startswith=DEVICE_PREFIX).values_list('id', flat=True))
+        if not device_ids:
+            return
+        # _raw_delete: DELETE langsung tanpa memuat baris dan memicu signal per baris
+        rows = SensorData.objects.filter(device_id__in=device_ids)
+        rows._raw_delete(rows.db)
+        PowerCommand.objects.filter(device_id__in=device_ids).delete()
+        PowerSystem.objects.filter(device_id__in=device_ids).delete()
+        Device.objects.filter(id__in=device_ids).delete()
+        for device_id in device_ids:
+            current_state.invalidate(SensorData(device_id=device_id))
+        current_state.invalidate(SensorData())
+        response_cache.bump(SensorData._meta.db_table, response_cache.history(SensorData._meta.db_table))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from sensor import production
+from sensor.models import SensorData
+
+
+class Command(BaseCommand):
+    help = "Hitung ulang tabel ProductionMetric dari seluruh riwayat SensorData (mis. setelah migrasi pertama)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--device', help="Hanya device ini (default: semua device)")
+
+    def handle(self, *args, **options):
+        if options['device']:
+            devices = [options['device']]
+        else:
+            devices = list(SensorData.objects.order_by().values_list('device_id', flat=True).distinct())
+
+        for device_id in devices:
+            with transaction.atomic():
+                buckets = production.rebuild(device_id)
+            self.stdout.write(f"{device_id or '(tanpa device)'}: {buckets} bucket")
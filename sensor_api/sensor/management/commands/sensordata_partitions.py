@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from sensor import partitioning, response_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Kelola partisi bulanan tabel sensor_sensordata (khusus PostgreSQL). "
+        "setup: ubah tabel menjadi berpartisi (sekali, tabel terkunci selama proses); "
+        "ensure: buat partisi bulan berjalan dan beberapa bulan ke depan (jalankan via cron); "
+        "retain: rollup partisi lama ke SensorRollup lalu hapus; "
+        "status: tampilkan daftar partisi"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['setup', 'ensure', 'retain', 'status'])
+        parser.add_argument('--ahead', type=int, default=3,
+                            help="Jumlah bulan ke depan yang partisinya dibuat lebih dulu")
+        parser.add_argument('--keep-months', type=int, default=12,
+                            help="Retain: partisi yang lebih tua dari ini (bulan penuh) dilepas")
+        parser.add_argument('--no-rollup', action='store_true',
+                            help="Retain: lepas partisi tanpa membuat rollup per jam")
+        parser.add_argument('--archive', action='store_true',
+                            help="Retain: detach dan ganti nama menjadi *_archive, bukan DROP")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Retain: tampilkan partisi yang akan dilepas saja")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(f"Partisi hanya didukung di PostgreSQL (database saat ini: {connection.vendor})")
+
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            partitioned = partitioning.is_partitioned(cursor)
+            action = options['action']
+
+            if action == 'setup':
+                if partitioned:
+                    self.stdout.write("sensor_sensordata sudah berpartisi")
+                    return
+                with transaction.atomic():
+                    partitioning.convert_to_partitioned(cursor, now, options['ahead'])
+                self.stdout.write(self.style.SUCCESS("sensor_sensordata berhasil diubah menjadi tabel berpartisi"))
+                self._print_status(cursor)
+                return
+
+            if not partitioned:
+                raise CommandError("sensor_sensordata belum berpartisi, jalankan 'sensordata_partitions setup' dulu")
+
+            if action == 'ensure':
+                with transaction.atomic():
+                    created = partitioning.ensure_partitions(cursor, now, options['ahead'])
+                for name in created:
+                    self.stdout.write(f"Partisi dibuat: {name}")
+                self.stdout.write(self.style.SUCCESS(f"{len(created)} partisi baru"))
+            elif action == 'retain':
+                self._retain(cursor, now, options)
+            else:
+                self._print_status(cursor)
+
+    def _retain(self, cursor, now, options):
+        if options['keep_months'] < 1:
+            raise CommandError("--keep-months minimal 1")
+
+        expired = partitioning.expired_partitions(cursor, now, options['keep_months'])
+        if not expired:
+            self.stdout.write("Tidak ada partisi yang melewati masa retensi")
+            return
+
+        for name, month, rows in expired:
+            if options['dry_run']:
+                self.stdout.write(f"[dry-run] {name} ({month:%Y-%m}, ~{rows} baris)")
+                continue
+            # Satu transaksi per partisi: rollup dan drop terjadi bersama atau tidak sama sekali
+            with transaction.atomic():
+                rollup_rows = partitioning.retire_partition(
+                    cursor, name, rollup=not options['no_rollup'], drop=not options['archive']
+                )
+            # Halaman historis yang di-cache memuat baris partisi ini
+            response_cache.bump(partitioning.PARENT, response_cache.history(partitioning.PARENT))
+            verb = "diarsipkan" if options['archive'] else "dihapus"
+            self.stdout.write(f"{name} {verb} (~{rows} baris, {rollup_rows} baris rollup per jam)")
+
+    def _print_status(self, cursor):
+        for name, month, rows in partitioning.list_partitions(cursor):
+            label = f"{month:%Y-%m}" if month else "default"
+            self.stdout.write(f"{name:40} {label:8} ~{rows} baris")
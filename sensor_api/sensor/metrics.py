@@ -0,0 +1,122 @@
+import threading
+from bisect import bisect_left
+
+# Metrik diagregasi in-process (per worker) dan diekspos dalam format teks Prometheus.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for label_values, value in sorted(items):
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_number(value)}"
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, (list(series[0]), series[1], series[2])) for labels, series in self._series.items()]
+        for label_values, (counts, total, count) in sorted(items):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _format_number(bound)
+                labels = _format_labels(self.labels, label_values, 'le="%s"' % le)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, label_values)} {_format_number(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, label_values)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+requests_total = registry.register(Counter(
+    'sensor_api_requests_total', "Jumlah request HTTP per view.", ('view', 'method', 'status')))
+request_duration = registry.register(Histogram(
+    'sensor_api_request_duration_seconds', "Latensi request HTTP per view.", LATENCY_BUCKETS,
+    ('view', 'method')))
+request_db_queries = registry.register(Histogram(
+    'sensor_api_request_db_queries', "Jumlah query DB per request.", COUNT_BUCKETS, ('view',)))
+request_db_duration = registry.register(Histogram(
+    'sensor_api_request_db_seconds', "Total waktu query DB per request.", LATENCY_BUCKETS, ('view',)))
+response_size = registry.register(Histogram(
+    'sensor_api_response_bytes', "Ukuran body response.", SIZE_BUCKETS, ('view',)))
+outbound_duration = registry.register(Histogram(
+    'sensor_api_outbound_request_seconds', "Latensi request keluar ke Raspberry Pi.", LATENCY_BUCKETS,
+    ('target', 'outcome')))
+response_cache_requests = registry.register(Counter(
+    'sensor_api_response_cache_requests_total', "Lookup cache response per view (hit/miss).",
+    ('view', 'outcome')))
+response_cache_evictions = registry.register(Counter(
+    'sensor_api_response_cache_evictions_total', "Entry cache response yang disingkirkan karena batas ukuran."))
+ingest_duplicates = registry.register(Counter(
+    'sensor_api_ingest_duplicate_rows_total', "Pembacaan yang dilewati karena (device, sequence) sudah tersimpan.",
+    ('path',)))
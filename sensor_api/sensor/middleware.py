@@ -0,0 +1,90 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+
+from . import metrics
+
+
+class QueryTracker:
+    """execute_wrapper yang menghitung jumlah dan total waktu query"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match._func_path
+
+
+def _record(request, response, elapsed, tracker=None):
+    view = _view_name(request)
+    metrics.requests_total.inc(view, request.method, str(response.status_code))
+    metrics.request_duration.observe(elapsed, view, request.method)
+    if tracker is not None:
+        metrics.request_db_queries.observe(tracker.count, view)
+        metrics.request_db_duration.observe(tracker.duration, view)
+    # Response streaming tidak punya ukuran pasti, jadi tidak dicatat
+    if not response.streaming:
+        metrics.response_size.observe(len(response.content), view)
+
+
+def _track_queries(stack, tracker):
+    """Pasang tracker di semua koneksi DB thread ini (koneksi Django per thread)"""
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(tracker))
+
+
+class MetricsMiddleware:
+    """Catat latensi, jumlah/waktu query DB, dan ukuran response per view.
+
+    Diletakkan paling atas di MIDDLEWARE agar seluruh request ikut terukur.
+    Di ASGI, view sync dan ORM dari view async (sync_to_async) berjalan di
+    thread thread-sensitive milik request, jadi tracker dipasang di koneksi
+    thread itu. Query yang berjalan saat response streaming dikirim (ekspor)
+    tidak ikut terhitung.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        tracker = QueryTracker()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            _track_queries(stack, tracker)
+            response = self.get_response(request)
+        _record(request, response, time.perf_counter() - started, tracker)
+        return response
+
+    async def __acall__(self, request):
+        tracker = QueryTracker()
+        started = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(_track_queries)(stack, tracker)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        _record(request, response, time.perf_counter() - started, tracker)
+        return response
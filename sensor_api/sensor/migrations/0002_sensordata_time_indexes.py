@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:16
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='powersystem',
+            options={'managed': False},
+        ),
+        migrations.AlterModelOptions(
+            name='sensordata',
+            options={'managed': False},
+        ),
+        # Tabel tidak dikelola Django (managed = False), jadi index dibuat manual.
+        # Dipakai oleh cursor pagination (timestamp, id) dan filter power_system.
+        migrations.RunSQL(
+            sql=[
+                'CREATE INDEX IF NOT EXISTS sensor_sensordata_ts_id_idx '
+                'ON sensor_sensordata (timestamp, id)',
+                'CREATE INDEX IF NOT EXISTS sensor_sensordata_ps_ts_idx '
+                'ON sensor_sensordata (power_system_id, timestamp, id)',
+                'CREATE INDEX IF NOT EXISTS sensor_powersystem_ts_id_idx '
+                'ON sensor_powersystem (timestamp, id)',
+            ],
+            reverse_sql=[
+                'DROP INDEX IF EXISTS sensor_sensordata_ts_id_idx',
+                'DROP INDEX IF EXISTS sensor_sensordata_ps_ts_idx',
+                'DROP INDEX IF EXISTS sensor_powersystem_ts_id_idx',
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensor', '0002_sensordata_time_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelTable(
+            name='powersystem',
+            table='sensor_powersystem',
+        ),
+        migrations.AlterModelTable(
+            name='sensordata',
+            table='sensor_sensordata',
+        ),
+        migrations.CreateModel(
+            name='PowerCommand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.BooleanField()),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('acked', 'Acknowledged'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('power_system', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='sensor.powersystem')),
+            ],
+        ),
+    ]
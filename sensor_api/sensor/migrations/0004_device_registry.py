@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensor', '0003_powercommand'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Device',
+            fields=[
+                ('id', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('address', models.CharField(blank=True, max_length=100)),
+                ('last_seen', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='powercommand',
+            name='device',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='sensor.device'),
+        ),
+        # Kolom device_id pada tabel unmanaged, data tiap device dipisah lewat
+        # index (device_id, timestamp) sehingga query satu lini tidak memindai lini lain.
+        migrations.RunSQL(
+            sql=[
+                'ALTER TABLE sensor_sensordata ADD COLUMN device_id varchar(50) NULL '
+                'REFERENCES sensor_device (id) DEFERRABLE INITIALLY DEFERRED',
+                'ALTER TABLE sensor_powersystem ADD COLUMN device_id varchar(50) NULL '
+                'REFERENCES sensor_device (id) DEFERRABLE INITIALLY DEFERRED',
+                'CREATE INDEX IF NOT EXISTS sensor_sensordata_device_ts_idx '
+                'ON sensor_sensordata (device_id, timestamp, id)',
+                'CREATE INDEX IF NOT EXISTS sensor_powersystem_device_idx '
+                'ON sensor_powersystem (device_id, id)',
+            ],
+            reverse_sql=[
+                'DROP INDEX IF EXISTS sensor_powersystem_device_idx',
+                'DROP INDEX IF EXISTS sensor_sensordata_device_ts_idx',
+                'ALTER TABLE sensor_powersystem DROP COLUMN device_id',
+                'ALTER TABLE sensor_sensordata DROP COLUMN device_id',
+            ],
+        ),
+    ]
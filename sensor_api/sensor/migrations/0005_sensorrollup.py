@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensor', '0004_device_registry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('power_system_id', models.BigIntegerField(null=True)),
+                ('count', models.PositiveIntegerField()),
+                ('stats', models.JSONField()),
+                ('good_product_delta', models.IntegerField()),
+                ('bad_product_delta', models.IntegerField()),
+                ('device', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='sensor.device')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket'], name='sensor_rollup_bucket_idx'), models.Index(fields=['device', 'bucket'], name='sensor_rollup_device_idx')],
+            },
+        ),
+    ]
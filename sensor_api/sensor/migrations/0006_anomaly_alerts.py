@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensor', '0005_sensorrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsCheckpoint',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AnomalyAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('timestamp', models.DateTimeField()),
+                ('metric', models.CharField(max_length=50)),
+                ('detector', models.CharField(choices=[('zscore', 'Rolling z-score'), ('ewma', 'EWMA drift'), ('spectral', 'Spectral band energy')], max_length=10)),
+                ('value', models.FloatField()),
+                ('score', models.FloatField()),
+                ('acknowledged', models.BooleanField(default=False)),
+                ('device', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='sensor.device')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['timestamp', 'id'], name='sensor_alert_ts_id_idx'), models.Index(fields=['device', 'timestamp'], name='sensor_alert_device_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensor', '0006_anomaly_alerts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductionMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.PositiveIntegerField()),
+                ('bucket', models.DateTimeField()),
+                ('good', models.IntegerField(default=0)),
+                ('bad', models.IntegerField(default=0)),
+                ('samples', models.IntegerField(default=0)),
+                ('run_seconds', models.FloatField(default=0)),
+                ('device', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='sensor.device')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('device', 'period', 'bucket'), name='sensor_production_bucket_uniq')],
+            },
+        ),
+    ]
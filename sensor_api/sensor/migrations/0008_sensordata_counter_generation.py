@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensor', '0007_production_metrics'),
+    ]
+
+    operations = [
+        # Generasi counter dari Pi (naik setiap reset), kolom pada tabel unmanaged.
+        # Null untuk data lama dan agent yang belum mengirim generasi.
+        migrations.RunSQL(
+            sql='ALTER TABLE sensor_sensordata ADD COLUMN counter_generation bigint NULL',
+            reverse_sql='ALTER TABLE sensor_sensordata DROP COLUMN counter_generation',
+        ),
+    ]
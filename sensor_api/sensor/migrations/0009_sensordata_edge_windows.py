@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensor', '0008_sensordata_counter_generation'),
+    ]
+
+    operations = [
+        # Baris dari pemrosesan edge di Pi mewakili sample_count pembacaan yang
+        # berakhir pada timestamp-nya, summary berisi [min, max, mean] per field
+        # analog. Null = satu pembacaan (data lama).
+        migrations.RunSQL(
+            sql=[
+                'ALTER TABLE sensor_sensordata ADD COLUMN sample_count integer NULL',
+                'ALTER TABLE sensor_sensordata ADD COLUMN summary jsonb NULL',
+            ],
+            reverse_sql=[
+                'ALTER TABLE sensor_sensordata DROP COLUMN summary',
+                'ALTER TABLE sensor_sensordata DROP COLUMN sample_count',
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:10
+
+from django.db import migrations
+
+from sensor import partitioning
+
+
+def create_sequence_index(apps, schema_editor):
+    # Tabel berpartisi: index unik wajib memuat kolom partisi (timestamp). Pi mengirim
+    # ulang baris yang identik, jadi duplikat tetap tertangkap oleh index ini.
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        partitioned = connection.vendor == 'postgresql' and partitioning.is_partitioned(cursor)
+        columns = partitioning.SEQUENCE_INDEX_COLUMNS if partitioned else '(device_id, sequence)'
+        cursor.execute(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS {partitioning.SEQUENCE_INDEX} '
+            f'ON sensor_sensordata {columns}'
+        )
+
+
+def drop_sequence_index(apps, schema_editor):
+    schema_editor.execute(f'DROP INDEX IF EXISTS {partitioning.SEQUENCE_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensor', '0009_sensordata_edge_windows'),
+    ]
+
+    operations = [
+        # Nomor urut pembacaan per device dari Pi. Null = agent lama (tanpa deduplikasi).
+        migrations.RunSQL(
+            sql='ALTER TABLE sensor_sensordata ADD COLUMN sequence bigint NULL',
+            reverse_sql='ALTER TABLE sensor_sensordata DROP COLUMN sequence',
+        ),
+        migrations.RunPython(create_sequence_index, reverse_code=drop_sequence_index),
+    ]
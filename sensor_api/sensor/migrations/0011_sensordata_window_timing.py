@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sensor', '0010_sensordata_sequence'),
+    ]
+
+    operations = [
+        # Waktu pembacaan pertama dan jarak antar pembacaan baris gabungan edge,
+        # dari Pi, agar deret per sampel bisa direkonstruksi tanpa menebak interval.
+        # Null = satu pembacaan atau agent lama.
+        migrations.RunSQL(
+            sql=[
+                'ALTER TABLE sensor_sensordata ADD COLUMN window_start timestamp with time zone NULL',
+                'ALTER TABLE sensor_sensordata ADD COLUMN sample_interval double precision NULL',
+            ],
+            reverse_sql=[
+                'ALTER TABLE sensor_sensordata DROP COLUMN sample_interval',
+                'ALTER TABLE sensor_sensordata DROP COLUMN window_start',
+            ],
+        ),
+    ]
@@ -1,10 +1,27 @@
 from django.db import models
 
+class Device(models.Model):
+    """Raspberry Pi (satu lini conveyor) yang terdaftar ke server"""
+    id = models.CharField(max_length=50, primary_key=True)
+    address = models.CharField(max_length=100, blank=True)  # host:port Flask server di Pi
+    last_seen = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Device {self.id}"
+
 class PowerSystem(models.Model):
     id = models.BigAutoField(primary_key=True)
     timestamp = models.DateTimeField()
     status = models.BooleanField()
     reason = models.CharField(max_length=50)
+    # Null = berlaku untuk semua device (perilaku lama)
+    device = models.ForeignKey(
+        Device,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        db_column='device_id'
+    )
 
     def __str__(self):
         return f"PowerSystem {self.id}"
@@ -24,11 +41,29 @@ class SensorData(models.Model):
     bottle_brightness = models.FloatField()
     good_product = models.IntegerField()
     bad_product = models.IntegerField()
+    # Naik setiap counter di-reset di Pi; null = agent lama (tidak diketahui)
+    counter_generation = models.BigIntegerField(null=True, blank=True)
+    # Jumlah pembacaan 1 Hz yang diwakili baris ini (berakhir di timestamp); null = 1
+    sample_count = models.PositiveIntegerField(null=True, blank=True)
+    # {field: [min, max, mean]} pembacaan yang digabung, hanya jika sample_count > 1
+    summary = models.JSONField(null=True, blank=True)
+    # Waktu pembacaan pertama dan jarak antar pembacaan (detik) baris gabungan; null = tidak diketahui
+    window_start = models.DateTimeField(null=True, blank=True)
+    sample_interval = models.FloatField(null=True, blank=True)
+    # Nomor urut pembacaan dari Pi, unik per device (ingest idempotent); null = agent lama
+    sequence = models.BigIntegerField(null=True, blank=True)
     power_system = models.ForeignKey(
         PowerSystem,
         on_delete=models.CASCADE,
         db_column='power_system_id'
     )
+    device = models.ForeignKey(
+        Device,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        db_column='device_id'
+    )
 
     def __str__(self):
         return f"SensorData {self.id}"
@@ -36,3 +71,109 @@ class SensorData(models.Model):
     class Meta:
         db_table = 'sensor_sensordata'
         managed = False
+
+class PowerCommand(models.Model):
+    """Perintah ON/OFF ke Raspberry Pi yang dikirim secara asynchronous"""
+    STATE_PENDING = 'pending'
+    STATE_ACKED = 'acked'
+    STATE_FAILED = 'failed'
+    STATE_CHOICES = [
+        (STATE_PENDING, 'Pending'),
+        (STATE_ACKED, 'Acknowledged'),
+        (STATE_FAILED, 'Failed'),
+    ]
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    status = models.BooleanField()
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=STATE_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True)
+    device = models.ForeignKey(Device, null=True, blank=True, on_delete=models.SET_NULL)
+    # Baris PowerSystem yang dibuat setelah Raspberry Pi mengonfirmasi perintah
+    power_system = models.ForeignKey(
+        PowerSystem,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
+
+    def __str__(self):
+        return f"PowerCommand {self.id} ({self.state})"
+
+class SensorRollup(models.Model):
+    """Agregat per jam dari partisi SensorData yang sudah melewati masa retensi"""
+    bucket = models.DateTimeField()
+    device = models.ForeignKey(Device, null=True, blank=True, on_delete=models.SET_NULL)
+    power_system_id = models.BigIntegerField(null=True)
+    count = models.PositiveIntegerField()
+    # {field: {"min", "max", "avg"}} untuk setiap kolom di rollups.ROLLUP_FIELDS
+    stats = models.JSONField()
+    good_product_delta = models.IntegerField()
+    bad_product_delta = models.IntegerField()
+
+    def __str__(self):
+        return f"SensorRollup {self.bucket:%Y-%m-%d %H:00} ({self.device_id})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bucket'], name='sensor_rollup_bucket_idx'),
+            models.Index(fields=['device', 'bucket'], name='sensor_rollup_device_idx'),
+        ]
+
+class AnomalyAlert(models.Model):
+    """Anomali yang ditemukan sensor/analytics.py pada data sensor"""
+    DETECTOR_ZSCORE = 'zscore'
+    DETECTOR_EWMA = 'ewma'
+    DETECTOR_SPECTRAL = 'spectral'
+    DETECTOR_CHOICES = [
+        (DETECTOR_ZSCORE, 'Rolling z-score'),
+        (DETECTOR_EWMA, 'EWMA drift'),
+        (DETECTOR_SPECTRAL, 'Spectral band energy'),
+    ]
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField()  # Waktu sampel yang memicu alert
+    device = models.ForeignKey(Device, null=True, blank=True, on_delete=models.SET_NULL)
+    metric = models.CharField(max_length=50)
+    detector = models.CharField(max_length=10, choices=DETECTOR_CHOICES)
+    value = models.FloatField()
+    score = models.FloatField()
+    acknowledged = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"AnomalyAlert {self.id} ({self.detector} {self.metric})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='sensor_alert_ts_id_idx'),
+            models.Index(fields=['device', 'timestamp'], name='sensor_alert_device_idx'),
+        ]
+
+class AnalyticsCheckpoint(models.Model):
+    """High-water mark (id SensorData terakhir) per job analitik"""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"AnalyticsCheckpoint {self.name} ({self.last_id})"
+
+class ProductionMetric(models.Model):
+    """Agregat produksi per bucket waktu (menit/jam), diperbarui setiap ingest (lihat production.py)"""
+    device = models.ForeignKey(Device, null=True, blank=True, on_delete=models.CASCADE)
+    period = models.PositiveIntegerField()  # Panjang bucket dalam detik (60 atau 3600)
+    bucket = models.DateTimeField()         # Awal bucket (UTC)
+    good = models.IntegerField(default=0)
+    bad = models.IntegerField(default=0)
+    samples = models.IntegerField(default=0)
+    run_seconds = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"ProductionMetric {self.device_id} {self.bucket} ({self.period}s)"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['device', 'period', 'bucket'], name='sensor_production_bucket_uniq'),
+        ]
@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TimeCursorPagination(CursorPagination):
+    """Keyset pagination berdasarkan (timestamp, id), stabil walau tabel terus bertambah"""
+    ordering = ('timestamp', 'id')
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+
+
+class RecentCursorPagination(TimeCursorPagination):
+    """Sama seperti TimeCursorPagination, tetapi data terbaru lebih dulu"""
+    ordering = ('-timestamp', '-id')
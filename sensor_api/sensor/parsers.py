@@ -0,0 +1,86 @@
+import json
+import struct
+import zlib
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .wire import MEDIA_TYPE as SENSOR_BINARY_MEDIA_TYPE, WireFormatError, decode_readings
+
+# Batas ukuran body setelah dekompresi (melindungi dari "gzip bomb")
+MAX_DECOMPRESSED_SIZE = 16 * 1024 * 1024
+
+
+def read_body(stream, parser_context=None):
+    """Baca body request, dekompres otomatis jika Content-Encoding gzip/deflate"""
+    body = stream.read() if stream is not None else b''
+    request = (parser_context or {}).get('request')
+    content_encoding = ''
+    if request is not None:
+        content_encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+
+    if content_encoding in ('', 'identity'):
+        return body
+    if content_encoding not in ('gzip', 'x-gzip', 'deflate'):
+        raise ParseError(f"Content-Encoding '{content_encoding}' tidak didukung")
+
+    # wbits + 32: deteksi header gzip/zlib secara otomatis
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 32)
+    try:
+        data = decompressor.decompress(body, MAX_DECOMPRESSED_SIZE)
+    except zlib.error as exc:
+        raise ParseError(f"Body {content_encoding} tidak valid: {exc}")
+    if decompressor.unconsumed_tail:
+        raise ParseError("Body terlalu besar setelah dekompresi")
+    return data
+
+
+def _charset(parser_context):
+    return (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+
+
+class GzipJSONParser(JSONParser):
+    """JSONParser yang juga menerima body terkompresi (Content-Encoding: gzip)"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        body = read_body(stream, parser_context)
+        try:
+            return json.loads(body.decode(_charset(parser_context)))
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class NDJSONParser(BaseParser):
+    """Parser NDJSON: satu objek JSON per baris, hasilnya berupa list"""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        body = read_body(stream, parser_context)
+        try:
+            text = body.decode(_charset(parser_context))
+        except UnicodeDecodeError as exc:
+            raise ParseError(f"NDJSON parse error - {exc}")
+
+        rows = []
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError(f"NDJSON parse error (baris {line_no}) - {exc}")
+        return rows
+
+
+class SensorBinaryParser(BaseParser):
+    """Parser format biner pembacaan sensor (lihat sensor/wire.py)"""
+    media_type = SENSOR_BINARY_MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        body = read_body(stream, parser_context)
+        try:
+            return decode_readings(body)
+        except (WireFormatError, UnicodeDecodeError, struct.error) as exc:
+            raise ParseError(f"Sensor binary parse error - {exc}")
@@ -0,0 +1,199 @@
+"""Helper partisi bulanan (PostgreSQL) untuk tabel sensor_sensordata.
+
+Semua fungsi menerima cursor sehingga bisa dipanggil dari management command
+maupun dari RunPython di migration. Partisi berupa RANGE per bulan (UTC) pada
+kolom timestamp, ditambah partisi default untuk data di luar rentang.
+"""
+import re
+from datetime import datetime, timezone
+
+from .rollups import ROLLUP_FIELDS
+
+PARENT = 'sensor_sensordata'
+LEGACY = 'sensor_sensordata_legacy'
+DEFAULT_PARTITION = 'sensor_sensordata_default'
+SEQUENCE = 'sensor_sensordata_id_seq'
+PARTITION_NAME = re.compile(r'^sensor_sensordata_p(\d{4})(\d{2})$')
+
+# Index dibuat di tabel induk dan otomatis diturunkan ke setiap partisi
+# (nama sama dengan migration 0002/0004)
+INDEXES = [
+    ('sensor_sensordata_ts_id_idx', '(timestamp, id)'),
+    ('sensor_sensordata_ps_ts_idx', '(power_system_id, timestamp, id)'),
+    ('sensor_sensordata_device_ts_idx', '(device_id, timestamp, id)'),
+]
+# Index unik idempotensi ingest (migration 0010). Di tabel berpartisi index unik
+# wajib memuat kolom partisi, jadi timestamp ikut; Pi mengirim ulang baris identik.
+SEQUENCE_INDEX = 'sensor_sensordata_device_seq_uniq'
+SEQUENCE_INDEX_COLUMNS = '(device_id, sequence, timestamp)'
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month):
+    return f'{PARENT}_p{month:%Y%m}'
+
+
+def is_partitioned(cursor):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [PARENT]
+    )
+    return cursor.fetchone() is not None
+
+
+def list_partitions(cursor):
+    """[(nama, bulan atau None untuk partisi default, estimasi jumlah baris)]"""
+    cursor.execute(
+        "SELECT c.relname, c.reltuples FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+        [PARENT]
+    )
+    partitions = []
+    for name, rows in cursor.fetchall():
+        match = PARTITION_NAME.match(name)
+        month = datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc) if match else None
+        partitions.append((name, month, max(int(rows), 0)))
+    return partitions
+
+
+def create_partition(cursor, month):
+    """Buat partisi satu bulan jika belum ada. Return True jika partisi baru dibuat.
+
+    Baris yang terlanjur masuk ke partisi default untuk bulan itu dipindahkan
+    lebih dulu, karena ATTACH akan gagal jika default masih memuat rentang tersebut.
+    """
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return False
+
+    start, end = month, add_months(month, 1)
+    cursor.execute(f'CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+        f'WHERE timestamp >= %s AND timestamp < %s RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved',
+        [start, end]
+    )
+    cursor.execute(
+        f"ALTER TABLE {PARENT} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    return True
+
+
+def ensure_partitions(cursor, now, ahead):
+    """Pastikan partisi bulan berjalan sampai `ahead` bulan ke depan sudah ada"""
+    created = []
+    current = month_start(now)
+    for offset in range(ahead + 1):
+        month = add_months(current, offset)
+        if create_partition(cursor, month):
+            created.append(partition_name(month))
+    return created
+
+
+def convert_to_partitioned(cursor, now, ahead):
+    """Ubah sensor_sensordata biasa menjadi tabel berpartisi, data lama ikut dipindahkan.
+
+    Harus dijalankan di dalam transaksi; tabel dikunci selama proses sehingga
+    ingest tertahan sampai selesai.
+    """
+    cursor.execute(f'LOCK TABLE {PARENT} IN ACCESS EXCLUSIVE MODE')
+    cursor.execute(f'ALTER TABLE {PARENT} RENAME TO {LEGACY}')
+
+    # Primary key tabel berpartisi wajib memuat kolom partisi
+    cursor.execute(
+        f'CREATE TABLE {PARENT} (LIKE {LEGACY} INCLUDING DEFAULTS, '
+        f'PRIMARY KEY (id, timestamp)) PARTITION BY RANGE (timestamp)'
+    )
+    cursor.execute(f'ALTER TABLE {PARENT} ALTER COLUMN id DROP DEFAULT')
+    cursor.execute(
+        f'ALTER TABLE {PARENT} '
+        f'ADD FOREIGN KEY (power_system_id) REFERENCES sensor_powersystem (id) '
+        f'DEFERRABLE INITIALLY DEFERRED, '
+        f'ADD FOREIGN KEY (device_id) REFERENCES sensor_device (id) '
+        f'DEFERRABLE INITIALLY DEFERRED'
+    )
+    cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT')
+
+    cursor.execute(f'SELECT min(timestamp) FROM {LEGACY}')
+    oldest = cursor.fetchone()[0]
+    month = month_start(oldest or now)
+    last = add_months(month_start(now), ahead)
+    while month <= last:
+        create_partition(cursor, month)
+        month = add_months(month, 1)
+
+    cursor.execute(f'INSERT INTO {PARENT} SELECT * FROM {LEGACY}')
+    # Sequence lama (serial/identity) ikut terhapus bersama tabel lama
+    cursor.execute(f'DROP TABLE {LEGACY}')
+
+    cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE} OWNED BY {PARENT}.id')
+    cursor.execute(f"ALTER TABLE {PARENT} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+    cursor.execute(
+        f"SELECT setval('{SEQUENCE}', COALESCE((SELECT max(id) FROM {PARENT}), 0) + 1, false)"
+    )
+    for index_name, columns in INDEXES:
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {PARENT} {columns}')
+    cursor.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {SEQUENCE_INDEX} ON {PARENT} {SEQUENCE_INDEX_COLUMNS}')
+
+
+def _summary_sql(field, index):
+    # Nilai dari summary baris gabungan edge, atau kolomnya sendiri untuk baris tunggal
+    return f"COALESCE((summary->'{field}'->>{index})::float8, {field})"
+
+
+def _rollup_sql(source):
+    weight = 'COALESCE(sample_count, 1)'
+    stats = ', '.join(
+        f"'{field}', jsonb_build_object("
+        f"'min', min({_summary_sql(field, 0)}), 'max', max({_summary_sql(field, 1)}), "
+        f"'avg', sum({_summary_sql(field, 2)} * {weight}) / sum({weight}))"
+        for field in ROLLUP_FIELDS
+    )
+    return (
+        'INSERT INTO sensor_sensorrollup (bucket, device_id, power_system_id, count, stats, '
+        'good_product_delta, bad_product_delta) '
+        f"SELECT date_trunc('hour', timestamp), device_id, power_system_id, sum({weight}), "
+        f'jsonb_build_object({stats}), '
+        'max(good_product) - min(good_product), max(bad_product) - min(bad_product) '
+        f'FROM {source} GROUP BY 1, 2, 3'
+    )
+
+
+def retire_partition(cursor, name, rollup=True, drop=True):
+    """Rollup partisi ke SensorRollup (per jam), lalu lepas dari tabel induk.
+
+    drop=False: partisi hanya di-detach dan diganti nama menjadi *_archive
+    agar bisa di-dump/dipindah sebelum dihapus manual.
+    Return jumlah baris rollup yang dibuat.
+    """
+    rollup_rows = 0
+    if rollup:
+        cursor.execute(_rollup_sql(name))
+        rollup_rows = cursor.rowcount
+    cursor.execute(f'ALTER TABLE {PARENT} DETACH PARTITION {name}')
+    if drop:
+        cursor.execute(f'DROP TABLE {name}')
+    else:
+        cursor.execute(f'ALTER TABLE {name} RENAME TO {name}_archive')
+    return rollup_rows
+
+
+def expired_partitions(cursor, now, keep_months):
+    """Partisi bulanan yang seluruh rentangnya lebih tua dari `keep_months` bulan"""
+    cutoff = add_months(month_start(now), -keep_months)
+    return [
+        (name, month, rows)
+        for name, month, rows in list_partitions(cursor)
+        if month is not None and month < cutoff
+    ]
@@ -0,0 +1,266 @@
+"""Agregat produksi (good/bad, sampel, run time) per menit dan per jam.
+
+Counter good_product/bad_product bersifat kumulatif dan bisa di-reset, jadi
+yang disimpan adalah delta antar pembacaan berurutan per device. Pi mengirim
+counter_generation yang naik setiap reset: generasi berubah = reset (delta =
+nilai baru), generasi sama tetapi nilai turun = regresi (mis. baris dari
+/api/resetcount/), dihitung 0 dan baseline tetap nilai tertinggi. Untuk data
+tanpa generasi, nilai yang turun dianggap reset.
+
+Data yang datang terlambat (backfill dari spool Pi) bisa terselip di antara
+pembacaan yang sudah dihitung. Karena itu setiap batch menghitung ulang
+rentang yang terdampak: kontribusi rantai pembacaan sesudah insert dikurangi
+kontribusi rantai sebelum insert, selisihnya ditambahkan ke bucket.
+"""
+import math
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Sum
+
+from .models import Device, ProductionMetric, SensorData
+
+# Nama bucket -> panjang (detik)
+PERIODS = {'1m': 60, '1h': 3600}
+
+# Jeda antar pembacaan lebih dari ini dianggap line tidak berjalan (mis. Pi offline)
+MAX_RUN_GAP = 5
+
+# Jumlah pembacaan di luar rentang batch yang ikut dihitung ulang di setiap sisi,
+# supaya baseline counter tetap benar walaupun ada baris regresi di tepi rentang
+# (sisi kanan diperpanjang jika perlu, lihat record_readings)
+EDGE_ROWS = 8
+
+# Key pg_advisory_xact_lock untuk rantai pembacaan tanpa device
+NULL_DEVICE_LOCK = 0x5E150016
+
+_FIELDS = ('timestamp', 'good_product', 'bad_product', 'motor_current', 'counter_generation', 'sample_count')
+
+
+def _bucket_start(timestamp, period):
+    epoch = int(timestamp.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % period, tz=timezone.utc)
+
+
+def _spread(totals, item, timestamp, sample_count, interval):
+    """Bagi sampel dan run time baris gabungan ke bucket setiap pembacaan yang diwakilinya.
+
+    Delta counter tetap masuk bucket pembacaan terakhir (timestamp baris).
+    """
+    first = timestamp - timedelta(seconds=(sample_count - 1) * interval)
+    for period in PERIODS.values():
+        done = 0
+        while done < sample_count:
+            at = first + timedelta(seconds=done * interval)
+            bucket = _bucket_start(at, period)
+            remaining = (bucket + timedelta(seconds=period) - at).total_seconds()
+            count = min(sample_count - done, math.ceil(remaining / interval))
+            done += count
+            part = Counter(samples=count, run_seconds=item['run_seconds'] * count / sample_count)
+            if done == sample_count:
+                part['good'], part['bad'] = item['good'], item['bad']
+            totals[(period, bucket)].update(part)
+
+
+def counter_delta(previous, current):
+    """Kenaikan counter kumulatif; counter yang turun berarti sudah di-reset"""
+    return current - previous if current >= previous else current
+
+
+def _deltas(chain):
+    """Delta setiap pembacaan rantai (urut waktu) terhadap pembacaan sebelumnya.
+
+    Yield (reading, Counter(good, bad, samples, run_seconds), baseline sesudahnya).
+    """
+    interval = settings.SENSOR_SAMPLE_INTERVAL
+    previous = None
+    baseline = None  # (good, bad) tertinggi sejak reset terakhir
+    for reading in chain:
+        timestamp, good, bad, motor_current, generation, sample_count = reading
+        sample_count = sample_count or 1
+        item = Counter(samples=sample_count)
+        if previous is not None:
+            if generation is not None and generation == previous[4]:
+                # Generasi sama: tidak ada reset, counter yang turun adalah regresi
+                item['good'] = max(good - baseline[0], 0)
+                item['bad'] = max(bad - baseline[1], 0)
+                baseline = (max(baseline[0], good), max(baseline[1], bad))
+            else:
+                if generation is not None and previous[4] is not None:
+                    # Generasi berubah: counter di-reset, semua nilainya produk baru
+                    item['good'], item['bad'] = good, bad
+                else:
+                    item['good'] = counter_delta(baseline[0], good)
+                    item['bad'] = counter_delta(baseline[1], bad)
+                baseline = (good, bad)
+            gap = (timestamp - previous[0]).total_seconds()
+            # Motor berhenti = nilai sensor 0 (lihat generate_sensor_data di Pi)
+            if gap <= MAX_RUN_GAP + (sample_count - 1) * interval and motor_current > 0:
+                item['run_seconds'] = gap
+        else:
+            baseline = (good, bad)
+        yield reading, item, baseline
+        previous = reading
+
+
+def contributions(chain):
+    """Kontribusi rantai pembacaan (urut waktu) ke setiap (period, bucket).
+
+    Return dict (period, bucket) -> Counter(good, bad, samples, run_seconds).
+    Delta dan run time pasangan pembacaan dihitung ke bucket pembacaan kedua.
+    Baris hasil penggabungan di Pi (sample_count > 1) mewakili sekian pembacaan
+    yang berakhir di timestamp-nya: jeda yang dianggap jalan ikut melebar dan
+    sampelnya dibagi ke bucket masing-masing pembacaan.
+    """
+    interval = settings.SENSOR_SAMPLE_INTERVAL
+    totals = defaultdict(Counter)
+    for reading, item, _ in _deltas(chain):
+        timestamp, sample_count = reading[0], reading[5] or 1
+        if sample_count > 1:
+            _spread(totals, item, timestamp, sample_count, interval)
+        else:
+            for period in PERIODS.values():
+                totals[(period, _bucket_start(timestamp, period))].update(item)
+    return totals
+
+
+def _final_baseline(chain):
+    baseline = None
+    for _, _, baseline in _deltas(chain):
+        pass
+    return baseline
+
+
+def _device_readings(device_id):
+    if device_id is None:
+        return SensorData.objects.filter(device__isnull=True)
+    return SensorData.objects.filter(device_id=device_id)
+
+
+def _apply(device_id, changes):
+    for (period, bucket), item in changes.items():
+        values = {name: item[name] for name in ('good', 'bad', 'samples', 'run_seconds')}
+        if not any(values.values()):
+            continue
+        lookup = {'period': period, 'bucket': bucket}
+        if device_id is None:
+            lookup['device__isnull'] = True
+        else:
+            lookup['device_id'] = device_id
+        updated = ProductionMetric.objects.filter(**lookup).update(
+            **{name: F(name) + value for name, value in values.items()}
+        )
+        if not updated:
+            ProductionMetric.objects.create(device_id=device_id, period=period, bucket=bucket, **values)
+
+
+def _lock_chain(device_id):
+    """Serialisasi update agregat satu device (thread upload dan backfill Pi bisa bersamaan)"""
+    if device_id is not None:
+        list(Device.objects.select_for_update().filter(id=device_id).values_list('id'))
+    elif connection.vendor == 'postgresql':
+        # Rantai tanpa device tidak punya baris Device untuk di-lock
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [NULL_DEVICE_LOCK])
+    # Backend lain (SQLite) hanya mengizinkan satu transaksi tulis sekaligus
+
+
+def record_readings(device_id, readings):
+    """Perbarui agregat setelah `readings` (SensorData) milik satu device tersimpan.
+
+    Harus dipanggil di dalam transaksi yang sama dengan insert.
+    """
+    _lock_chain(device_id)
+
+    batch = Counter(
+        (item.timestamp, item.good_product, item.bad_product, item.motor_current, item.counter_generation,
+         item.sample_count)
+        for item in readings
+    )
+    start = min(key[0] for key in batch)
+    end = max(key[0] for key in batch)
+    queryset = _device_readings(device_id)
+
+    # Beberapa pembacaan di kedua sisi ikut dihitung: sisi kiri menentukan baseline
+    # counter, sisi kanan menampung delta yang berubah; sisanya saling menghapus
+    before = list(queryset.filter(timestamp__lt=start).order_by('-timestamp', '-id').values_list(*_FIELDS)[:EDGE_ROWS])
+    before.reverse()
+    span = list(
+        queryset.filter(timestamp__gte=start, timestamp__lte=end).order_by('timestamp', 'id').values_list(*_FIELDS)
+    )
+
+    # Rantai lama = rentang yang sama tanpa pembacaan dari batch ini
+    remaining = Counter(batch)
+    old_span = []
+    for reading in span:
+        if remaining[reading] > 0:
+            remaining[reading] -= 1
+        else:
+            old_span.append(reading)
+
+    # Sisi kanan diperpanjang sampai baseline kedua rantai sama lagi (mis. batch
+    # terlambat diikuti lebih dari EDGE_ROWS baris regresi); sesudah itu delta identik
+    size = EDGE_ROWS
+    while True:
+        after = list(queryset.filter(timestamp__gt=end).order_by('timestamp', 'id').values_list(*_FIELDS)[:size])
+        new_chain = before + span + after
+        old_chain = before + old_span + after
+        if len(after) < size or _final_baseline(new_chain) == _final_baseline(old_chain):
+            break
+        size *= 2
+
+    changes = contributions(new_chain)
+    for key, item in contributions(old_chain).items():
+        changes[key].subtract(item)
+    _apply(device_id, changes)
+
+
+def rebuild(device_id):
+    """Hitung ulang seluruh agregat satu device dari tabel SensorData"""
+    if device_id is None:
+        ProductionMetric.objects.filter(device__isnull=True).delete()
+    else:
+        ProductionMetric.objects.filter(device_id=device_id).delete()
+    chain = _device_readings(device_id).order_by('timestamp', 'id').values_list(*_FIELDS)
+    totals = contributions(chain.iterator(chunk_size=5000))
+    ProductionMetric.objects.bulk_create([
+        ProductionMetric(
+            device_id=device_id, period=period, bucket=bucket,
+            good=item['good'], bad=item['bad'], samples=item['samples'], run_seconds=item['run_seconds'],
+        )
+        for (period, bucket), item in totals.items()
+    ], batch_size=1000)
+    return len(totals)
+
+
+def kpis(good, bad, run_seconds, seconds):
+    """KPI gaya OEE untuk satu interval: availability x performance x quality"""
+    total = good + bad
+    ideal_rate = settings.PRODUCTION_IDEAL_RATE
+    availability = run_seconds / seconds if seconds else None
+    quality = good / total if total else None
+    performance = None
+    if ideal_rate and run_seconds:
+        performance = total / (run_seconds * ideal_rate)
+    oee = None
+    if None not in (availability, performance, quality):
+        oee = availability * performance * quality
+    return {
+        "good": good,
+        "bad": bad,
+        "total": total,
+        "yield": quality,
+        "run_seconds": run_seconds,
+        "availability": availability,
+        "throughput_per_minute": total * 60 / run_seconds if run_seconds else None,
+        "performance": performance,
+        "oee": oee,
+    }
+
+
+def summarize(queryset, seconds):
+    """Jumlahkan baris ProductionMetric (satu period) menjadi KPI interval"""
+    totals = queryset.aggregate(good=Sum('good'), bad=Sum('bad'), run_seconds=Sum('run_seconds'))
+    return kpis(totals['good'] or 0, totals['bad'] or 0, totals['run_seconds'] or 0.0, seconds)
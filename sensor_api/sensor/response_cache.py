@@ -0,0 +1,177 @@
+"""Cache response untuk endpoint baca yang sering dipanggil (list API, data terbaru).
+
+Entry menyimpan body yang sudah di-encode, ditambah varian gzip yang dibuat
+saat pertama kali diminta, dalam LRU per proses dengan batas total ukuran
+RESPONSE_CACHE_MAX_BYTES. Key memuat URL, query param dan versi tabel. Versi
+disimpan di cache Django (sama untuk semua worker) dan diganti setiap kali ada
+penulisan, jadi entry lama tidak pernah terpakai lagi dan tersingkir oleh LRU.
+
+Halaman historis (?to= lebih tua dari RESPONSE_CACHE_SETTLE detik) hanya
+bergantung pada versi history tabel, yang diganti jika ada baris lama yang
+ditulis atau dihapus (backfill spool Pi yang sangat terlambat, retensi
+partisi). Karena itu halaman historis tetap dikirim dengan Cache-Control
+no-cache: spool Pi bisa backfill data berhari-hari ke belakang (saat idle satu
+baris mewakili heartbeat 60 detik), jadi browser/proxy harus revalidasi lewat
+ETag, bukan menyimpan salinan immutable yang bisa basi.
+"""
+import gzip
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+
+VERSION_KEY = 'response_version:{}'
+GZIP_MIN_SIZE = 1024  # Body lebih kecil dari ini tidak di-gzip
+ENTRY_OVERHEAD = 256  # Perkiraan ukuran objek entry dan key (byte)
+
+
+class CachedResponse:
+    """Body response yang sudah di-encode, plus varian gzip (dibuat saat dibutuhkan)"""
+
+    def __init__(self, body, content_type, etag=None):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag or f'"{hashlib.md5(body).hexdigest()[:16]}"'
+        self.gzipped = None
+
+    @property
+    def size(self):
+        return len(self.body) + len(self.gzipped or b'') + ENTRY_OVERHEAD
+
+
+class ResponseCache:
+    """LRU thread-safe dengan batas total ukuran (byte)"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        if entry.size > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous.size
+            self._entries[key] = entry
+            self.size += entry.size
+            self._evict()
+        return entry
+
+    def gzipped(self, key, entry):
+        """Body gzip entry, dikompres sekali lalu ikut dihitung dalam batas ukuran"""
+        if entry.gzipped is None:
+            data = gzip.compress(entry.body, compresslevel=6)
+            with self._lock:
+                if entry.gzipped is None:
+                    entry.gzipped = data
+                    if self._entries.get(key) is entry:
+                        self.size += len(data)
+                        self._evict()
+        return entry.gzipped
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.size -= entry.size
+            metrics.response_cache_evictions.inc()
+
+
+responses = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES)
+
+
+def history(table):
+    return f'{table}:history'
+
+
+def _token():
+    return uuid.uuid4().hex[:12]
+
+
+def versions(*tables):
+    keys = [VERSION_KEY.format(table) for table in tables]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # Key hilang (cache di-cull atau di-clear): isi token acak, bukan konstanta,
+        # agar entry LRU yang disimpan saat key sebelumnya hilang tidak cocok lagi.
+        # add() tidak menimpa token yang sudah diisi worker lain, jadi baca ulang.
+        for key in missing:
+            cache.add(key, _token(), None)
+        found.update(cache.get_many(missing))
+    # Masih hilang (mis. langsung di-cull lagi): token sekali pakai, tidak pernah cocok
+    return tuple(found.get(key) or _token() for key in keys)
+
+
+def bump(*tables):
+    # Token acak, bukan cache.incr: incr di FileBasedCache tidak atomic dan
+    # dua penulis bersamaan bisa menghasilkan versi yang sama
+    cache.set_many({VERSION_KEY.format(table): _token() for table in tables}, None)
+
+
+def settled_before():
+    """Batas waktu halaman historis: data sebelum ini dianggap tidak berubah lagi"""
+    return timezone.now() - timedelta(seconds=settings.RESPONSE_CACHE_SETTLE)
+
+
+def bump_rows(table, timestamps):
+    """Ganti versi tabel setelah penulisan; versi history juga jika ada baris lama"""
+    if any(timestamp < settled_before() for timestamp in timestamps if timestamp is not None):
+        bump(table, history(table))
+    else:
+        bump(table)
+
+
+def request_key(request, *parts):
+    """Key cache dari URL lengkap (tanpa query), query param terurut dan `parts`"""
+    params = tuple(sorted((name, value) for name, values in request.GET.lists() for value in values))
+    return (request.build_absolute_uri(request.path), params, *parts)
+
+
+def respond(request, key, entry):
+    """Response dari entry cache: 304 jika ETag cocok, gzip jika client mendukung"""
+    if entry.etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+    elif len(entry.body) >= GZIP_MIN_SIZE and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = HttpResponse(responses.gzipped(key, entry), content_type=entry.content_type)
+        response['Content-Encoding'] = 'gzip'
+        response['ETag'] = f'W/{entry.etag}'  # Body berbeda dari varian tanpa gzip
+    else:
+        response = HttpResponse(entry.body, content_type=entry.content_type)
+    if not response.has_header('ETag'):
+        response['ETag'] = entry.etag
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def lookup(key, view):
+    entry = responses.get(key)
+    metrics.response_cache_requests.inc(view, 'hit' if entry is not None else 'miss')
+    return entry
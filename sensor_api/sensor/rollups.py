@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.db.models import FloatField, Max, Min, Sum
+from django.db.models.fields.json import KT
+from django.db.models.functions import Cast, Coalesce, Trunc
+
+from .models import ProductionMetric
+
+# bucket -> (unit Trunc, rentang default jika ?from= tidak diisi)
+ROLLUP_BUCKETS = {
+    '1m': ('minute', timedelta(hours=6)),
+    '1h': ('hour', timedelta(days=7)),
+    '1d': ('day', timedelta(days=90)),
+}
+
+# bucket -> period ProductionMetric yang dijumlahkan untuk delta good/bad
+PRODUCTION_PERIODS = {'1m': 60, '1h': 3600, '1d': 3600}
+
+ROLLUP_FIELDS = [
+    'vibration_level', 'motor_voltage', 'motor_current',
+    'power_consumption', 'bottle_mass', 'bottle_brightness',
+]
+
+
+def _production_deltas(bucket, buckets, device=None):
+    """Delta good/bad per bucket dari ProductionMetric (lihat production.py).
+
+    Delta dihitung per device dari pembacaan berurutan, termasuk kenaikan antara
+    pembacaan terakhir bucket sebelumnya dan pembacaan pertama bucket ini, dan
+    reset counter sudah diperhitungkan. Tanpa device, semua device dijumlahkan.
+    """
+    if not buckets:
+        return {}
+    unit, _ = ROLLUP_BUCKETS[bucket]
+    metrics = ProductionMetric.objects.filter(
+        period=PRODUCTION_PERIODS[bucket], bucket__gte=buckets[0], bucket__lt=buckets[-1] + timedelta(days=1),
+    )
+    if device:
+        metrics = metrics.filter(device_id=device)
+    rows = (
+        metrics
+        .annotate(rollup_bucket=Trunc('bucket', unit))
+        .filter(rollup_bucket__in=buckets)
+        .values('rollup_bucket')
+        .annotate(good=Sum('good'), bad=Sum('bad'))
+    )
+    return {row['rollup_bucket']: (row['good'], row['bad']) for row in rows}
+
+
+def rollup_sensor_data(queryset, bucket, device=None):
+    """Agregasi data sensor per bucket waktu, dihitung di database (GROUP BY date_trunc).
+
+    Baris gabungan dari Pi dihitung sebanyak sample_count-nya, min/max/mean
+    diambil dari summary jika ada. Delta good/bad product diambil dari agregat
+    produksi per device (`device` = filter ?device= yang sama dengan queryset).
+    """
+    unit, _ = ROLLUP_BUCKETS[bucket]
+
+    weight = Coalesce('sample_count', 1)
+    aggregates = {'count': Sum(weight)}
+    for field in ROLLUP_FIELDS:
+        low, high, mean = (
+            Coalesce(Cast(KT(f'summary__{field}__{index}'), FloatField()), field) for index in range(3)
+        )
+        aggregates[f'{field}__min'] = Min(low)
+        aggregates[f'{field}__max'] = Max(high)
+        aggregates[f'{field}__sum'] = Sum(mean * weight, output_field=FloatField())
+
+    rows = list(
+        queryset
+        .annotate(bucket=Trunc('timestamp', unit))
+        .values('bucket')
+        .annotate(**aggregates)
+        .order_by('bucket')
+    )
+    deltas = _production_deltas(bucket, [row['bucket'] for row in rows], device)
+
+    results = []
+    for row in rows:
+        item = {"bucket": row['bucket'], "count": row['count']}
+        for field in ROLLUP_FIELDS:
+            item[field] = {
+                "min": row[f'{field}__min'],
+                "max": row[f'{field}__max'],
+                "avg": row[f'{field}__sum'] / row['count'],
+            }
+        item["good_product_delta"], item["bad_product_delta"] = deltas.get(row['bucket'], (0, 0))
+        results.append(item)
+    return results
@@ -0,0 +1,58 @@
+"""Pembagian baca/tulis antara database primary ('default') dan replica.
+
+Query tulis selalu ke primary. Query baca ke alias 'replica' hanya di dalam
+replica_reads() (view baca yang ditandai @read_replica dan request GET ke
+viewset), jadi ingest, perintah daya dan long-poll tetap membaca dari
+primary. Di dalam transaksi primary, query baca juga tetap ke primary agar
+data yang baru ditulis terlihat. Tanpa alias 'replica' di DATABASES semua
+query ke primary.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_replica = ContextVar('read_replica', default=False)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Arahkan query baca di dalam blok ini ke replica (enabled=False: paksa primary)"""
+    token = _read_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _read_replica.reset(token)
+
+
+def read_replica(view):
+    """Decorator view function: request GET/HEAD membaca dari replica"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads(request.method in SAFE_METHODS):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _read_replica.get() or REPLICA not in settings.DATABASES:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica adalah salinan primary: relasi antar alias aman
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
@@ -1,11 +1,30 @@
 from rest_framework import serializers
-from .models import PowerSystem, SensorData
+from .ingest import sample_interval_value, summary_value
+from .models import AnomalyAlert, Device, PowerCommand, PowerSystem, SensorData
 from django.utils import timezone
 
-class PowerSystemSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """Proyeksi kolom: jika kwarg `fields` diisi, hanya field tersebut yang diserialisasi"""
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class DeviceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Device
+        fields = ['id', 'address', 'last_seen']
+        read_only_fields = ['last_seen']
+
+
+class PowerSystemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = PowerSystem
-        fields = ['id', 'timestamp', 'status', 'reason']
+        fields = ['id', 'timestamp', 'status', 'reason', 'device']
         read_only_fields = ['id']
     
     def create(self, validated_data):
@@ -30,15 +49,45 @@ class PowerSystemSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
-class SensorDataSerializer(serializers.ModelSerializer):
+class SensorDataSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = SensorData
         fields = ['id', 'timestamp', 'vibration_level', 'motor_voltage', 'motor_current', 
                  'power_consumption', 'bottle_mass', 'bottle_brightness', 
-                 'good_product', 'bad_product', 'power_system']
+                 'good_product', 'bad_product', 'counter_generation', 'sample_count', 'summary',
+                 'window_start', 'sample_interval', 'sequence', 'power_system', 'device']
         read_only_fields = ['id']
+        extra_kwargs = {'sample_count': {'min_value': 1}, 'sequence': {'min_value': 1}}
+
+    def validate_summary(self, value):
+        try:
+            return summary_value(value)
+        except (TypeError, ValueError) as e:
+            raise serializers.ValidationError(str(e))
+
+    def validate_sample_interval(self, value):
+        try:
+            return sample_interval_value(value)
+        except (TypeError, ValueError) as e:
+            raise serializers.ValidationError(str(e))
 
 from rest_framework import serializers
 
 class PowerCommandSerializer(serializers.Serializer):
-    status = serializers.IntegerField()
+    status = serializers.IntegerField(min_value=0, max_value=1)
+    device = serializers.CharField(max_length=50, required=False)
+
+
+class PowerCommandStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PowerCommand
+        fields = ['id', 'created_at', 'updated_at', 'device', 'status', 'state', 'attempts', 'error',
+                  'power_system']
+
+
+class AnomalyAlertSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnomalyAlert
+        fields = ['id', 'created_at', 'timestamp', 'device', 'metric', 'detector', 'value', 'score',
+                  'acknowledged']
+        read_only_fields = ['id', 'created_at', 'timestamp', 'device', 'metric', 'detector', 'value', 'score']
@@ -0,0 +1,89 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import current_state, live, production, response_cache
+from .hub import relay
+from .models import Device, PowerSystem, SensorData
+
+# Dikirim setelah data sensor baru tersimpan, baik lewat save() maupun bulk_create().
+# Argumen: instances (list SensorData)
+sensor_data_created = Signal()
+
+# Interval minimum update Device.last_seen per device (detik)
+LAST_SEEN_INTERVAL = 10
+
+
+def bump_response_versions(instance, created=True):
+    """Ganti versi cache response tabel instance (dan history jika barisnya lama)"""
+    table = instance._meta.db_table
+    if created:
+        response_cache.bump_rows(table, [instance.timestamp])
+    else:
+        # Timestamp sebelum update tidak diketahui: anggap bisa menyentuh halaman historis
+        response_cache.bump(table, response_cache.history(table))
+
+
+@receiver(post_save, sender=PowerSystem)
+def power_system_saved(sender, instance, created, **kwargs):
+    def on_commit():
+        current_state.update_power(instance)
+        bump_response_versions(instance, created)
+        # Bangunkan long-poll /api/powersystem/changes/ dan kirim ke live feed dashboard
+        relay.publish('power', instance.id)
+        live.publish_power(instance)
+    transaction.on_commit(on_commit)
+
+
+@receiver(post_save, sender=SensorData)
+def sensor_data_saved(sender, instance, created, **kwargs):
+    if created:
+        sensor_data_created.send(sender=SensorData, instances=[instance])
+    else:
+        def on_commit():
+            current_state.invalidate(instance)
+            bump_response_versions(instance, created=False)
+        transaction.on_commit(on_commit)
+
+
+@receiver(sensor_data_created)
+def update_current_state(sender, instances, **kwargs):
+    def on_commit():
+        current_state.update_sensor(instances)
+        response_cache.bump_rows(SensorData._meta.db_table, [item.timestamp for item in instances])
+        live.publish_sensor(instances)
+    transaction.on_commit(on_commit)
+
+
+@receiver(sensor_data_created)
+def update_device_last_seen(sender, instances, **kwargs):
+    device_ids = {item.device_id for item in instances if item.device_id}
+    for device_id in device_ids:
+        # cache.add gagal jika key masih ada: maksimal satu UPDATE per interval
+        if cache.add(f'device_seen:{device_id}', True, LAST_SEEN_INTERVAL):
+            Device.objects.filter(id=device_id).update(last_seen=timezone.now())
+
+
+@receiver(sensor_data_created)
+def update_production_metrics(sender, instances, **kwargs):
+    by_device = defaultdict(list)
+    for item in instances:
+        by_device[item.device_id].append(item)
+    # Ikut transaksi insert (bulk/fast-path); save() biasa berjalan di autocommit
+    with transaction.atomic():
+        # Urutan lock tetap (device tanpa id terakhir) agar batch bersamaan tidak deadlock
+        for device_id in sorted(by_device, key=lambda device_id: (device_id is None, device_id or '')):
+            production.record_readings(device_id, by_device[device_id])
+
+
+@receiver(post_delete, sender=SensorData)
+@receiver(post_delete, sender=PowerSystem)
+def row_deleted(sender, instance, **kwargs):
+    def on_commit():
+        current_state.invalidate(instance)
+        bump_response_versions(instance)
+    transaction.on_commit(on_commit)
@@ -1,3 +1,912 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import math
+import random
+import struct
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from importlib.util import find_spec, module_from_spec, spec_from_file_location
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Sum
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from . import commands, current_state, export, ingest, live, metrics, production, response_cache, views, wire
+from .routers import REPLICA, PrimaryReplicaRouter, read_replica, replica_reads
+from .hub import Hub, hub
+from .models import (
+    AnalyticsCheckpoint, AnomalyAlert, Device, PowerCommand, PowerSystem, ProductionMetric, SensorData,
+)
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+HAS_NUMPY = find_spec('numpy') is not None
+
+
+def load_pi_module(name):
+    """Modul pi_agent/<name>.py (kode Raspberry Pi) tanpa memasang paket pi_agent"""
+    spec = spec_from_file_location(f'pi_agent_{name}', settings.BASE_DIR.parent / 'pi_agent' / f'{name}.py')
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def reading(**overrides):
+    """Pembacaan hasil decode_readings (timestamp datetime)"""
+    return {
+        'timestamp': T0 + timedelta(seconds=30),
+        'vibration_level': 50.5, 'motor_voltage': 17.25, 'motor_current': 55.0,
+        'power_consumption': 946.0, 'bottle_mass': 301.5, 'bottle_brightness': 0.75,
+        'good_product': 12, 'bad_product': 3, 'power_system': 1,
+        'counter_generation': 7, 'sample_count': 1, 'sequence': 1234567890123,
+        'device': 'line-1',
+        **overrides,
+    }
+
+
+def sensor_row(row_id, second, current, vibration=50.0, voltage=17.0, device='line-1'):
+    """Baris values_list(*analytics._COLUMNS)"""
+    return (row_id, device, T0 + timedelta(seconds=second), vibration, current, voltage)
+
+
+@unittest.skipUnless(HAS_NUMPY, "butuh NumPy")
+class AnomalyStartupTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(15)
+        # Berhenti -> jalan -> berhenti -> jalan; saat berhenti semua pembacaan 0
+        phases = [(0, 300), (1, 900), (0, 120), (1, 700)]
+        self.rows = []
+        for running, length in phases:
+            for _ in range(length):
+                second = len(self.rows)
+                if running:
+                    row = sensor_row(second + 1, second, rng.gauss(55, 1), rng.gauss(50, 1), rng.gauss(17, 0.3))
+                else:
+                    row = sensor_row(second + 1, second, 0.0, 0.0, 0.0)
+                self.rows.append(row)
+
+    def detect(self, rows):
+        from . import analytics
+        return analytics.detect(analytics.build_window([], rows))
+
+    def test_motor_start_does_not_alert(self):
+        self.assertEqual(self.detect(self.rows), [])
+
+    def test_spike_after_start_still_alerts(self):
+        row_id, device, timestamp, _, current, voltage = self.rows[-100]
+        self.rows[-100] = (row_id, device, timestamp, 80.0, current, voltage)
+        found = self.detect(self.rows)
+        self.assertIn(
+            ('zscore', 'vibration_level', timestamp),
+            [(item["detector"], item["metric"], item["timestamp"]) for item in found],
+        )
+
+
+@unittest.skipUnless(HAS_NUMPY, "butuh NumPy")
+class AnomalyCheckpointTests(TestCase):
+    def setUp(self):
+        from . import analytics
+        analytics._tails.update(last_id=None, rows={}, seen=set())
+        self.power = PowerSystem.objects.create(timestamp=T0, status=True, reason='test')
+        Device.objects.create(id='line-1')
+        self.checkpoint = AnalyticsCheckpoint.objects.create(name='anomaly', last_id=0)
+
+    def create(self, row_id):
+        SensorData.objects.create(
+            id=row_id, timestamp=T0 + timedelta(seconds=row_id), vibration_level=50, motor_voltage=17,
+            motor_current=55, power_consumption=0, bottle_mass=0, bottle_brightness=0,
+            good_product=0, bad_product=0, power_system=self.power, device_id='line-1',
+        )
+
+    def test_late_commit_below_high_water_mark_is_processed(self):
+        from . import analytics
+        for row_id in [*range(1, 11), 12]:
+            self.create(row_id)
+        self.assertEqual(analytics.process_new_data(self.checkpoint, 1000)[0], 11)
+        self.assertEqual(self.checkpoint.last_id, 12)
+
+        # Transaksi ingest lain dengan id 11 baru commit setelah checkpoint maju
+        self.create(11)
+        self.assertEqual(analytics.process_new_data(self.checkpoint, 1000)[0], 1)
+        self.assertEqual(self.checkpoint.last_id, 12)
+        self.assertEqual(analytics.process_new_data(self.checkpoint, 1000)[0], 0)
+
+    def test_redetected_alert_is_not_saved_twice(self):
+        from . import analytics
+        AnomalyAlert.objects.create(timestamp=T0, metric='vibration_level', detector='zscore', value=1, score=9)
+        AnomalyAlert.objects.create(
+            timestamp=T0 + timedelta(minutes=10), metric='vibration_level', detector='zscore', value=1, score=9,
+        )
+        candidate = {"device_id": None, "timestamp": T0, "metric": 'vibration_level',
+                     "detector": 'zscore', "value": 1.0, "score": 9.0}
+        self.assertEqual(analytics.save_alerts([candidate]), [])
+        self.assertEqual(AnomalyAlert.objects.count(), 2)
+
+
+class WireFormatTests(SimpleTestCase):
+    def setUp(self):
+        self.pi_wire = load_pi_module('wire')
+        self.summary = {field: [1.0, 3.0, 2.0] for field in wire.ANALOG_FIELDS}
+        self.readings = [
+            reading(),
+            reading(timestamp=T0 + timedelta(seconds=40), sample_count=10, summary=self.summary, sequence=99,
+                    window_start=T0 + timedelta(seconds=35.5), sample_interval=0.5),
+        ]
+
+    def pi_readings(self):
+        """Bentuk pembacaan di Pi: timestamp string detik UTC, window_start ISO milidetik"""
+        readings = [{**item, 'timestamp': item['timestamp'].strftime('%Y-%m-%dT%H:%M:%SZ')} for item in self.readings]
+        for item in readings:
+            if 'window_start' in item:
+                item['window_start'] = item['window_start'].isoformat(timespec='milliseconds')
+        return readings
+
+    def test_round_trip(self):
+        self.assertEqual(wire.decode_readings(wire.encode_readings(self.readings)), self.readings)
+
+    def test_pi_encoding_matches_server(self):
+        self.assertEqual(self.pi_wire.VERSION, wire.VERSION)
+        self.assertEqual(self.pi_wire.MAGIC, wire.MAGIC)
+        self.assertEqual(self.pi_wire.encode_readings(self.pi_readings()), wire.encode_readings(self.readings))
+        self.assertEqual(wire.decode_readings(self.pi_wire.encode_readings(self.pi_readings())), self.readings)
+
+    def test_unknown_generation_and_sequence(self):
+        legacy = reading(counter_generation=None, sequence=None)
+        self.assertEqual(wire.decode_readings(wire.encode_readings([legacy])), [legacy])
+
+    def test_summary_only_for_aggregated_records(self):
+        single, aggregated = (wire.encode_readings([item]) for item in self.readings)
+        header = wire.HEADER.size + len('line-1')
+        self.assertEqual(len(single), header + wire.RECORD.size)
+        self.assertEqual(len(aggregated), header + wire.RECORD.size + wire.AGGREGATE.size + wire.WINDOW.size)
+
+    def test_malformed_payloads(self):
+        data = wire.encode_readings(self.readings)
+        flags = wire.HEADER.size + len('line-1') + wire.RECORD.size - 1
+        cases = {
+            'flag tidak dikenal': data[:flags] + bytes([0x80]) + data[flags + 1:],
+            'summary terpotong': data[:-wire.AGGREGATE.size - wire.WINDOW.size],
+            'window terpotong': data[:-wire.WINDOW.size],
+            'header terlalu pendek': data[:3],
+            'magic salah': b'XX' + data[2:],
+            'versi tidak dikenal': data[:2] + bytes([99]) + data[3:],
+            'versi lama': data[:2] + bytes([wire.VERSION - 1]) + data[3:],
+            'record terpotong': data[:-1],
+            'record berlebih': data + b'\0',
+            'jumlah record salah': data[:4] + (3).to_bytes(2, 'little') + data[6:],
+        }
+        for name, payload in cases.items():
+            with self.subTest(name):
+                with self.assertRaises(wire.WireFormatError):
+                    wire.decode_readings(payload)
+
+    def test_pi_rejects_oversized_batch(self):
+        with self.assertRaises(ValueError):
+            self.pi_wire.encode_readings(self.pi_readings() * (self.pi_wire.MAX_RECORDS // 2 + 1))
+
+
+class BinaryIngestTests(TestCase):
+    def post(self, body, encoding='gzip'):
+        headers = {'HTTP_CONTENT_ENCODING': encoding} if encoding else {}
+        return self.client.post('/api/sensordata/ingest/', body, content_type=wire.MEDIA_TYPE, **headers)
+
+    def test_binary_batch_is_saved(self):
+        PowerSystem.objects.create(id=1, timestamp=T0, status=True, reason='test')
+        Device.objects.create(id='line-1')
+        response = self.post(gzip.compress(wire.encode_readings([reading(), reading(sequence=5)])))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(sorted(SensorData.objects.values_list('sequence', flat=True)), [5, 1234567890123])
+
+    def test_malformed_binary_is_rejected(self):
+        data = wire.encode_readings([reading()])
+        record = wire.HEADER.size + len('line-1')
+        timestamps = [data[:record] + struct.pack('<d', value) + data[record + 8:]
+                      for value in (math.nan, math.inf, -math.inf, 1e20)]
+        window = wire.encode_readings([reading(sample_count=2, window_start=T0, sample_interval=1.0)])
+        window = window[:-wire.WINDOW.size] + wire.WINDOW.pack(math.nan, 1.0)
+        for body, encoding in ((gzip.compress(data[:-4]), 'gzip'), (b'\xff' * 8, None), (data[:8], None),
+                               (b'bukan gzip', 'gzip'), *((body, None) for body in [*timestamps, window])):
+            with self.subTest(body=body[:8]):
+                self.assertEqual(self.post(body, encoding).status_code, 400)
+        self.assertFalse(SensorData.objects.exists())
+
+
+class ExportExpandTests(TestCase):
+    def setUp(self):
+        PowerSystem.objects.create(id=1, timestamp=T0, status=True, reason='test')
+        Device.objects.create(id='line-1')
+
+    def expanded(self):
+        response = self.client.get('/api/sensordata/export/', {'fmt': 'ndjson', 'expand': 1})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        return [json.loads(line)['timestamp'] for line in lines]
+
+    def test_window_timing_from_pi(self):
+        # ReplaySource dipercepat 2x: jarak antar pembacaan 0,5 detik, bukan SENSOR_SAMPLE_INTERVAL
+        row = {**reading(sample_count=4, summary={}, window_start='2026-01-01T00:00:28.250Z',
+                         sample_interval=0.5), 'timestamp': '2026-01-01T00:00:29Z'}
+        response = self.client.post('/api/sensordata/ingest/', json.dumps([row]), content_type='application/json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.expanded(), [
+            (T0 + timedelta(seconds=second)).isoformat() for second in (28.25, 28.75, 29.25, 29.75)
+        ])
+
+    def test_rows_without_window_end_at_timestamp(self):
+        row = {**reading(sample_count=3, summary={}), 'timestamp': '2026-01-01T00:00:30Z'}
+        self.client.post('/api/sensordata/ingest/', json.dumps([row]), content_type='application/json')
+        self.assertEqual(self.expanded(), [(T0 + timedelta(seconds=second)).isoformat() for second in (28, 29, 30)])
+
+
+class ExportStreamingTests(TestCase):
+    URL = '/api/sensordata/export/'
+
+    def setUp(self):
+        PowerSystem.objects.create(id=1, timestamp=T0, status=True, reason='test')
+        SensorData.objects.bulk_create([
+            SensorData(timestamp=T0 + timedelta(seconds=second), vibration_level=50.0, motor_voltage=17.0,
+                       motor_current=55.0, power_consumption=65.0, bottle_mass=54.0, bottle_brightness=75.0,
+                       good_product=second, bad_product=0, power_system_id=1)
+            for second in range(7)
+        ])
+        # Potongan kecil agar ekspor terbagi ke beberapa fetch
+        patcher = mock.patch.object(export, 'FETCH_CHUNK', 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wsgi_export(self, headers=None):
+        response = self.client.get(self.URL, {'fmt': 'csv'}, headers=headers)
+        self.assertFalse(response.is_async)
+        return b''.join(response.streaming_content)
+
+    async def asgi_export(self, headers=None):
+        response = await self.async_client.get(self.URL, {'fmt': 'csv'}, headers=headers)
+        # Iterator async: StreamingHttpResponse tidak menampung seluruh ekspor dengan list()
+        self.assertTrue(response.is_async)
+        return [chunk async for chunk in response.streaming_content]
+
+    async def test_asgi_streams_same_body_in_chunks(self):
+        chunks = await self.asgi_export()
+        self.assertGreater(len(chunks), 2)
+        body = b''.join(chunks)
+        self.assertEqual(body, await sync_to_async(self.wsgi_export)())
+        self.assertEqual(len(body.decode().splitlines()), 8)
+
+    async def test_asgi_gzip(self):
+        chunks = await self.asgi_export({'Accept-Encoding': 'gzip'})
+        self.assertEqual(gzip.decompress(b''.join(chunks)), await sync_to_async(self.wsgi_export)())
+
+    def test_empty_export_has_header(self):
+        SensorData.objects.all().delete()
+        self.assertEqual(self.wsgi_export().decode(), ','.join(export.EXPORT_FIELDS) + '\n')
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        PowerSystem.objects.create(id=1, timestamp=T0, status=True, reason='test')
+        Device.objects.bulk_create([Device(id='line-1'), Device(id='line-2')])
+        ingest.known_devices.reload()  # Cache ID device in-process dari test sebelumnya
+        # (device, detik, good, bad): menit pertama berakhir di detik 60
+        readings = [
+            ('line-1', 50, 10, 1), ('line-2', 55, 100, 7),
+            ('line-1', 70, 15, 1), ('line-2', 75, 103, 9), ('line-1', 80, 2, 0),
+        ]
+        rows = [
+            {**reading(good_product=good, bad_product=bad, device=device, sequence=index + 1, counter_generation=None),
+             'timestamp': (T0 + timedelta(seconds=second)).strftime('%Y-%m-%dT%H:%M:%SZ')}
+            for index, (device, second, good, bad) in enumerate(readings)
+        ]
+        for row in rows:
+            self.client.post('/api/sensordata/ingest/', json.dumps([row]), content_type='application/json')
+
+    def deltas(self, **params):
+        response = self.client.get('/api/sensordata/rollup/', {'bucket': '1m', 'from': T0.isoformat(), **params})
+        self.assertEqual(response.status_code, 200)
+        return [(item['count'], item['good_product_delta'], item['bad_product_delta'])
+                for item in response.json()['results']]
+
+    def test_deltas_per_device_across_bucket_boundary(self):
+        # Menit kedua: line-1 naik 5 lalu reset ke 2 (+2), line-2 naik 3; bukan selisih antar device
+        self.assertEqual(self.deltas(), [(2, 0, 0), (3, 10, 2)])
+
+    def test_device_filter(self):
+        self.assertEqual(self.deltas(device='line-2'), [(1, 0, 0), (1, 3, 2)])
+
+
+def chain_row(second, good, bad=0, generation=1, current=55.0):
+    """Baris values_list(*production._FIELDS)"""
+    return (T0 + timedelta(seconds=second), good, bad, current, generation, None)
+
+
+class ProductionContributionTests(SimpleTestCase):
+    def totals(self, chain):
+        result = production.contributions(chain)
+        return (sum(item['good'] for (period, _), item in result.items() if period == 60),
+                sum(item['bad'] for (period, _), item in result.items() if period == 60))
+
+    def test_generation_change_is_reset(self):
+        self.assertEqual(self.totals([chain_row(0, 10, 2), chain_row(1, 13, 2), chain_row(2, 3, 1, generation=2)]),
+                         (6, 1))
+
+    def test_drop_without_generation_is_reset(self):
+        rows = [chain_row(0, 10, generation=None), chain_row(1, 12, generation=None),
+                chain_row(2, 4, generation=None)]
+        self.assertEqual(self.totals(rows), (6, 0))
+
+    def test_regression_keeps_baseline(self):
+        # Baris regresi (mis. dari /api/resetcount/) dihitung 0 dan tidak menurunkan baseline
+        rows = [chain_row(0, 10, 5), chain_row(1, 0, 0), chain_row(2, 12, 5), chain_row(3, 13, 6)]
+        self.assertEqual(self.totals(rows), (3, 1))
+
+    def test_run_seconds_skip_gaps_and_stops(self):
+        rows = [chain_row(0, 0), chain_row(1, 0), chain_row(2, 0, current=0.0), chain_row(30, 0)]
+        result = production.contributions(rows)
+        self.assertEqual(sum(item['run_seconds'] for (period, _), item in result.items() if period == 3600), 1)
+
+
+class ProductionRecordTests(TestCase):
+    def setUp(self):
+        self.power = PowerSystem.objects.create(timestamp=T0, status=True, reason='test')
+        Device.objects.create(id='line-1')
+
+    def insert(self, device, rows):
+        """Simpan baris (second, good, bad) lalu perbarui agregat, seperti save_readings"""
+        with transaction.atomic():
+            created = SensorData.objects.bulk_create([
+                SensorData(
+                    timestamp=T0 + timedelta(seconds=second), vibration_level=50, motor_voltage=17,
+                    motor_current=55, power_consumption=0, bottle_mass=0, bottle_brightness=0,
+                    good_product=good, bad_product=bad, counter_generation=1,
+                    power_system=self.power, device_id=device,
+                )
+                for second, good, bad in rows
+            ])
+            production.record_readings(device, created)
+
+    def stored(self):
+        return {
+            (row.device_id, row.period, row.bucket): (row.good, row.bad, row.samples, round(row.run_seconds, 6))
+            for row in ProductionMetric.objects.all()
+        }
+
+    def assert_matches_rebuild(self, device):
+        incremental = self.stored()
+        production.rebuild(device)
+        self.assertEqual(incremental, self.stored())
+
+    def test_backfill_into_counted_bucket(self):
+        for device in ('line-1', None):
+            with self.subTest(device=device):
+                rows = [(second, second * 2, second // 3) for second in range(20)]
+                late = rows[5:8]
+                self.insert(device, rows[:5])
+                self.insert(device, rows[8:])
+                self.insert(device, late)
+                self.assert_matches_rebuild(device)
+                good = ProductionMetric.objects.filter(device_id=device, period=60).aggregate(total=Sum('good'))
+                self.assertEqual(good['total'], rows[-1][1] - rows[0][1])
+
+    def test_late_row_before_long_regression_run(self):
+        # Lebih dari EDGE_ROWS baris regresi sesudah baris terlambat: sisi kanan harus diperpanjang
+        rows = [(second, second + 1, 0) for second in range(5)]
+        late = (5, 6, 0)
+        rows += [(second, 0, 0) for second in range(6, 6 + production.EDGE_ROWS * 2 + 1)]
+        rows += [(100, 8, 0), (101, 9, 0)]
+        self.insert('line-1', rows)
+        self.insert('line-1', [late])
+        self.assert_matches_rebuild('line-1')
+
+    def test_late_row_after_regression_run_within_edge(self):
+        # EDGE_ROWS - 1 baris regresi sebelum baris terlambat: baseline masih terlihat di sisi kiri
+        rows = [(second, second + 1, 0) for second in range(5)]
+        rows += [(second, 0, 0) for second in range(5, 5 + production.EDGE_ROWS - 1)]
+        late_second = 5 + production.EDGE_ROWS - 1
+        rows += [(late_second + 1, 9, 0), (late_second + 2, 10, 0)]
+        self.insert('line-1', rows)
+        self.insert('line-1', [(late_second, 7, 0)])
+        self.assert_matches_rebuild('line-1')
+
+
+class IngestDedupeTests(TestCase):
+    def setUp(self):
+        PowerSystem.objects.create(id=1, timestamp=T0, status=True, reason='test')
+        Device.objects.create(id='line-1')
+
+    def batch(self, sequences, device='line-1'):
+        return [
+            {**reading(timestamp=T0 + timedelta(seconds=index), sequence=sequence, device=device,
+                       good_product=index, bad_product=0),
+             'timestamp': (T0 + timedelta(seconds=index)).strftime('%Y-%m-%dT%H:%M:%SZ')}
+            for index, sequence in enumerate(sequences)
+        ]
+
+    def post(self, url, rows):
+        return self.client.post(url, json.dumps(rows), content_type='application/json')
+
+    def test_resent_batch_is_skipped(self):
+        rows = self.batch(range(100, 110))
+        self.assertEqual(self.post('/api/sensordata/ingest/', rows).status_code, 204)
+        # Kirim ulang sebagian batch ditambah pembacaan baru dan duplikat di dalam batch
+        resent = rows[5:] + self.batch(range(100, 112))[10:] + rows[-1:]
+        self.assertEqual(self.post('/api/sensordata/ingest/', resent).status_code, 204)
+        self.assertEqual(self.post('/api/sensordata/ingest/', rows).status_code, 204)
+        self.assertEqual(sorted(SensorData.objects.values_list('sequence', flat=True)), list(range(100, 112)))
+
+        # Duplikat tidak ikut dihitung ke agregat produksi
+        fields = ('period', 'bucket', 'good', 'bad', 'samples', 'run_seconds')
+        incremental = sorted(ProductionMetric.objects.values_list(*fields))
+        production.rebuild('line-1')
+        self.assertEqual(incremental, sorted(ProductionMetric.objects.values_list(*fields)))
+
+    def test_bulk_reports_duplicates(self):
+        response = self.post('/api/sensordata/bulk/', self.batch([1, 2, 3]))
+        self.assertEqual((response.data['count'], response.data['duplicates']), (3, 0))
+        response = self.post('/api/sensordata/bulk/', self.batch([2, 3, 4, 4]))
+        self.assertEqual((response.data['count'], response.data['duplicates']), (1, 3))
+        self.assertEqual(SensorData.objects.count(), 4)
+
+    def test_create_returns_existing_row(self):
+        row = self.batch([7])[0]
+        first = self.post('/api/sensordata/', row)
+        second = self.post('/api/sensordata/', row)
+        self.assertEqual((first.status_code, second.status_code), (201, 200))
+        self.assertEqual(first.data['id'], second.data['id'])
+
+    def test_rows_without_sequence_are_kept(self):
+        rows = self.batch([None, None]) + self.batch([None], device=None)
+        self.post('/api/sensordata/ingest/', rows)
+        self.post('/api/sensordata/ingest/', rows)
+        self.assertEqual(SensorData.objects.count(), 6)
+
+    def test_insert_rows_maps_ids_to_rows(self):
+        self.post('/api/sensordata/ingest/', self.batch([3]))
+        values = ingest.validate_rows(self.batch([None, 3, 5, None, 5, 6]))
+        created = ingest.insert_rows(values)
+        self.assertEqual([item[ingest.SEQUENCE_INDEX] for _, item in created], [None, 5, None, 6])
+        for row_id, item in created:
+            row = SensorData.objects.get(id=row_id)
+            self.assertEqual((row.timestamp, row.sequence), (item[0], item[ingest.SEQUENCE_INDEX]))
+
+    def test_unregistered_device_is_forbidden(self):
+        # 403, bukan 400: agent menyimpan batch dan mendaftar ulang, tidak membuangnya
+        ingest.known_devices.reload()
+        response = self.post('/api/sensordata/ingest/', self.batch([1], device='line-9'))
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('tidak terdaftar', response.json()['error'])
+        self.assertEqual(self.post('/api/sensordata/ingest/', self.batch([1])).status_code, 204)
+
+
+class SequenceCounterTests(SimpleTestCase):
+    def setUp(self):
+        self.counters = load_pi_module('counters')
+        self.spool_module = load_pi_module('spool')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/spool.db'
+
+    def take(self, counter, count):
+        async def run():
+            return [await counter.next() for _ in range(count)]
+        return asyncio.run(run())
+
+    def test_numbers_keep_increasing_across_restart(self):
+        spool = self.spool_module.Spool(self.path, 100)
+        first = self.take(self.counters.SequenceCounter(spool.reserve_sequence, block=4), 10)
+        spool.close()
+        # Agent restart: sisa blok yang belum terpakai dilewati
+        spool = self.spool_module.Spool(self.path, 100)
+        self.addCleanup(spool.close)
+        second = self.take(self.counters.SequenceCounter(spool.reserve_sequence, block=4), 10)
+        numbers = first + second
+        self.assertEqual(numbers, sorted(set(numbers)))
+
+    def test_reserve_runs_off_the_event_loop(self):
+        threads = []
+
+        def reserve(count):
+            threads.append(threading.get_ident())
+            return len(threads) * 100
+
+        counter = self.counters.SequenceCounter(reserve, block=2)
+        self.assertEqual(self.take(counter, 5), [100, 101, 200, 201, 300])
+        self.assertNotIn(threading.get_ident(), threads)
+
+
+class MetricsMiddlewareTests(TestCase):
+    def query_stats(self, view):
+        """(jumlah request, total query) histogram request_db_queries untuk `view`"""
+        stats = {'count': 0, 'sum': 0.0}
+        for line in metrics.request_db_queries.samples():
+            for kind in stats:
+                if line.startswith(f'sensor_api_request_db_queries_{kind}{{view="{view}"}}'):
+                    stats[kind] = float(line.split()[-1])
+        return stats['count'], stats['sum']
+
+    async def test_queries_recorded_under_asgi(self):
+        # AsyncClient menjalankan middleware dalam mode async seperti uvicorn
+        count, total = self.query_stats('device-list')
+        response = await self.async_client.get('/api/devices/')
+        self.assertEqual(response.status_code, 200)
+        new_count, new_total = self.query_stats('device-list')
+        self.assertEqual(new_count, count + 1)
+        self.assertGreater(new_total, total)
+
+
+class PowerChangesTests(TestCase):
+    URL = '/api/powersystem/changes/'
+
+    def test_wsgi_answers_without_waiting(self):
+        response = self.client.get(self.URL, {'since_id': 0, 'timeout': 30})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['Retry-After'], str(views.POWER_POLL_RETRY_AFTER))
+
+        power = PowerSystem.objects.create(timestamp=T0, status=True, reason='test')
+        response = self.client.get(self.URL, {'since_id': 0})
+        self.assertEqual(response.json()['id'], power.id)
+
+    async def test_waiters_over_limit_answer_without_waiting(self):
+        with mock.patch.object(views, 'POWER_POLL_MAX_WAITERS', 0):
+            response = await asyncio.wait_for(self.async_client.get(self.URL, {'timeout': 30}), 2)
+        self.assertEqual(response.status_code, 204)
+        self.assertIn('Retry-After', response)
+
+    async def test_asgi_wakes_on_publish(self):
+        poll = asyncio.create_task(self.async_client.get(self.URL, {'since_id': 0, 'timeout': 30}))
+        while hub.count('power') == 0:
+            await asyncio.sleep(0.01)
+        power = await sync_to_async(PowerSystem.objects.create)(timestamp=T0, status=False, reason='test')
+        hub.publish('power', power.id)
+        # Lebih cepat dari POWER_POLL_RECHECK: dibangunkan hub, bukan cek ulang berkala
+        response = await asyncio.wait_for(poll, views.POWER_POLL_RECHECK - 2)
+        self.assertEqual(response.json()['id'], power.id)
+        self.assertNotIn('Retry-After', response)
+
+
+
+def requests_error():
+    return commands.requests.ConnectionError('Pi offline')
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(commands.time, 'monotonic', return_value=100.0)
+        self.clock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = commands.CircuitBreaker(threshold=2, reset_timeout=30)
+
+    def test_opens_after_threshold(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_after_reset_timeout(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.return_value = 130.0
+        self.assertTrue(self.breaker.allow())
+        # Percobaan half-open gagal: terbuka lagi untuk reset_timeout berikutnya
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertTrue(self.breaker.allow())
+
+
+class CommandDispatcherTests(TestCase):
+    def setUp(self):
+        self.dispatcher = commands.CommandDispatcher()
+        self.addCleanup(lambda: [channel.close() for channel in self.dispatcher._channels.values()])
+        patcher = mock.patch.object(commands.time, 'sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, base_url, device_id):
+        with mock.patch.object(commands.CommandDispatcher, '_run') as run:
+            self.dispatcher.submit(1, base_url, device_id).result(timeout=5)
+        return run.call_args.args[1]
+
+    def test_channel_replaced_when_address_changes(self):
+        channel = self.submit('http://10.0.0.1', 'line-1')
+        self.assertIs(self.submit('http://10.0.0.1/', 'line-1'), channel)
+        self.assertIsNot(self.submit('http://10.0.0.1', 'line-2'), channel)
+
+        moved = self.submit('http://10.0.0.2', 'line-1')
+        self.assertEqual(moved.base_url, 'http://10.0.0.2')
+        self.assertEqual(len(self.dispatcher._channels), 2)
+        # Worker channel lama sudah dihentikan
+        with self.assertRaises(RuntimeError):
+            channel.executor.submit(print)
+
+    def deliver(self, *responses):
+        command = PowerCommand.objects.create(status=True)
+        channel = commands.DeviceChannel('http://10.0.0.1')
+        self.addCleanup(channel.close)
+        channel.send = mock.Mock(side_effect=responses)
+        self.dispatcher._deliver(command, channel)
+        command.refresh_from_db()
+        return command, channel
+
+    def test_acked_after_retry(self):
+        command, channel = self.deliver(requests_error(), mock.Mock(status_code=200))
+        self.assertEqual((command.state, command.attempts), (PowerCommand.STATE_ACKED, 2))
+        self.assertTrue(command.power_system.status)
+        self.assertEqual(channel.breaker.failures, 0)
+
+    def test_rejected_command_is_not_retried(self):
+        command, channel = self.deliver(mock.Mock(status_code=409, text='busy'))
+        self.assertEqual((command.state, command.attempts), (PowerCommand.STATE_FAILED, 1))
+        self.assertIn('409', command.error)
+
+    def test_open_breaker_skips_send(self):
+        command, channel = self.deliver(*[requests_error()] * commands.COMMAND_MAX_ATTEMPTS)
+        self.assertEqual(command.state, PowerCommand.STATE_FAILED)
+        self.assertFalse(channel.breaker.allow())
+
+        retry = PowerCommand.objects.create(status=False)
+        channel.send.reset_mock()
+        self.dispatcher._deliver(retry, channel)
+        channel.send.assert_not_called()
+        retry.refresh_from_db()
+        self.assertIn('Circuit breaker open', retry.error)
+
+
+class HubTests(SimpleTestCase):
+    async def test_publish_from_thread_reaches_subscriber(self):
+        topics = Hub()
+        with topics.subscribe('power', maxsize=2) as subscription:
+            self.assertEqual(topics.count('power'), 1)
+            publisher = threading.Thread(target=lambda: [topics.publish('power', n) for n in (1, 2, 3)])
+            publisher.start()
+            publisher.join()
+            # Antrian penuh: pesan tertua dibuang, subscriber tetap dapat yang terbaru
+            self.assertEqual([await subscription.get(1), await subscription.get(1)], [2, 3])
+            self.assertEqual(subscription.dropped, 1)
+        self.assertEqual(topics.count('power'), 0)
+
+    async def test_latest_subscription_keeps_newest_per_topic(self):
+        topics = Hub()
+        with topics.subscribe_latest(['sensor', 'power']) as subscription:
+            for topic, message in (('sensor', 1), ('power', 'on'), ('sensor', 2), ('other', 3)):
+                topics.publish(topic, message)
+            self.assertCountEqual(await subscription.get(1), [2, 'on'])
+            self.assertEqual(subscription.coalesced, 1)
+            with self.assertRaises(asyncio.TimeoutError):
+                await subscription.get(0.01)
+
+
+class LiveStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        PowerSystem.objects.create(id=1, timestamp=T0, status=True, reason='test')
+        Device.objects.create(id='line-1')
+        ingest.known_devices.reload()
+        for patcher in (mock.patch.dict(live._published, clear=True), mock.patch.object(live, 'RECHECK', 0.05)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.ingest(30, good=5)
+
+    def ingest(self, second, good):
+        row = {**reading(good_product=good, sequence=second),
+               'timestamp': (T0 + timedelta(seconds=second)).strftime('%Y-%m-%dT%H:%M:%SZ')}
+        with self.captureOnCommitCallbacks(execute=True):  # Publish ke hub saat commit
+            response = self.client.post('/api/sensordata/ingest/', json.dumps([row]), content_type='application/json')
+        self.assertEqual(response.status_code, 204)
+
+    async def test_stream_pushes_new_readings(self):
+        stream = live.stream('line-1')
+        try:
+            first = await anext(stream)
+            self.assertTrue(first.startswith(f'retry: {live.RETRY_MS}'.encode()))
+            self.assertIn(b'event: sensor', first)
+            self.assertIn(b'event: power', first)
+            self.assertIn(b'"good_product":5', first)
+
+            await sync_to_async(self.ingest)(40, good=6)
+            update = await asyncio.wait_for(anext(stream), 1)
+            self.assertTrue(update.startswith(b'event: sensor'))
+            self.assertIn(b'"good_product":6', update)
+
+            # Backfill yang lebih lama tidak menimpa nilai terbaru di dashboard
+            await sync_to_async(self.ingest)(10, good=1)
+            self.assertEqual(await asyncio.wait_for(anext(stream), 1), live.KEEPALIVE)
+        finally:
+            await stream.aclose()
+        self.assertEqual(hub.count(live.SENSOR_TOPIC.format('line-1')), 0)
+
+
+class RouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        patcher = mock.patch.dict(settings.DATABASES, {REPLICA: settings.DATABASES[DEFAULT_DB_ALIAS]})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_go_to_replica_only_inside_replica_reads(self):
+        self.assertIsNone(self.router.db_for_read(SensorData))
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(SensorData), REPLICA)
+            self.assertEqual(self.router.db_for_write(SensorData), DEFAULT_DB_ALIAS)
+            with replica_reads(False):  # Mis. cache response diisi dari primary
+                self.assertIsNone(self.router.db_for_read(SensorData))
+            # Di dalam transaksi primary data yang baru ditulis harus terlihat
+            with mock.patch.object(connections[DEFAULT_DB_ALIAS], 'in_atomic_block', True):
+                self.assertIsNone(self.router.db_for_read(SensorData))
+        self.assertFalse(self.router.allow_migrate(REPLICA, 'sensor'))
+
+    def test_without_replica_alias(self):
+        del settings.DATABASES[REPLICA]
+        with replica_reads():
+            self.assertIsNone(self.router.db_for_read(SensorData))
+
+    def test_read_replica_view_only_for_safe_methods(self):
+        view = read_replica(lambda request: self.router.db_for_read(SensorData))
+        factory = RequestFactory()
+        self.assertEqual(view(factory.get('/')), REPLICA)
+        self.assertIsNone(view(factory.post('/')))
+
+class ResponseVersionTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_missing_version_is_stable_until_bumped(self):
+        version = response_cache.versions('sensor_data')
+        self.assertEqual(response_cache.versions('sensor_data'), version)
+        response_cache.bump('sensor_data')
+        self.assertNotEqual(response_cache.versions('sensor_data'), version)
+
+    def test_cleared_cache_does_not_reuse_old_version(self):
+        # Entry yang disimpan saat key versi hilang tidak boleh cocok lagi setelah cache di-clear
+        version = response_cache.versions('sensor_data', 'sensor_data:history')
+        cache.clear()
+        fresh = response_cache.versions('sensor_data', 'sensor_data:history')
+        self.assertNotEqual(fresh[0], version[0])
+        self.assertNotEqual(fresh[1], version[1])
+
+
+
+class LatestDataTests(TestCase):
+    URL = '/api/latest-data/'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        PowerSystem.objects.create(id=1, timestamp=T0, status=True, reason='test')
+        Device.objects.create(id='line-1')
+        ingest.known_devices.reload()
+        self.ingest(30, good=5)
+
+    def ingest(self, second, good):
+        row = {**reading(good_product=good, sequence=second),
+               'timestamp': (T0 + timedelta(seconds=second)).strftime('%Y-%m-%dT%H:%M:%SZ')}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/sensordata/ingest/', json.dumps([row]), content_type='application/json')
+        self.assertEqual(response.status_code, 204)
+
+    def test_not_modified_until_new_reading(self):
+        first = self.client.get(self.URL)
+        self.assertEqual(first.json()['sensor']['good_product'], 5)
+        self.assertEqual(self.client.get(self.URL, headers={'If-None-Match': first['ETag']}).status_code, 304)
+
+        self.ingest(40, good=6)
+        response = self.client.get(self.URL, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sensor']['good_product'], 6)
+
+    def test_ingest_writes_through_cache(self):
+        # Snapshot semua device dan line-1 dimuat dari DB
+        self.client.get(self.URL)
+        self.client.get(self.URL, {'device': 'line-1'})
+        self.ingest(40, good=6)
+        newest = SensorData.objects.latest('timestamp')
+        with self.assertNumQueries(0):
+            data = self.client.get(self.URL, {'device': 'line-1'}).json()['sensor']
+            data_all = self.client.get(self.URL).json()['sensor']
+        self.assertEqual(data, data_all)
+        self.assertEqual((data['id'], data['good_product']), (newest.id, 6))
+
+    def test_backfill_keeps_newer_snapshot(self):
+        self.client.get(self.URL)
+        self.ingest(10, good=1)
+        cached = cache.get(current_state.SENSOR_KEY.format(current_state.ALL))
+        self.assertEqual(cached['data']['good_product'], 5)
+
+
+class ListEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        Device.objects.bulk_create([Device(id='line-1'), Device(id='line-2')])
+        PowerSystem.objects.bulk_create([
+            PowerSystem(id=1, timestamp=T0, status=True, reason='test', device_id='line-1'),
+            PowerSystem(id=2, timestamp=T0 + timedelta(seconds=1), status=False, reason='test'),
+        ])
+        # Urutan insert sengaja tidak urut waktu
+        SensorData.objects.bulk_create([
+            SensorData(timestamp=T0 + timedelta(seconds=second), vibration_level=50.0, motor_voltage=17.0,
+                       motor_current=second, power_consumption=65.0, bottle_mass=54.0, bottle_brightness=75.0,
+                       good_product=0, bad_product=0, power_system_id=1, device_id=device)
+            for second, device in ((30, 'line-1'), (10, 'line-2'), (20, 'line-1'), (50, 'line-2'), (40, 'line-1'))
+        ])
+
+    def seconds(self, results):
+        return [int(item['motor_current']) for item in results]
+
+    def test_cursor_pages_oldest_first(self):
+        response = self.client.get('/api/sensordata/', {'limit': 2})
+        page = response.json()
+        self.assertIsNone(page['previous'])
+        seen = self.seconds(page['results'])
+        while page['next']:
+            page = self.client.get(page['next']).json()
+            seen += self.seconds(page['results'])
+        self.assertEqual(seen, [10, 20, 30, 40, 50])
+
+    def test_time_and_device_filters(self):
+        params = {'from': (T0 + timedelta(seconds=20)).isoformat(), 'to': (T0 + timedelta(seconds=50)).isoformat()}
+        self.assertEqual(self.seconds(self.client.get('/api/sensordata/', params).json()['results']), [20, 30, 40])
+        response = self.client.get('/api/sensordata/', {**params, 'device': 'line-2'})
+        self.assertEqual(response.json()['results'], [])
+        response = self.client.get('/api/sensordata/', {'device': 'line-2'})
+        self.assertEqual(self.seconds(response.json()['results']), [10, 50])
+
+    def test_fields_projection(self):
+        response = self.client.get('/api/sensordata/', {'fields': 'motor_current,device'})
+        for item in response.json()['results']:
+            self.assertEqual(set(item), {'id', 'timestamp', 'motor_current', 'device'})
+
+    def test_power_system_list(self):
+        page = self.client.get('/api/powersystem/').json()
+        self.assertEqual([item['id'] for item in page['results']], [1, 2])
+        page = self.client.get('/api/powersystem/', {'device': 'line-1', 'fields': 'status'}).json()
+        self.assertEqual(page['results'], [{'id': 1, 'timestamp': T0.isoformat().replace('+00:00', 'Z'), 'status': True}])
+
+    def test_invalid_params_rejected(self):
+        cases = {
+            'fields': ('/api/sensordata/', {'fields': 'motor_current,password'}),
+            'from': ('/api/sensordata/', {'from': 'kemarin'}),
+            'to': ('/api/powersystem/', {'to': '2026-13-01'}),
+            'power_system': ('/api/sensordata/', {'power_system': 'satu'}),
+        }
+        for name, (url, params) in cases.items():
+            with self.subTest(name):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(name, response.json())
+
+class HistoricalPageTests(TestCase):
+    URL = '/api/sensordata/'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        PowerSystem.objects.create(id=1, timestamp=T0, status=True, reason='test')
+        Device.objects.create(id='line-1')
+        ingest.known_devices.reload()
+
+    def ingest(self, second, sequence):
+        row = {**reading(sequence=sequence), 'timestamp': (T0 + timedelta(seconds=second)).strftime('%Y-%m-%dT%H:%M:%SZ')}
+        with self.captureOnCommitCallbacks(execute=True):  # Versi cache diganti saat commit
+            response = self.client.post('/api/sensordata/ingest/', json.dumps([row]), content_type='application/json')
+        self.assertEqual(response.status_code, 204)
+
+    def page(self, **headers):
+        return self.client.get(self.URL, {'to': (T0 + timedelta(hours=1)).isoformat()}, headers=headers)
+
+    def test_backfill_revalidates_settled_page(self):
+        # T0 sudah lewat RESPONSE_CACHE_SETTLE, tapi spool Pi masih bisa backfill ke sana
+        self.ingest(10, 1)
+        first = self.page()
+        self.assertEqual(first['Cache-Control'], 'no-cache')
+        self.assertEqual(self.page(**{'If-None-Match': first['ETag']}).status_code, 304)
+
+        self.ingest(20, 2)
+        second = self.page(**{'If-None-Match': first['ETag']})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(second.json()['results']), 2)
@@ -1,15 +1,24 @@
 from django.urls import path, include
 from rest_framework import routers
-from .views import PowerSystemViewSet, SensorDataViewSet, monitoring_dashboard, reset_count, PowerCommandView, latest_data
+from .views import AnomalyAlertViewSet, DeviceViewSet, PowerSystemViewSet, SensorDataViewSet, monitoring_dashboard, reset_count, PowerCommandView, PowerCommandStatusView, latest_data, power_changes, ingest_sensor_data, export_sensor_data, metrics_view, production_metrics, live_feed
 
 router = routers.DefaultRouter()
 router.register(r'powersystem', PowerSystemViewSet)
 router.register(r'sensordata', SensorDataViewSet)
+router.register(r'devices', DeviceViewSet)
+router.register(r'alerts', AnomalyAlertViewSet)
 
 urlpatterns = [
     path('', monitoring_dashboard, name='dashboard'),  
+    path('api/powersystem/changes/', power_changes, name='power_changes'),  # Harus sebelum router
+    path('api/sensordata/ingest/', ingest_sensor_data, name='ingest_sensor_data'),
+    path('api/sensordata/export/', export_sensor_data, name='export_sensor_data'),
     path('api/', include(router.urls)),                 
     path('api/resetcount/', reset_count, name='reset_count'),
     path('api/power-command/', PowerCommandView.as_view(), name='power_command'),  # URL baru
+    path('api/power-command/<int:pk>/', PowerCommandStatusView.as_view(), name='power_command_status'),
+    path('api/production/', production_metrics, name='production_metrics'),
     path('api/latest-data/', latest_data, name='latest_data'),  # Pastikan ini ada jika diperlukan
+    path('api/live/', live_feed, name='live_feed'),  # Server-Sent Events, pengganti polling latest-data
+    path('metrics', metrics_view, name='metrics'),  # Format teks Prometheus
 ]
\ No newline at end of file
@@ -1,24 +1,256 @@
+import asyncio
+from datetime import timedelta
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ParseError, ValidationError
 from rest_framework.response import Response
+from django.db import IntegrityError, router, transaction
+from django.db.models import Q
 from django.utils import timezone
 from django.shortcuts import render
-from django.http import JsonResponse
-import requests
-from .models import PowerSystem, SensorData
-from .serializers import PowerSystemSerializer, SensorDataSerializer
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from .models import AnomalyAlert, Device, PowerCommand, PowerSystem, ProductionMetric, SensorData
+from . import current_state, ingest, live, metrics, production, response_cache
+from .export import EXPORT_FORMATS, aexport_chunks, export_chunks
+from .filters import filter_sensor_data, filter_time_range, parse_time_param
+from .hub import hub, relay
+from .pagination import RecentCursorPagination, TimeCursorPagination
+from .routers import SAFE_METHODS, read_replica, replica_reads
+from .rollups import ROLLUP_BUCKETS, rollup_sensor_data
+from .parsers import GzipJSONParser, NDJSONParser, SensorBinaryParser
+from .serializers import AnomalyAlertSerializer, DeviceSerializer, PowerSystemSerializer, SensorDataSerializer
+from .signals import sensor_data_created
 
-class PowerSystemViewSet(viewsets.ModelViewSet):
+class FieldProjectionMixin:
+    """?fields=a,b: hanya kolom yang diminta yang diambil dari DB dan diserialisasi"""
+    always_fields = ('id', 'timestamp')  # Dibutuhkan oleh cursor pagination
+
+    def get_projected_fields(self):
+        raw = self.request.query_params.get('fields')
+        if not raw or self.action not in ('list', 'retrieve'):
+            return None
+        requested = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in requested if name not in self.serializer_class.Meta.fields]
+        if unknown:
+            raise ValidationError({"fields": f"Field tidak dikenal: {', '.join(unknown)}"})
+        return list(dict.fromkeys([*self.always_fields, *requested]))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_projected_fields()
+        if fields:
+            queryset = queryset.only(*fields)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_projected_fields()
+        if fields:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+
+class ReplicaReadMixin:
+    """Request GET/HEAD ke viewset membaca dari replica; tulis tetap ke primary"""
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads(request.method in SAFE_METHODS):
+            return super().dispatch(request, *args, **kwargs)
+
+class CachedListMixin:
+    """Response list JSON disimpan di response_cache sampai tabelnya ditulis lagi.
+
+    Halaman dengan ?to= yang sudah lewat RESPONSE_CACHE_SETTLE hanya bergantung
+    pada versi history tabel, jadi entry-nya bertahan saat data baru masuk.
+    """
+    response_cache_key = None
+
+    def _list_cache_key(self, request):
+        if request.accepted_renderer.format != 'json':
+            return None  # Browsable API memuat user/CSRF token, tidak di-cache
+        table = self.queryset.model._meta.db_table
+        end = parse_time_param(request.query_params, 'to')
+        settled = end is not None and end <= response_cache.settled_before()
+        version = response_cache.versions(response_cache.history(table) if settled else table)
+        return response_cache.request_key(request, *version)
+
+    def list(self, request, *args, **kwargs):
+        key = self._list_cache_key(request)
+        if key is not None:
+            entry = response_cache.lookup(key, self.basename)
+            if entry is not None:
+                return response_cache.respond(request, key, entry)
+            self.response_cache_key = key
+            # Entry cache diisi dari primary: hasil replica yang tertinggal akan
+            # tersimpan di bawah versi tabel yang baru sampai penulisan berikutnya
+            with replica_reads(False):
+                return super().list(request, *args, **kwargs)
+        return super().list(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.response_cache_key is None or response.status_code != 200 or not isinstance(response, Response):
+            return response
+        key = self.response_cache_key
+        response.render()
+        entry = response_cache.responses.put(
+            key, response_cache.CachedResponse(response.content, response['Content-Type']))
+        cached = response_cache.respond(request, key, entry)
+        if response.has_header('Allow'):
+            cached['Allow'] = response['Allow']
+        patch_vary_headers(cached, ('Accept',))
+        return cached
+
+def save_readings(values, path):
+    """Simpan tuple kolom (ingest.SCHEMA) secara idempotent, return instance yang baru tersimpan"""
+    with transaction.atomic():
+        created = ingest.as_instances(ingest.insert_rows(values))
+        if created:
+            sensor_data_created.send(sender=SensorData, instances=created)
+    if len(created) < len(values):
+        metrics.ingest_duplicates.inc(path, amount=len(values) - len(created))
+    return created
+
+def save_reading(validated_data, path):
+    """Satu pembacaan dari serializer: (instance, created). Duplikat = baris yang sudah ada"""
+    created = save_readings([ingest.values_from_validated(validated_data)], path)
+    if created:
+        return created[0], True
+    return SensorData.objects.get(device=validated_data['device'], sequence=validated_data['sequence']), False
+
+class DeviceViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
+    queryset = Device.objects.all().order_by('id')
+    serializer_class = DeviceSerializer
+
+    # Dipanggil Raspberry Pi saat start: daftar / perbarui alamat device
+    @action(detail=False, methods=['post'], url_path='register')
+    def register(self, request):
+        device_id = request.data.get('id')
+        if not device_id:
+            return Response({"error": "Missing 'id' parameter"}, status=status.HTTP_400_BAD_REQUEST)
+
+        address = request.data.get('address')
+        if not address:
+            # Pakai IP pengirim request + port Flask server di Pi
+            address = f"{request.META.get('REMOTE_ADDR')}:{request.data.get('port', 5000)}"
+
+        serializer = self.get_serializer(data={"id": device_id, "address": address})
+        serializer.fields['id'].validators = []  # Boleh mendaftar ulang dengan id yang sama
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        device, _ = Device.objects.update_or_create(
+            id=serializer.validated_data['id'],
+            defaults={"address": serializer.validated_data['address'], "last_seen": timezone.now()}
+        )
+        return Response(self.get_serializer(device).data)
+
+class AnomalyAlertViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    """Alert dari detect_anomalies. Filter ?from= ?to= ?device= dan ?active=1 (belum di-acknowledge)"""
+    queryset = AnomalyAlert.objects.all()
+    serializer_class = AnomalyAlertSerializer
+    pagination_class = RecentCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            params = self.request.query_params
+            queryset = filter_time_range(queryset, params)
+            if params.get('device'):
+                queryset = queryset.filter(device_id=params['device'])
+            if params.get('active') in ('1', 'true'):
+                queryset = queryset.filter(acknowledged=False)
+        return queryset
+
+    @action(detail=True, methods=['post'], url_path='acknowledge')
+    def acknowledge(self, request, pk=None):
+        alert = self.get_object()
+        alert.acknowledged = True
+        alert.save(update_fields=['acknowledged'])
+        return Response(self.get_serializer(alert).data)
+
+class PowerSystemViewSet(ReplicaReadMixin, CachedListMixin, FieldProjectionMixin, viewsets.ModelViewSet):
     queryset = PowerSystem.objects.all()
     serializer_class = PowerSystemSerializer
+    pagination_class = TimeCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = filter_time_range(queryset, self.request.query_params)
+            device = self.request.query_params.get('device')
+            if device:
+                queryset = queryset.filter(device_id=device)
+        return queryset
 
-class SensorDataViewSet(viewsets.ModelViewSet):
+class SensorDataViewSet(ReplicaReadMixin, CachedListMixin, FieldProjectionMixin, viewsets.ModelViewSet):
     queryset = SensorData.objects.all()
     serializer_class = SensorDataSerializer
+    pagination_class = TimeCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = filter_sensor_data(queryset, self.request.query_params)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        instance, created = save_reading(serializer.validated_data, 'create')
+        return Response(self.get_serializer(instance).data,
+                        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    # Jumlah maksimum pembacaan dalam satu request bulk
+    bulk_max_rows = 5000
+
+    # Ingest batch dari Raspberry Pi: JSON array, NDJSON atau format biner, boleh di-gzip
+    @action(detail=False, methods=['post'], url_path='bulk',
+            parser_classes=[GzipJSONParser, NDJSONParser, SensorBinaryParser])
+    def bulk(self, request):
+        rows = request.data
+        if isinstance(rows, dict):
+            rows = [rows]
+        if not isinstance(rows, list) or not rows:
+            return Response({"error": "Body harus berupa list pembacaan sensor"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=rows, many=True, max_length=self.bulk_max_rows)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # INSERT multi-row untuk seluruh batch, pembacaan yang sudah tersimpan dilewati
+        values = [ingest.values_from_validated(item) for item in serializer.validated_data]
+        created = save_readings(values, 'bulk')
+        return Response({"message": "Sensor data saved successfully", "count": len(created),
+                         "duplicates": len(values) - len(created)},
+                        status=status.HTTP_201_CREATED)
+
+    # Downsampling: min/max/avg per bucket waktu (?bucket=1m|1h|1d)
+    @action(detail=False, methods=['get'], url_path='rollup')
+    def rollup(self, request):
+        bucket = request.query_params.get('bucket', '1h')
+        if bucket not in ROLLUP_BUCKETS:
+            return Response({"error": f"bucket harus salah satu dari: {', '.join(ROLLUP_BUCKETS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = filter_sensor_data(SensorData.objects.all(), request.query_params)
+        if not request.query_params.get('from'):
+            _, default_range = ROLLUP_BUCKETS[bucket]
+            queryset = queryset.filter(timestamp__gte=timezone.now() - default_range)
+
+        results = rollup_sensor_data(queryset, bucket, request.query_params.get('device'))
+        return Response({"bucket": bucket, "results": results})
 
 def monitoring_dashboard(request):
-    latest_sensor = SensorData.objects.last()
-    latest_power = PowerSystem.objects.last()
+    try:
+        sensor, power = current_state.get_current_state()
+        latest_sensor, latest_power = sensor["data"], power["data"]
+    except (SensorData.DoesNotExist, PowerSystem.DoesNotExist):
+        latest_sensor = latest_power = None
 
     context = {
         "sensor": latest_sensor,
@@ -31,11 +263,73 @@ def monitoring_dashboard(request):
 def create_sensor_data(request):
     serializer = SensorDataSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save()
-        return Response({"message": "Sensor data saved successfully", "data": serializer.data}, 
+        instance, created = save_reading(serializer.validated_data, 'create')
+        if not created:
+            return Response({"message": "Sensor data already saved", "data": SensorDataSerializer(instance).data})
+        return Response({"message": "Sensor data saved successfully", "data": SensorDataSerializer(instance).data}, 
                        status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+# Fast-path ingest: tanpa serializer DRF, validasi skema ringan + executemany, balas 204
+INGEST_PARSERS = [GzipJSONParser(), NDJSONParser(), SensorBinaryParser()]
+
+@csrf_exempt
+@require_POST
+def ingest_sensor_data(request):
+    parser = next((p for p in INGEST_PARSERS if p.media_type == request.content_type), None)
+    if parser is None:
+        return JsonResponse({"error": f"Unsupported media type '{request.content_type}'"}, status=415)
+
+    try:
+        rows = parser.parse(request, request.content_type, {'request': request})
+        if isinstance(rows, list) and len(rows) > SensorDataViewSet.bulk_max_rows:
+            return JsonResponse({"error": f"Maksimal {SensorDataViewSet.bulk_max_rows} pembacaan per request"},
+                                status=400)
+        values = ingest.validate_rows(rows)
+    except ParseError as e:
+        return JsonResponse({"error": str(e.detail)}, status=400)
+    except ingest.UnknownDeviceError as e:
+        return JsonResponse({"error": str(e)}, status=403)
+    except ingest.IngestError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        save_readings(values, 'ingest')
+    except IntegrityError as e:
+        # Cache ID sudah usang (mis. power_system dihapus), muat ulang untuk request berikutnya
+        ingest.known_power_systems.reload()
+        ingest.known_devices.reload()
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return HttpResponse(status=204)
+
+# Ekspor data historis: ?fmt=csv|ndjson plus filter ?from= ?to= ?device= ?power_system=
+# (bukan ?format= karena param itu dipakai DRF). Dikompres gzip jika client mendukung.
+# ?expand=1: rekonstruksi deret per pembacaan dari baris gabungan (sample_count > 1).
+# Di server ASGI body di-stream lewat iterator async (lihat export.aexport_chunks).
+@require_GET
+@read_replica
+def export_sensor_data(request):
+    export_format = request.GET.get('fmt', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({"error": f"fmt harus salah satu dari: {', '.join(EXPORT_FORMATS)}"}, status=400)
+    try:
+        # Alias dipilih sekarang: query baru jalan saat response di-stream, di luar view
+        queryset = filter_sensor_data(SensorData.objects.using(router.db_for_read(SensorData)), request.GET)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400)
+
+    compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+    content_type, extension, _ = EXPORT_FORMATS[export_format]
+    expand = request.GET.get('expand') in ('1', 'true')
+    chunks = aexport_chunks if isinstance(request, ASGIRequest) else export_chunks
+    response = StreamingHttpResponse(chunks(queryset, export_format, compress, expand), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="sensordata.{extension}"'
+    response['Vary'] = 'Accept-Encoding'
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    return response
+
 # API untuk membuat status sistem daya baru
 @api_view(['POST'])
 def create_power_system(request):
@@ -49,94 +343,135 @@ def create_power_system(request):
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import PowerCommandSerializer
+from .commands import dispatcher
+from .serializers import PowerCommandSerializer, PowerCommandStatusSerializer
 
 class PowerCommandView(APIView):
     def post(self, request):
         serializer = PowerCommandSerializer(data=request.data)
         if serializer.is_valid():
             status_value = serializer.validated_data['status']
+            device_id = serializer.validated_data.get('device')
             
-            # Log informasi debug
-            print(f"Received power command: status={status_value}")
+            # Tentukan tujuan perintah berdasarkan device, default Pi di settings
+            device = None
+            raspberry_pi_url = settings.RASPBERRY_PI_URL
+            if device_id:
+                device = Device.objects.filter(id=device_id).first()
+                if device is None or not device.address:
+                    return Response({"error": f"Device '{device_id}' not registered"},
+                                    status=status.HTTP_404_NOT_FOUND)
+                raspberry_pi_url = f"http://{device.address}"
             
-            # Logika untuk mengirim perintah ke Raspberry Pi
-            try:
-                # Alamat IP Raspberry Pi dan port Flask server
-                raspberry_pi_url = "http://192.168.91.187:5000/control-power"
-                
-                print(f"Sending request to Raspberry Pi: {raspberry_pi_url}")
-                print(f"Request data: {{'status': {status_value}}}")
-                
-                # Kirim perintah ke Raspberry Pi
-                response = requests.post(
-                    raspberry_pi_url,
-                    json={"status": status_value},
-                    timeout=5  # Tambah timeout untuk memberikan waktu lebih
-                )
-                
-                # Log respons
-                print(f"Raspberry Pi response: {response.status_code} - {response.text}")
-                
-                # Cek respons dari Raspberry Pi
-                if response.status_code == 200:
-                    # Simpan status ke database
-                    power_system = PowerSystem.objects.create(
-                        timestamp=timezone.now(),
-                        status=bool(status_value),
-                        reason="Manual activation" if status_value == 1 else "Manual deactivation"
-                    )
-                    
-                    print(f"Created new PowerSystem record: id={power_system.id}, status={power_system.status}")
-                    
-                    return Response({"message": "Power command sent successfully"}, status=status.HTTP_200_OK)
-                else:
-                    error_msg = f"Failed to send command to Raspberry Pi: {response.text}"
-                    print(error_msg)
-                    return Response({"error": error_msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                    
-            except Exception as e:
-                error_msg = f"Communication error with Raspberry Pi: {str(e)}"
-                print(error_msg)
-                return Response({"error": error_msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            # Perintah dikirim ke Raspberry Pi di background, worker tidak ikut menunggu
+            command = PowerCommand.objects.create(status=bool(status_value), device=device)
+            transaction.on_commit(lambda: dispatcher.submit(command.id, raspberry_pi_url, device_id))
+            
+            return Response({"message": "Power command queued", "command_id": command.id},
+                            status=status.HTTP_202_ACCEPTED)
                 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-# API untuk mendapatkan data terbaru
+# Cek hasil perintah daya (pending / acked / failed)
+class PowerCommandStatusView(APIView):
+    def get(self, request, pk):
+        try:
+            command = PowerCommand.objects.get(pk=pk)
+        except PowerCommand.DoesNotExist:
+            return Response({"error": "Power command not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(PowerCommandStatusSerializer(command).data)
+
+# API untuk mendapatkan data terbaru (dari cache current state, tanpa query DB).
+# Body JSON di-encode sekali per ETag lalu dipakai ulang dari response_cache.
 def latest_data(request):
     try:
-        sensor_data = SensorData.objects.latest('timestamp')
-        power_status = PowerSystem.objects.latest('id')
-        data = {
-            "sensor": {
-                "id": sensor_data.id,
-                "vibration_level": sensor_data.vibration_level,
-                "motor_voltage": sensor_data.motor_voltage,
-                "motor_current": sensor_data.motor_current,
-                "power_consumption": sensor_data.power_consumption,
-                "bottle_mass": sensor_data.bottle_mass,
-                "bottle_brightness": sensor_data.bottle_brightness,
-                "good_product": sensor_data.good_product,
-                "bad_product": sensor_data.bad_product,
-            },
-            "power": {
-                "status": power_status.status,
-                "reason": power_status.reason
-            }
-        }
-        return JsonResponse(data)
+        sensor, power = current_state.get_current_state(request.GET.get('device'))
+        etag = current_state.current_etag(sensor, power)
+        key = ('latest_data', etag)
+        entry = response_cache.lookup(key, 'latest_data')
+        if entry is None:
+            body = JsonResponse({"sensor": sensor["data"], "power": power["data"]}).content
+            entry = response_cache.responses.put(
+                key, response_cache.CachedResponse(body, 'application/json', etag=etag))
+        # 304 jika data belum berubah sejak poll sebelumnya
+        return response_cache.respond(request, key, entry)
     except (SensorData.DoesNotExist, PowerSystem.DoesNotExist) as e:
         return JsonResponse({"error": str(e)}, status=404)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
+# Long-poll perubahan status daya untuk Raspberry Pi. Request ditahan hanya di
+# server ASGI (satu coroutine per Pi); perubahan dari worker lain sampai lewat
+# LISTEN/NOTIFY PostgreSQL (hub.relay). Di WSGI satu request yang ditahan memakan
+# satu thread worker, jadi dibalas langsung (short-poll) dengan Retry-After,
+# begitu juga jika jumlah waiter di proses ini sudah POWER_POLL_MAX_WAITERS.
+POWER_POLL_MAX_TIMEOUT = 60    # Batas maksimum ?timeout= (detik)
+POWER_POLL_RECHECK = 5         # Cek ulang DB berkala (jika NOTIFY terlewat / bukan PostgreSQL)
+POWER_POLL_MAX_WAITERS = 500   # Batas long-poll bersamaan per proses
+POWER_POLL_RETRY_AFTER = 5     # Jeda poll berikutnya untuk balasan langsung (detik)
+
+@require_GET
+async def power_changes(request):
+    try:
+        since_id = int(request.GET.get('since_id', 0))
+        timeout = min(float(request.GET.get('timeout', 25)), POWER_POLL_MAX_TIMEOUT)
+    except ValueError:
+        return JsonResponse({"error": "since_id dan timeout harus berupa angka"}, status=400)
+
+    # Dengan ?device=, hanya status milik device itu atau status tanpa device (broadcast)
+    changes = PowerSystem.objects.filter(id__gt=since_id)
+    device = request.GET.get('device')
+    if device:
+        changes = changes.filter(Q(device_id=device) | Q(device__isnull=True))
+
+    if not isinstance(request, ASGIRequest) or hub.count('power') >= POWER_POLL_MAX_WAITERS:
+        latest = await changes.order_by('-id').afirst()
+        if latest is not None:
+            return JsonResponse(PowerSystemSerializer(latest).data)
+        response = HttpResponse(status=204)
+        response['Retry-After'] = POWER_POLL_RETRY_AFTER
+        return response
+
+    relay.start()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    # Subscribe sebelum cek DB agar perubahan di antara keduanya tidak terlewat
+    with hub.subscribe('power') as subscription:
+        while True:
+            latest = await changes.order_by('-id').afirst()
+            if latest is not None:
+                return JsonResponse(PowerSystemSerializer(latest).data)
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return HttpResponse(status=204)
+            try:
+                await subscription.get(min(remaining, POWER_POLL_RECHECK))
+            except asyncio.TimeoutError:
+                pass
+
+# Live feed dashboard (Server-Sent Events), ?device= opsional. Koneksi dibiarkan
+# terbuka, jadi butuh server ASGI (mis. uvicorn sensor_api.asgi:application);
+# di WSGI dibalas 503 dan dashboard kembali ke polling /api/latest-data/.
+@require_GET
+async def live_feed(request):
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"error": "Live feed hanya tersedia di server ASGI"}, status=503)
+    response = StreamingHttpResponse(live.stream(request.GET.get('device')), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Jangan di-buffer reverse proxy (nginx)
+    return response
+
 # Endpoint untuk reset counter
 @api_view(['POST'])
 def reset_count(request):
     if request.method == 'POST':
         try:
-            # Dapatkan data sensor terakhir
-            latest_sensor = SensorData.objects.last()
+            # Dapatkan data sensor terakhir (opsional per device)
+            sensor_queryset = SensorData.objects.all()
+            if request.data.get('device'):
+                sensor_queryset = sensor_queryset.filter(device_id=request.data['device'])
+            latest_sensor = sensor_queryset.last()
             
             if latest_sensor:
                 # Buat instance baru dengan nilai reset
@@ -150,7 +485,11 @@ def reset_count(request):
                     bottle_brightness=latest_sensor.bottle_brightness,
                     good_product=0,  # Reset ke 0
                     bad_product=0,   # Reset ke 0
-                    power_system_id=latest_sensor.power_system_id
+                    # Generasi sama dengan data Pi: agregat produksi menganggap baris ini
+                    # regresi (bukan reset), jadi produk tidak terhitung dua kali
+                    counter_generation=latest_sensor.counter_generation,
+                    power_system_id=latest_sensor.power_system_id,
+                    device_id=latest_sensor.device_id
                 )
                 
                 return Response({"success": True, "message": "Counters reset successfully"}, 
@@ -164,4 +503,41 @@ def reset_count(request):
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     return Response({"success": False, "message": "Invalid request method"}, 
-                    status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+                    status=status.HTTP_400_BAD_REQUEST)
+
+
+# KPI produksi dari agregat per menit/jam: ?bucket=1m|1h&from=&to=&device=
+PRODUCTION_DEFAULT_RANGE = {'1m': timedelta(hours=1), '1h': timedelta(hours=24)}
+
+@api_view(['GET'])
+@read_replica
+def production_metrics(request):
+    bucket = request.query_params.get('bucket', '1h')
+    if bucket not in production.PERIODS:
+        return Response({"error": f"bucket harus salah satu dari: {', '.join(production.PERIODS)}"},
+                        status=status.HTTP_400_BAD_REQUEST)
+    period = production.PERIODS[bucket]
+    end = parse_time_param(request.query_params, 'to') or timezone.now()
+    start = parse_time_param(request.query_params, 'from') or end - PRODUCTION_DEFAULT_RANGE[bucket]
+
+    queryset = ProductionMetric.objects.filter(period=period, bucket__gte=start, bucket__lt=end)
+    device = request.query_params.get('device')
+    if device:
+        queryset = queryset.filter(device_id=device)
+
+    rows = queryset.order_by('bucket').values('bucket', 'device', 'good', 'bad', 'samples', 'run_seconds')
+    results = [
+        {"bucket": row['bucket'], "device": row['device'], "samples": row['samples'],
+         **production.kpis(row['good'], row['bad'], row['run_seconds'], period)}
+        for row in rows
+    ]
+    # Availability ringkasan dihitung per line, jadi rentang dikali jumlah device
+    devices = 1 if device else max(len({row["device"] for row in results}), 1)
+    summary = production.summarize(queryset, (end - start).total_seconds() * devices)
+    return Response({"bucket": bucket, "from": start, "to": end, "summary": summary, "results": results})
+
+
+# Endpoint metrik untuk di-scrape Prometheus (agregasi per proses worker)
+@require_GET
+def metrics_view(request):
+    return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
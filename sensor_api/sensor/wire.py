@@ -0,0 +1,142 @@
+import math
+import struct
+from datetime import datetime, timezone
+
+# Format biner pembacaan sensor, HARUS sama dengan pi_agent/wire.py di Raspberry Pi.
+#
+# Header : magic "SD", versi (uint8), reserved (uint8), jumlah record (uint16),
+#          panjang device id (uint8) lalu device id (UTF-8)
+# Record : timestamp epoch detik (float64), 6 nilai analog (float64),
+#          good_product, bad_product, power_system, counter_generation (uint32),
+#          sequence (uint64) dan flags (uint8); counter_generation/sequence
+#          0 = tidak diketahui. Hanya jika flags & FLAG_AGGREGATED (baris gabungan
+#          edge) diikuti sample_count (uint32) dan min/max/mean 6 nilai analog
+#          (18 float64), jadi baris tunggal tetap kecil. Jika flags & FLAG_WINDOW
+#          diikuti waktu pembacaan pertama jendela (epoch detik) dan jarak antar
+#          pembacaan (detik), keduanya float64.
+# Versi lain ditolak: agent mengirim ulang spool (JSON) dengan format saat ini.
+MEDIA_TYPE = 'application/x-sensor-reading'
+MAGIC = b'SD'
+VERSION = 5
+HEADER = struct.Struct('<2sBBHB')
+RECORD = struct.Struct('<7d4IQB')
+AGGREGATE = struct.Struct('<I18d')
+WINDOW = struct.Struct('<2d')
+FLAG_AGGREGATED = 0x01
+FLAG_WINDOW = 0x02
+
+ANALOG_FIELDS = (
+    'vibration_level', 'motor_voltage', 'motor_current',
+    'power_consumption', 'bottle_mass', 'bottle_brightness',
+)
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def _datetime(epoch):
+    """Epoch detik dari client menjadi datetime UTC; NaN/inf/di luar rentang = WireFormatError"""
+    if not math.isfinite(epoch):
+        raise WireFormatError(f"Timestamp tidak valid: {epoch}")
+    try:
+        return datetime.fromtimestamp(epoch, tz=timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        raise WireFormatError(f"Timestamp di luar rentang: {epoch}")
+
+
+def _reading(values, device):
+    reading = {'timestamp': _datetime(values[0])}
+    reading.update(zip(ANALOG_FIELDS, values[1:7]))
+    reading['good_product'], reading['bad_product'], reading['power_system'] = values[7:10]
+    reading['counter_generation'] = values[10] or None
+    reading['sample_count'] = 1
+    if device is not None:
+        reading['device'] = device
+    return reading
+
+
+def _aggregate(reading, sample_count, stats):
+    reading['sample_count'] = sample_count
+    if sample_count > 1:
+        reading['summary'] = {
+            field: list(stats[3 * index:3 * index + 3]) for index, field in enumerate(ANALOG_FIELDS)
+        }
+
+
+def _decode_records(data, count, device):
+    readings = []
+    offset = 0
+    for _ in range(count):
+        if len(data) < offset + RECORD.size:
+            raise WireFormatError("Panjang body tidak sesuai jumlah record")
+        values = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        flags = values[12]
+        if flags & ~(FLAG_AGGREGATED | FLAG_WINDOW):
+            raise WireFormatError(f"Flag record tidak dikenal: {flags:#x}")
+        reading = _reading(values, device)
+        if flags & FLAG_AGGREGATED:
+            if len(data) < offset + AGGREGATE.size:
+                raise WireFormatError("Panjang body tidak sesuai jumlah record")
+            sample_count, *stats = AGGREGATE.unpack_from(data, offset)
+            offset += AGGREGATE.size
+            _aggregate(reading, sample_count, stats)
+        if flags & FLAG_WINDOW:
+            if len(data) < offset + WINDOW.size:
+                raise WireFormatError("Panjang body tidak sesuai jumlah record")
+            window_start, reading['sample_interval'] = WINDOW.unpack_from(data, offset)
+            offset += WINDOW.size
+            reading['window_start'] = _datetime(window_start)
+        reading['sequence'] = values[11] or None
+        readings.append(reading)
+    if offset != len(data):
+        raise WireFormatError("Panjang body tidak sesuai jumlah record")
+    return readings
+
+
+def decode_readings(data):
+    """Decode bytes format biner menjadi list dict yang siap divalidasi serializer"""
+    if len(data) < HEADER.size:
+        raise WireFormatError("Header terlalu pendek")
+    magic, version, _, count, device_length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise WireFormatError("Magic bytes tidak valid")
+    if version != VERSION:
+        raise WireFormatError(f"Versi format {version} tidak didukung")
+
+    offset = HEADER.size + device_length
+    if len(data) < offset:
+        raise WireFormatError("Header terlalu pendek")
+    device = data[HEADER.size:offset].decode('utf-8') or None
+    return _decode_records(data[offset:], count, device)
+
+
+def encode_readings(readings):
+    """Kebalikan decode_readings (dipakai benchmark dan test), timestamp berupa datetime"""
+    device = (readings[0].get('device') or '').encode('utf-8') if readings else b''
+    parts = [HEADER.pack(MAGIC, VERSION, 0, len(readings), len(device)), device]
+    for reading in readings:
+        values = [float(reading[field]) for field in ANALOG_FIELDS]
+        sample_count = reading.get('sample_count') or 1
+        window = reading.get('window_start') is not None and reading.get('sample_interval') is not None
+        parts.append(RECORD.pack(
+            reading['timestamp'].timestamp(),
+            *values,
+            reading['good_product'],
+            reading['bad_product'],
+            reading['power_system'],
+            reading.get('counter_generation') or 0,
+            reading.get('sequence') or 0,
+            (FLAG_AGGREGATED if sample_count > 1 else 0) | (FLAG_WINDOW if window else 0),
+        ))
+        if sample_count > 1:
+            summary = reading.get('summary') or {}
+            parts.append(AGGREGATE.pack(
+                sample_count,
+                *(stat for field, value in zip(ANALOG_FIELDS, values)
+                  for stat in summary.get(field, (value, value, value))),
+            ))
+        if window:
+            parts.append(WINDOW.pack(reading['window_start'].timestamp(), reading['sample_interval']))
+    return b''.join(parts)
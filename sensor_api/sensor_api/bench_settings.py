@@ -0,0 +1,36 @@
+"""Settings untuk benchmark dan load test lokal (bench_ingest, loadtest).
+
+Memakai database SQLite dan cache file terpisah, jadi tidak pernah menulis ke
+database produksi:
+
+    python manage.py migrate --settings=sensor_api.bench_settings
+    python manage.py bench_ingest --settings=sensor_api.bench_settings
+
+Untuk mengukur PostgreSQL, buat modul settings sendiri yang meng-import modul
+ini lalu mengganti DATABASES dengan database Postgres sementara (bukan produksi).
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+# Dicek oleh command benchmark: menolak jalan dengan settings lain
+BENCHMARK_DATABASE = True
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'bench.sqlite3',
+        # Load test menulis dari banyak thread sekaligus
+        'OPTIONS': {
+            'timeout': 30,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=WAL;',
+        },
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache-bench',
+    }
+}
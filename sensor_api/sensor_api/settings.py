@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'sensor.middleware.MetricsMiddleware',  # Harus paling atas
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,18 +78,73 @@ WSGI_APPLICATION = 'sensor_api.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
+# https://docs.djangoproject.com/en/5.2/ref/databases/#connection-management
+
+# Koneksi DB per proses worker:
+# - DB_POOL_SIZE > 0: pool psycopg 3 berisi maksimal sekian koneksi (butuh paket
+#   psycopg[pool]). Pakai ini untuk ASGI (uvicorn, live feed), karena koneksi
+#   persisten tidak dipakai ulang antar request async.
+# - DB_POOL_SIZE = 0: koneksi persisten per thread, ditutup setelah DB_CONN_MAX_AGE detik (WSGI).
+DB_POOL_SIZE = 0
+DB_CONN_MAX_AGE = 300
+# Host replica baca (streaming replication PostgreSQL), None = semua query ke primary
+DB_REPLICA_HOST = None
+DB_REPLICA_PORT = '5433'
+
+
+def _database(host, port):
+    database = {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': 'sensor_system',       # Ganti sesuai nama database kamu
         'USER': 'postgres',            # Ganti sesuai user PostgreSQL kamu
         'PASSWORD': 'Nikha2715',    # Ganti sesuai password PostgreSQL kamu
-        'HOST': 'localhost',
-        'PORT': '5433',
+        'HOST': host,
+        'PORT': port,
+        # Koneksi persisten dicek dulu sebelum dipakai ulang (DB restart, failover)
+        'CONN_HEALTH_CHECKS': True,
+        'CONN_MAX_AGE': 0 if DB_POOL_SIZE else DB_CONN_MAX_AGE,  # Pool tidak boleh dengan CONN_MAX_AGE
+    }
+    if DB_POOL_SIZE:
+        database['OPTIONS'] = {'pool': {'min_size': 1, 'max_size': DB_POOL_SIZE, 'timeout': 10}}
+    return database
+
+
+DATABASES = {
+    'default': _database('localhost', '5433'),
+}
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = _database(DB_REPLICA_HOST, DB_REPLICA_PORT)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}  # Test memakai database default
+
+# View baca (GET) ke replica, tulis dan ingest ke primary (lihat sensor/routers.py)
+DATABASE_ROUTERS = ['sensor.routers.PrimaryReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# File-based agar snapshot "current state" sama untuk semua worker proses
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
     }
 }
 
+# Alamat Flask server di Raspberry Pi (tujuan perintah ON/OFF motor)
+RASPBERRY_PI_URL = 'http://192.168.91.187:5000'
+
+# Laju produksi ideal per line (produk/detik) untuk KPI performance/OEE, None = tidak dihitung
+PRODUCTION_IDEAL_RATE = 0.2
+
+# Interval sampling Pi (detik); baris dengan sample_count > 1 mewakili sekian pembacaan
+SENSOR_SAMPLE_INTERVAL = 1.0
+
+# Cache response API per worker (sensor/response_cache.py): batas ukuran total (byte)
+# dan umur data (detik) yang masuk versi history. Backfill yang lebih tua dari ini
+# tetap aman (versi history ikut diganti), jadi nilainya hanya soal hit rate
+RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+RESPONSE_CACHE_SETTLE = 24 * 3600
 
 
 # Password validation